@@ -1,44 +1,25 @@
-from typing import Dict, Any, List, Tuple
-from .llm_client import chat, ensure_ollama_up, extract_json_block
+import random
+from typing import Dict, Any, List, Optional, Tuple
+from . import journal, llm_metrics
+from .llm_client import ensure_ollama_up, validity_stats
+from .engine import Event, GridEngine
+from .perception import sight
+from .policies import LLMPolicy
+from .profiling import timed
+from .schemas import AvaTurn
+from .stream_parser import ConsoleSpeechPrinter, summarize_timings
 
 SYSTEM = (
     "Du bist 'Ava', eine KI-Figur in einer gemeinsamen Life-Simulation mit einem Menschen (Ben). "
     "Jede Runde handeln sowohl Ava als auch Ben in der Welt. Du antwortest NUR als JSON mit: "
-    "thoughts (kurz), action (move_up/move_down/move_left/move_right/wait/interact/speak:<text>), "
+    "thoughts (kurz), action (move_up/move_down/move_left/move_right/wait/interact), "
     "speech (was Ava sagt), design_feedback (konkrete Verbesserungen), self_update (Identitätsanpassung)."
 )
 
 GRID: Tuple[int, int] = (7, 5)
 
 
-def clamp_pos(pos: Tuple[int, int]) -> Tuple[int, int]:
-    x, y = pos
-    x = max(0, min(GRID[0] - 1, x))
-    y = max(0, min(GRID[1] - 1, y))
-    return x, y
-
-
-def apply_action(state: Dict[str, Any], who: str, action: str) -> str:
-    key = "ava" if who == "ava" else "ben"
-    x, y = state["pos"][key]
-    a = action.lower()
-    if a == "move_up":
-        y -= 1
-    elif a == "move_down":
-        y += 1
-    elif a == "move_left":
-        x -= 1
-    elif a == "move_right":
-        x += 1
-    elif a.startswith("speak:"):
-        # speaking has no position change, but we can log it
-        msg = a.split(":", 1)[1].strip()
-        return f"{who} spricht: {msg}"
-    # wait or interact don't move by default
-    state["pos"][key] = clamp_pos((x, y))
-    return f"{who} {a} -> {state['pos'][key]}"
-
-
+@timed("render")
 def render(state: Dict[str, Any]) -> None:
     print(f"Karte {GRID[0]}x{GRID[1]}")
     print(f"Ava@{state['pos']['ava']}  Ben@{state['pos']['ben']}")
@@ -60,25 +41,75 @@ def normalize_human_action(raw: str) -> str:
     return r or "wait"
 
 
-def run_coplay(max_turns: int = 20) -> None:
+class CoplayPolicy(LLMPolicy):
+    """LLM policy for Ava; Ben's move is announced before she decides."""
+
+    def __init__(self, state: Dict[str, Any], game: str = "coplay", engine: Optional[GridEngine] = None) -> None:
+        super().__init__(SYSTEM, game, self._describe, nudge="Bitte striktes JSON liefern.")
+        self.world_ben = ""
+        # with an engine, prompts carry Ava's field of view (bounded size)
+        self.engine = engine
+        start = f"Start: Ava@{state['pos']['ava']}, Ben@{state['pos']['ben']} auf {engine.grid if engine else GRID}."
+        self.history.add("user", start + self._sight())
+
+    def _sight(self) -> str:
+        return " " + sight(self.engine) if self.engine is not None else ""
+
+    def announce_ben(self, state: Dict[str, Any], action_ben: str, world_ben: str, feedback: str = "") -> None:
+        self.world_ben = world_ben
+        prompt_ai = (
+            f"Zustand: Ava@{state['pos']['ava']}, Ben@{state['pos']['ben']}. "
+            f"Ben-Aktion: {action_ben}. Weltreaktion: {world_ben}.{self._sight()}"
+        )
+        if feedback:
+            prompt_ai += f" Benutzer-Feedback: {feedback}."
+        self.history.add("user", prompt_ai)
+
+    def _describe(self, state: Dict[str, Any], events: List[Event]) -> str:
+        world_ava = " ".join(e.text for e in events if e.kind == "world")
+        return (
+            f"Weltreaktionen – Ben: {self.world_ben}; Ava: {world_ava}. "
+            f"Neuer Zustand: Ava@{state['pos']['ava']}, Ben@{state['pos']['ben']}."
+        )
+
+
+def ava_round(
+    engine: GridEngine, ava_turn: AvaTurn, action_ben: str, human_feedback: str = "", round_no: Optional[int] = None
+) -> List[Event]:
+    """Apply Ava's answer after Ben already moved."""
+    events = [Event("world", engine.act("ava", ava_turn.action))]
+    return events + engine.absorb(ava_turn, action_ben, human_feedback, round_no)
+
+
+def make_engine() -> GridEngine:
+    return GridEngine(GRID, start={"ben": (0, 0)})
+
+
+def run_coplay(max_turns: int = 20, journal_path: Optional[str] = None, resume: Optional[str] = None) -> None:
+    """`resume` continues a journaled session for another `max_turns` rounds."""
     if not ensure_ollama_up(verbose=True):
         print("Bitte starte Ollama und lade 'gemma3:1b'.")
         return
 
-    state: Dict[str, Any] = {
-        "pos": {"ava": (GRID[0] // 2, GRID[1] // 2), "ben": (0, 0)},
-        "log": [],
-        "notes": "",
-    }
+    engine = make_engine()
+    seed = journal.read_header(resume)["seed"] if resume else random.randrange(1 << 31)
+    state = engine.reset(seed)
 
     print("Co-Play: Ava (KI) & Ben (Mensch) handeln abwechselnd pro Runde. Eingaben: w/a/s/d oder 'speak Hallo' etc.")
 
-    history: List[Dict[str, str]] = [
-        {"role": "system", "content": SYSTEM},
-        {"role": "user", "content": f"Start: Ava@{state['pos']['ava']}, Ben@{state['pos']['ben']} auf {GRID}."}
-    ]
-
-    for turn in range(1, max_turns + 1):
+    policy = CoplayPolicy(state, engine=engine)
+    first = 1
+    if resume:
+        log, point = journal.resume_into(resume, "coplay", state, policy.history)
+        first = point.round + 1
+        print(f"Fortgesetzt aus {resume}: Runde {point.round}, Zug {state['turn']}.")
+    else:
+        log = journal.Journal.create("coplay", seed, journal_path)
+        if log is not None:
+            log.begin(state, policy.history)
+
+    timings: List[Dict[str, float]] = []
+    for turn in range(first, first + max_turns):
         print(f"\n=== Runde {turn} ===")
         render(state)
 
@@ -89,61 +120,56 @@ def run_coplay(max_turns: int = 20) -> None:
             break
         human_feedback = input("Optionales Feedback/Ideen an das System (Enter überspringt): ").strip()
         action_ben = normalize_human_action(raw)
-        world_ben = apply_action(state, "ben", action_ben)
+        world_ben = engine.act("ben", action_ben)
         print("Welt (Ben):", world_ben)
 
         # 2) AI (Ava) acts
-        prompt_ai = (
-            f"Zustand: Ava@{state['pos']['ava']}, Ben@{state['pos']['ben']}. "
-            f"Ben-Aktion: {action_ben}. Weltreaktion: {world_ben}."
-        )
-        if human_feedback:
-            prompt_ai += f" Benutzer-Feedback: {human_feedback}."
-        history.append({"role": "user", "content": prompt_ai})
+        policy.announce_ben(state, action_ben, world_ben, human_feedback)
 
+        printer = ConsoleSpeechPrinter()
+        policy.on_event = printer
         try:
-            content = chat(history)
+            ava_turn = policy.decide(state)
+            spoke = printer.finish()
         except Exception as e:
+            printer.finish()
             print("KI-Fehler:", e)
             print("Tipp: Stelle sicher, dass 'gemma3:1b' verfügbar ist.")
+            if log is not None:
+                log.turn(state, policy.history, "", None, action_ben, turn, human_feedback)  # Ben's move happened
             break
+        if policy.last is not None:
+            timings.append(policy.last.timings)
+        print(f"(Kontext ~{policy.history.last_prompt_tokens} Tokens)")
 
-        data = extract_json_block(content)
-        if not data:
+        if ava_turn is None:
             print("KI-Antwort kein valides JSON. Runde übersprungen.")
-            history.append({"role": "assistant", "content": content})
-            history.append({"role": "user", "content": "Bitte striktes JSON liefern."})
+            if log is not None:
+                log.turn(
+                    state, policy.history, policy.last.content if policy.last else "", None, action_ben, turn,
+                    human_feedback,
+                )
             continue
 
-        thoughts = str(data.get("thoughts", ""))
-        action_ava = str(data.get("action", "wait"))
-        speech = str(data.get("speech", ""))
-        design_feedback = str(data.get("design_feedback", ""))
-        self_update = str(data.get("self_update", ""))
-
-        print("Ava denkt:", thoughts)
-        if speech:
-            print("Ava sagt:", speech)
-        world_ava = apply_action(state, "ava", action_ava)
-        print("Welt (Ava):", world_ava)
-        if design_feedback:
-            print("Ava-Feedback:", design_feedback)
-        if self_update:
-            state["notes"] = (state.get("notes", "") + " | " + self_update).strip(" |")
-
-        # Mutual influence log
-        state["log"].append({
-            "turn": turn,
-            "ben_action": action_ben,
-            "ava_action": action_ava,
-            "human_feedback": human_feedback,
-            "ava_feedback": design_feedback,
-        })
+        print("Ava denkt:", ava_turn.thoughts)
+        if ava_turn.speech and not spoke:
+            print("Ava sagt:", ava_turn.speech)
+        events = ava_round(engine, ava_turn, action_ben, human_feedback, turn)
+        print("Welt (Ava):", events[0].text)
+        if ava_turn.design_feedback:
+            print("Ava-Feedback:", ava_turn.design_feedback)
 
         # Feed back to model
-        fb = (
-            f"Weltreaktionen – Ben: {world_ben}; Ava: {world_ava}. "
-            f"Neuer Zustand: Ava@{state['pos']['ava']}, Ben@{state['pos']['ben']}."
-        )
-        history.append({"role": "assistant", "content": content})
-        history.append({"role": "user", "content": fb})
+        policy.observe(state, events)
+        if log is not None:
+            log.turn(
+                state, policy.history, policy.last.content if policy.last else "", ava_turn, action_ben, turn,
+                human_feedback,
+            )
+
+    if log is not None:
+        print(log.close(state, policy.history))
+    print(summarize_timings(timings))
+    print(policy.history.report())
+    print(validity_stats("coplay").report())
+    print(llm_metrics.summary("coplay"))
@@ -1,11 +1,27 @@
+import os
 import pygame
-from typing import Tuple, Dict, Any, List
-from .llm_client import chat, ensure_ollama_up, parse_ava_turn
-from .schemas import AvaTurn
+from typing import Tuple, Dict, Any, Optional, get_args
+from . import llm_metrics
+from .llm_client import TurnResult, ensure_ollama_up, validity_stats
+from .context_window import ContextWindow
+from .llm_worker import LLMWorker
+from .engine import GridEngine
+from .gui_render import Camera, Glyph, GridRenderer, TextCache
+from .perception import sight
+from .schemas import Action, AvaTurn
+from .tilemap import TileMap, items_in_rect
 
 CELL = 32
-GRID = (15, 10)  # cols, rows
-WIN = (GRID[0] * CELL, GRID[1] * CELL + 140)
+GRID = (15, 10)  # visible cols, rows; also the classic world size
+HUD_H = 180
+LINE_H = 20
+WIN = (GRID[0] * CELL, GRID[1] * CELL + HUD_H)
+
+# Larger worlds, e.g. NEWTRY3_COPLAY_WORLD=1000x1000: chunked, generated on
+# demand, and the camera follows Ben
+ENV_WORLD = "NEWTRY3_COPLAY_WORLD"
+WALL_RATE = 0.08
+ITEM_RATE = 0.01
 
 SYSTEM = (
     "Du bist 'Ava', eine KI-Figur in einer 2D-Gitterwelt mit einem Menschen (Ben). "
@@ -14,75 +30,125 @@ SYSTEM = (
 )
 
 
-def clamp_pos(pos: Tuple[int, int]) -> Tuple[int, int]:
-    x, y = pos
-    x = max(0, min(GRID[0] - 1, x))
-    y = max(0, min(GRID[1] - 1, y))
-    return x, y
-
-
-def apply_action(state: Dict[str, Any], who: str, action: str) -> str:
-    key = "ava" if who == "ava" else "ben"
-    x, y = state["pos"][key]
-    if action == "move_up":
-        y -= 1
-    elif action == "move_down":
-        y += 1
-    elif action == "move_left":
-        x -= 1
-    elif action == "move_right":
-        x += 1
-    # wait/interact: no movement change
-    state["pos"][key] = clamp_pos((x, y))
-    return f"{who} {action} -> {state['pos'][key]}"
-
-
-def draw_grid(screen, items: Dict[Tuple[int, int], str]):
-    screen.fill((18, 18, 22))
-    for x in range(GRID[0]):
-        for y in range(GRID[1]):
-            rect = pygame.Rect(x * CELL, y * CELL, CELL, CELL)
-            pygame.draw.rect(screen, (38, 38, 48), rect, 1)
-    # draw items
-    for (ix, iy), name in items.items():
-        cx = ix * CELL + CELL // 2
-        cy = iy * CELL + CELL // 2
-        pygame.draw.circle(screen, (240, 210, 60), (cx, cy), 6)
-
-
-def draw_hud(screen, font, state: Dict[str, Any], turn: int):
-    panel = pygame.Rect(0, GRID[1] * CELL, WIN[0], 140)
+BEN_COLOR = (100, 220, 100)
+AVA_COLOR = (80, 180, 250)
+ITEM_COLOR = (240, 210, 60)
+WALL_COLOR = (70, 70, 84)
+
+
+def world_size() -> Tuple[int, int]:
+    """World size from NEWTRY3_COPLAY_WORLD ("1000x1000" or "1000"); GRID otherwise."""
+    raw = os.environ.get(ENV_WORLD, "").lower().replace("×", "x").strip()
+    try:
+        w, _, h = raw.partition("x")
+        size = (int(w), int(h or w))
+    except ValueError:
+        return GRID
+    return (max(GRID[0], size[0]), max(GRID[1], size[1]))
+
+
+def make_engine(size: Tuple[int, int]) -> GridEngine:
+    """The classic 15×10 room, or a generated TileMap of `size` with the same start layout around Ben."""
+    if size == GRID:
+        return GridEngine(GRID, start={"ben": (1, 1)}, items={(3, 3): "Schlüssel", (8, 2): "Apfel"})
+    ox, oy = size[0] // 2 - 6, size[1] // 2 - 4  # Ben at the same offset from Ava as in the classic room
+    tiles = TileMap(size, seed=0, wall_rate=WALL_RATE, item_rate=ITEM_RATE)
+    return GridEngine(
+        size,
+        start={"ben": (ox, oy)},
+        items={(ox + 2, oy + 2): "Schlüssel", (ox + 7, oy + 1): "Apfel"},
+        tilemap=tiles,
+    )
+
+
+def scene(
+    state: Dict[str, Any], camera: Optional[Camera] = None, tiles: Optional[TileMap] = None
+) -> Dict[Tuple[int, int], Tuple[Glyph, ...]]:
+    """Visible cells, relative to the camera, and what to draw there (walls, items below Ben below Ava)."""
+    camera = camera or Camera(GRID, GRID)
+    rect = camera.rect()
+    cells: Dict[Tuple[int, int], Tuple[Glyph, ...]] = {}
+    if tiles is not None:
+        tiles.ensure(rect)
+        for pos in tiles.walls_in(rect):
+            cells[camera.to_view(pos)] = (("wall", WALL_COLOR),)  # type: ignore[index]
+    for pos, _ in items_in_rect(state["items"], rect):
+        cells[camera.to_view(pos)] = (("item", ITEM_COLOR),)  # type: ignore[index]
+    for who, color in (("ben", BEN_COLOR), ("ava", AVA_COLOR)):
+        view = camera.to_view(tuple(state["pos"][who]))  # type: ignore[arg-type]
+        if view is not None:
+            cells[view] = cells.get(view, ()) + (("agent", color),)
+    return cells
+
+
+def hud_key(state: Dict[str, Any], turn: int) -> Tuple[Any, ...]:
+    """Everything draw_hud shows; the HUD is only redrawn when this changes."""
+    dots = pygame.time.get_ticks() // 400 % 4 if state.get("thinking") else -1
+    ben_pos = state["pos"]["ben"]
+    return (
+        turn, dots, state.get("pending_ben"), state.get("hint"), state["pos"]["ava"], ben_pos,
+        state.get("ttfo_ms"), state.get("prompt_tokens"), state.get("speech"), state.get("thoughts"),
+        state.get("feedback"), tuple(state["inv"]["ben"]), tuple(state["inv"]["ava"]), state["items"].get(ben_pos),
+    )
+
+
+def draw_hud(screen, text: TextCache, state: Dict[str, Any], turn: int):
+    panel = pygame.Rect(0, GRID[1] * CELL, WIN[0], HUD_H)
     pygame.draw.rect(screen, (15, 15, 18), panel)
+    screen.set_clip(panel)
+    width = WIN[0] - 16
+    # optionally show item under Ben; the first line wraps around it
+    ben_pos = state['pos']['ben']
+    floor = None
+    if ben_pos in state.get('items', {}):
+        floor = text.render(f"Am Boden: {state['items'][ben_pos]} (E)", (230, 230, 180))
+        screen.blit(floor, (WIN[0] - floor.get_width() - 8, GRID[1] * CELL + 8))
     line1 = f"Enter=Zug | WASD/Pfeile bewegen, E=interact | Ben: {state.get('pending_ben','wait')} | Hinweis: {state.get('hint','')}"
     line2 = f"Turn: {turn}  Ava@{state['pos']['ava']}  Ben@{state['pos']['ben']}"
-    txt1 = font.render(line1, True, (230, 230, 230))
-    txt2 = font.render(line2, True, (200, 200, 200))
-    screen.blit(txt1, (8, GRID[1] * CELL + 8))
-    screen.blit(txt2, (8, GRID[1] * CELL + 34))
+    if state.get("world_size", GRID) != GRID:
+        line2 += f"  Welt {state['world_size'][0]}×{state['world_size'][1]}"
+    if state.get("ttfo_ms") is not None:
+        line2 += f"  Erste Ausgabe: {state['ttfo_ms']:.0f} ms"
+    if state.get("prompt_tokens"):
+        line2 += f"  Kontext: ~{state['prompt_tokens']} Tok"
+    line1_width = width - (floor.get_width() + 16 if floor else 0)
+    text.blit_wrapped(screen, line1, (230, 230, 230), (8, GRID[1] * CELL + 8), line1_width, max_lines=1)
+    text.blit(screen, line2, (200, 200, 200), (8, GRID[1] * CELL + 34))
     inv_ben = ",".join(state.get("inv", {}).get("ben", [])) or "(leer)"
     inv_ava = ",".join(state.get("inv", {}).get("ava", [])) or "(leer)"
-    screen.blit(font.render(f"Ben-Inventar: {inv_ben}", True, (200,220,200)), (8, GRID[1]*CELL + 56))
-    screen.blit(font.render(f"Ava-Inventar: {inv_ava}", True, (200,210,240)), (8, GRID[1]*CELL + 78))
+    text.blit(screen, f"Ben-Inventar: {inv_ben}", (200, 220, 200), (8, GRID[1] * CELL + 56))
+    text.blit(screen, f"Ava-Inventar: {inv_ava}", (200, 210, 240), (8, GRID[1] * CELL + 78))
+    fields = (
+        (f"Ava sagt: {state['speech']}" if state.get("speech") else "", (180, 220, 255)),
+        (f"Gedanken: {state['thoughts']}" if state.get("thoughts") else "", (220, 200, 160)),
+        (f"Feedback: {state['feedback']}" if state.get("feedback") else "", (200, 220, 200)),
+    )
     y = GRID[1] * CELL + 100
-    if state.get("speech"):
-        txt3 = font.render(f"Ava sagt: {state['speech'][:80]}", True, (180, 220, 255))
-        screen.blit(txt3, (8, y))
-        y += 22
-    if state.get("thoughts"):
-        txt4 = font.render(f"Gedanken: {state['thoughts'][:80]}", True, (220, 200, 160))
-        screen.blit(txt4, (8, y))
-        y += 22
-    if state.get("feedback"):
-        txt5 = font.render(f"Feedback: {state['feedback'][:80]}", True, (200, 220, 200))
-        screen.blit(txt5, (8, y))
-    # optionally show item under Ben
-    ben_pos = state['pos']['ben']
-    if ben_pos in state.get('items', {}):
-        it = state['items'][ben_pos]
-        screen.blit(font.render(f"Am Boden: {it} (E)", True, (230, 230, 180)), (WIN[0]-200, GRID[1]*CELL + 8))
+    for line, color in fields:
+        room = (panel.bottom - y) // LINE_H
+        if line and room > 0:
+            y = text.blit_wrapped(screen, line, color, (8, y), width, max_lines=min(2, room), line_height=LINE_H)
+    if state.get("thinking"):
+        dots = "." * (pygame.time.get_ticks() // 400 % 4)
+        busy = text.render(f"Ava denkt nach{dots}  (Esc=Abbrechen)", (250, 210, 120))
+        screen.blit(busy, (WIN[0] - busy.get_width() - 8, GRID[1] * CELL + 34))
+    screen.set_clip(None)
+
 
+def draw_frame(
+    renderer: GridRenderer,
+    text: TextCache,
+    state: Dict[str, Any],
+    turn: int,
+    camera: Optional[Camera] = None,
+    tiles: Optional[TileMap] = None,
+) -> None:
+    if camera is not None:
+        camera.follow(tuple(state["pos"]["ben"]))  # type: ignore[arg-type]
+    renderer.render(scene(state, camera, tiles), hud_key(state, turn), lambda screen: draw_hud(screen, text, state, turn))
 
-def run_coplay_gui(max_turns: int = 100):
+
+def run_coplay_gui(max_turns: int = 100, world: Optional[Tuple[int, int]] = None):
     if not ensure_ollama_up(verbose=True):
         print("Bitte starte Ollama und lade 'gemma3:1b'.")
         return
@@ -91,23 +157,26 @@ def run_coplay_gui(max_turns: int = 100):
     screen = pygame.display.set_mode(WIN)
     pygame.display.set_caption("Co-Play GUI – Ava (KI) & Ben (Mensch)")
     clock = pygame.time.Clock()
-    font = pygame.font.SysFont(None, 22)
+    text = TextCache(pygame.font.SysFont(None, 22))
+    renderer = GridRenderer(screen, GRID, CELL, pygame.Rect(0, GRID[1] * CELL, WIN[0], HUD_H), bg=(18, 18, 22), line=(38, 38, 48))
 
-    state: Dict[str, Any] = {
-        "pos": {"ava": (GRID[0] // 2, GRID[1] // 2), "ben": (1, 1)},
+    size = world or world_size()
+    engine = make_engine(size)
+    camera = Camera(GRID, size)
+    state: Dict[str, Any] = engine.reset()
+    # UI-only keys live next to the engine state
+    state.update({
+        "world_size": size,
         "hint": "",
         "pending_ben": "wait",
-        "speech": "",
-        "thoughts": "",
-        "feedback": "",
-        "items": {(3, 3): "Schlüssel", (8, 2): "Apfel"},
-        "inv": {"ben": [], "ava": []},
-    }
-
-    history: List[Dict[str, str]] = [
-        {"role": "system", "content": SYSTEM},
-        {"role": "user", "content": f"Startpositionen: Ava@{state['pos']['ava']}, Ben@{state['pos']['ben']} auf {GRID}."}
-    ]
+        "ttfo_ms": None,
+        "thinking": False,
+    })
+
+    history = ContextWindow(SYSTEM)
+    history.add(
+        "user", f"Startpositionen: Ava@{state['pos']['ava']}, Ben@{state['pos']['ben']} auf {size}. {sight(engine)}"
+    )
 
     def set_ben_action_from_key(key: int):
         if key in (pygame.K_UP, pygame.K_w):
@@ -121,62 +190,94 @@ def run_coplay_gui(max_turns: int = 100):
         elif key == pygame.K_e:
             state["pending_ben"] = "interact"
 
-    def pickup_if_any(who: str) -> str:
-        p = tuple(state["pos"]["ava" if who == "ava" else "ben"])  # type: ignore
-        if p in state["items"]:
-            item = state["items"].pop(p)
-            state["inv"]["ava" if who == "ava" else "ben"].append(item)
-            return f"{who} hebt {item} auf."
-        return "Nichts zum Aufheben."
+    def on_stream_event(kind: str, key: str, value: Any) -> None:
+        # Speech shows up while it is generated and Ava moves as soon as her
+        # action is complete, before the remaining fields arrive.
+        if key in ("speech", "thoughts") and isinstance(value, str):
+            state[key] = value
+        elif kind == "field" and key == "action" and value in get_args(Action) and "early_world" not in state:
+            state["early_action"] = value
+            state["early_world"] = engine.act("ava", value)
 
+    def settle(mark: Optional[str] = None) -> None:
+        """Drop the turn's checkpoints, after rolling back to `mark` ("undo_ben" / "undo_ava") if given."""
+        if mark is not None and mark in state:
+            engine.rollback(state[mark])
+        for key in ("undo_ben", "undo_ava", "early_world", "early_action"):
+            state.pop(key, None)
+        engine.commit()
+
+    def finish_turn(result: TurnResult) -> bool:
+        state["ttfo_ms"] = result.timings["ttfo"]
+        early = state.get("early_world")
+        early_action = state.get("early_action")
+        world_ben = state.pop("world_ben", "")
+        ben_action = state.pop("ben_action", "wait")
+        ben_feedback = state.pop("ben_feedback", "")
+        content = result.content
+        parsed: AvaTurn | None = result.parsed
+        if not parsed:
+            # Ben's move stays (his prompt stays in the history), Ava's early move is taken back
+            settle("undo_ava")
+            history.add_retry(content, "Bitte gültiges JSON gemäß Schema liefern.")
+            return False
+        if early is not None and early_action != parsed.action:
+            # the early move came from an attempt that request_turn retried
+            settle("undo_ava")
+            early = None
+        else:
+            settle()
+        world_ava = early if early is not None else engine.act("ava", parsed.action)
+        engine.absorb(parsed, ben_action, ben_feedback, turn + 1)
+        fb = (
+            f"Weltreaktionen – Ben: {world_ben}; Ava: {world_ava}. "
+            f"Neuer Zustand: Ava@{state['pos']['ava']}, Ben@{state['pos']['ben']}."
+        )
+        history.add("assistant", content)
+        history.add("user", fb)
+        return True
+
+    worker = LLMWorker(game="coplay_gui")
     turn = 0
     running = True
     while running and turn < max_turns:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                renderer.invalidate()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
-                    running = False
+                    # Esc cancels a pending turn first, quits otherwise
+                    if worker.cancel():
+                        settle("undo_ben")  # Ben's and Ava's moves of the cancelled turn
+                        state.pop("world_ben", None)
+                        state.pop("ben_action", None)
+                        state.pop("ben_feedback", None)
+                        history.pop()  # unanswered prompt of the cancelled turn
+                    else:
+                        running = False
                 elif event.key == pygame.K_RETURN:
-                    # Execute a co-play turn
+                    if worker.pending:
+                        continue
+                    # Execute a co-play turn: Ben acts now, Ava's answer arrives asynchronously
                     ben_act = state.get("pending_ben", "wait")
-                    world_ben = apply_action(state, "ben", ben_act)
-                    if ben_act == "interact":
-                        world_ben += " | " + pickup_if_any("ben")
+                    state["undo_ben"] = engine.checkpoint()
+                    world_ben = engine.act("ben", ben_act)
+                    state["undo_ava"] = engine.checkpoint()
                     prompt_ai = (
                         f"Zustand: Ava@{state['pos']['ava']}, Ben@{state['pos']['ben']}. "
-                        f"Ben-Aktion: {ben_act}. Weltreaktion: {world_ben}."
+                        f"Ben-Aktion: {ben_act}. Weltreaktion: {world_ben}. {sight(engine)}"
                     )
                     uhint = state.get("hint", "").strip()
                     if uhint:
                         prompt_ai += f" Benutzer-Feedback: {uhint}."
-                    history.append({"role": "user", "content": prompt_ai})
-
-                    try:
-                        content = chat(history)
-                    except Exception as e:
-                        print("KI-Fehler:", e)
-                        running = False
-                        break
-                    parsed: AvaTurn | None = parse_ava_turn(content)
-                    if not parsed:
-                        history.append({"role": "assistant", "content": content})
-                        history.append({"role": "user", "content": "Bitte gültiges JSON gemäß Schema liefern."})
-                    else:
-                        state["speech"] = parsed.speech
-                        state["thoughts"] = parsed.thoughts
-                        state["feedback"] = parsed.design_feedback
-                        world_ava = apply_action(state, "ava", parsed.action)
-                        if parsed.action == "interact":
-                            world_ava += " | " + pickup_if_any("ava")
-                        fb = (
-                            f"Weltreaktionen – Ben: {world_ben}; Ava: {world_ava}. "
-                            f"Neuer Zustand: Ava@{state['pos']['ava']}, Ben@{state['pos']['ben']}."
-                        )
-                        history.append({"role": "assistant", "content": content})
-                        history.append({"role": "user", "content": fb})
-                        turn += 1
+                    history.add("user", prompt_ai)
+                    state["world_ben"] = world_ben
+                    state["ben_action"] = ben_act
+                    state["ben_feedback"] = uhint
+                    worker.submit(history.messages(), turn=turn + 1)
+                    state["prompt_tokens"] = history.last_prompt_tokens
                     # reset for next turn
                     state["pending_ben"] = "wait"
                     state["hint"] = ""
@@ -188,19 +289,26 @@ def run_coplay_gui(max_turns: int = 100):
                     # also capture movement keys
                     set_ben_action_from_key(event.key)
 
-    # Draw world
-    draw_grid(screen, state["items"])
-    # Draw Ben (green) and Ava (blue)
-    bx, by = state["pos"]["ben"]
-    ax, ay = state["pos"]["ava"]
-    ben_rect = pygame.Rect(bx * CELL + 4, by * CELL + 4, CELL - 8, CELL - 8)
-    ava_rect = pygame.Rect(ax * CELL + 4, ay * CELL + 4, CELL - 8, CELL - 8)
-    pygame.draw.rect(screen, (100, 220, 100), ben_rect)
-    pygame.draw.rect(screen, (80, 180, 250), ava_rect)
-
-    draw_hud(screen, font, state, turn)
+        for kind, _, payload in worker.poll():
+            if kind == "event":
+                on_stream_event(*payload)
+            elif kind == "done":
+                if finish_turn(payload):
+                    turn += 1
+            else:
+                print("KI-Fehler:", payload)
+                running = False
 
-    pygame.display.flip()
-    clock.tick(60)
+        state["thinking"] = worker.pending
+        draw_frame(renderer, text, state, turn, camera, engine.tilemap)
+        clock.tick(60)
 
+    worker.close()
+    print(renderer.report())
+    if engine.tilemap:
+        print(engine.tilemap.report())
+    print(text.report())
+    print(history.report())
+    print(validity_stats("coplay_gui").report())
+    print(llm_metrics.summary("coplay_gui"))
     pygame.quit()
@@ -1,12 +1,19 @@
-from typing import Tuple, Dict, Any, List
-from .llm_client import chat, ensure_ollama_up, parse_ava_turn
-from .schemas import AvaTurn, WorldPatch
+from typing import Tuple, Dict, Any, get_args
+from . import llm_metrics
+from .llm_client import TurnResult, ensure_ollama_up, validity_stats
+from .context_window import ContextWindow
+from .llm_worker import LLMWorker
+from .engine import GridEngine
+from .gui_render import GridRenderer, TextCache
+from .schemas import Action, AvaTurn
 import pygame  # type: ignore
 
 
 CELL = 32
 GRID = (15, 10)
-WIN = (GRID[0] * CELL, GRID[1] * CELL + 140)
+HUD_H = 180
+LINE_H = 20
+WIN = (GRID[0] * CELL, GRID[1] * CELL + HUD_H)
 
 SYSTEM = (
     "Du bist 'Ava', eine KI-Figur in einer 2D-Gitterwelt. Antworte als JSON gemäß Schema: "
@@ -14,68 +21,95 @@ SYSTEM = (
 )
 
 
-def draw_grid(screen: pygame.Surface) -> None:
-    screen.fill((20, 20, 25))
-    for x in range(GRID[0]):
-        for y in range(GRID[1]):
-            rect = pygame.Rect(x * CELL, y * CELL, CELL, CELL)
-            pygame.draw.rect(screen, (40, 40, 50), rect, 1)
-
-
-def clamp_pos(pos: Tuple[int, int]) -> Tuple[int, int]:
-    x, y = pos
-    x = max(0, min(GRID[0] - 1, x))
-    y = max(0, min(GRID[1] - 1, y))
-    return x, y
-
-
-def apply_action(state: Dict[str, Any], action: str) -> str:
-    x, y = state["pos"]
-    if action == "move_up":
-        y -= 1
-    elif action == "move_down":
-        y += 1
-    elif action == "move_left":
-        x -= 1
-    elif action == "move_right":
-        x += 1
-    # wait/interact: no movement
-    state["pos"] = clamp_pos((x, y))
-    return f"Ava {action} -> {state['pos']}"
-
-
-def _apply_world_patch(state: Dict[str, Any], wp: WorldPatch) -> None:
-    # In GUI-Variante halten wir Patches klein; Notizen anzeigen
-    if wp.set_goal:
-        state["notes"] = (state.get("notes", "") + f" | Ziel: {wp.set_goal}").strip(" |")
-
-
-def _step_ai(history: List[Dict[str, str]], state: Dict[str, Any]) -> bool:
-    try:
-        content = chat(history)
-    except Exception as e:
-        print("KI-Fehler:", e)
-        return False
-    parsed: AvaTurn | None = parse_ava_turn(content)
+def _on_stream_event(engine: GridEngine, kind: str, key: str, value: Any) -> None:
+    state = engine.state
+    # Speech is shown as it arrives and the move is applied as soon as the
+    # action field is complete, before the memory fields finish generating.
+    if key in ("speech", "thoughts") and isinstance(value, str):
+        state[key] = value
+    elif kind == "field" and key == "action" and value in get_args(Action) and "early_reaction" not in state:
+        state["early_action"] = value
+        state["early_reaction"] = engine.act("ava", value)
+
+
+def _settle(engine: GridEngine, rollback: bool) -> None:
+    """Drop the turn's checkpoint, taking the early move back first if `rollback`."""
+    state = engine.state
+    mark = state.pop("turn_mark", None)
+    if rollback and mark is not None:
+        engine.rollback(mark)
+    state.pop("early_reaction", None)
+    state.pop("early_action", None)
+    engine.commit()
+
+
+def _finish_ai(history: ContextWindow, engine: GridEngine, result: TurnResult) -> bool:
+    state = engine.state
+    state["ttfo_ms"] = result.timings["ttfo"]
+    early = state.get("early_reaction")
+    content = result.content
+    parsed: AvaTurn | None = result.parsed
     if not parsed:
-        history.append({"role": "assistant", "content": content})
-        history.append({"role": "user", "content": "Bitte antworte strikt als JSON im vereinbarten Schema."})
+        _settle(engine, rollback=True)
+        history.add_retry(content, "Bitte antworte strikt als JSON im vereinbarten Schema.")
         return False
-
-    world_reaction = apply_action(state, parsed.action)
-    state["speech"] = parsed.speech
-    state["thoughts"] = parsed.thoughts
-    state["perceptions"] = parsed.perceptions or ""
-    state["wishes"] = parsed.wishes or ""
-    state["fears"] = parsed.fears or ""
-    if parsed.world_patch:
-        _apply_world_patch(state, parsed.world_patch)
-
-    history.append({"role": "assistant", "content": content})
-    history.append({"role": "user", "content": f"Welt: {world_reaction}. Zustand: pos={state['pos']}."})
+    # an early move from an attempt that request_turn retried does not count
+    stale = early is not None and state.get("early_action") != parsed.action
+    _settle(engine, rollback=stale)
+    world_reaction = early if early is not None and not stale else engine.act("ava", parsed.action)
+    engine.absorb(parsed)
+
+    history.add("assistant", content)
+    history.add("user", f"Welt: {world_reaction}. Zustand: pos={state['pos']['ava']}.")
     return True
 
 
+def _hud_key(state: Dict[str, Any], turn: int) -> Tuple[Any, ...]:
+    dots = pygame.time.get_ticks() // 400 % 4 if state.get("thinking") else -1
+    return (turn, dots) + tuple(
+        state.get(k) for k in ("auto", "hint", "ttfo_ms", "prompt_tokens", "speech", "thoughts",
+                               "perceptions", "wishes", "fears", "notes")
+    ) + (state["pos"]["ava"],)
+
+
+def _draw_panel(screen: pygame.Surface, text: TextCache, state: Dict[str, Any], turn: int) -> None:
+    panel = pygame.Rect(0, GRID[1] * CELL, WIN[0], HUD_H)
+    pygame.draw.rect(screen, (15, 15, 18), panel)
+    screen.set_clip(panel)
+    width = WIN[0] - 16
+    text.blit_wrapped(
+        screen, f"Enter=Zug  Space=Auto {'ON' if state.get('auto') else 'OFF'}  | Hinweis: {state.get('hint','')}",
+        (230, 230, 230), (8, GRID[1] * CELL + 8), width, max_lines=1,
+    )
+    if state.get("thinking"):
+        dots = "." * (pygame.time.get_ticks() // 400 % 4)
+        busy = text.render(f"Ava denkt nach{dots}  (Esc=Abbrechen)", (250, 210, 120))
+        screen.blit(busy, (WIN[0] - busy.get_width() - 8, GRID[1] * CELL + 30))
+    ttfo = f"  Erste Ausgabe: {state['ttfo_ms']:.0f} ms" if state.get("ttfo_ms") is not None else ""
+    if state.get("prompt_tokens"):
+        ttfo += f"  Kontext: ~{state['prompt_tokens']} Tok"
+    text.blit(screen, f"Pos: {state['pos']['ava']}  Turn: {turn}{ttfo}", (200, 200, 200), (8, GRID[1] * CELL + 30))
+    wishes = state.get("wishes", ""); fears = state.get("fears", "")
+    fields = (
+        (f"Ava: {state['speech']}" if state.get("speech") else "", (180, 220, 255)),
+        (f"Gedanken: {state['thoughts']}" if state.get("thoughts") else "", (220, 200, 160)),
+        (f"Wahrnehmung: {state['perceptions']}" if state.get("perceptions") else "", (200, 230, 200)),
+        (f"Wünsche/Ängste: {wishes} | {fears}" if wishes or fears else "", (230, 200, 200)),
+        (f"Notizen: {state['notes']}" if state.get("notes") else "", (210, 210, 210)),
+    )
+    y = GRID[1] * CELL + 52
+    for line, color in fields:
+        room = (panel.bottom - y) // LINE_H
+        if line and room > 0:
+            y = text.blit_wrapped(screen, line, color, (8, y), width, max_lines=min(2, room), line_height=LINE_H)
+    screen.set_clip(None)
+
+
+def _draw_frame(renderer: GridRenderer, text: TextCache, state: Dict[str, Any], turn: int) -> None:
+    cells = {state["pos"]["ava"]: (("agent", (80, 180, 250)),)}
+    renderer.render(cells, _hud_key(state, turn), lambda screen: _draw_panel(screen, text, state, turn))
+
+
 def run_lifesim_gui(max_turns: int = 50) -> None:
     if not ensure_ollama_up(verbose=True):
         print("Bitte starte Ollama und lade 'gemma3:1b'.")
@@ -85,24 +119,28 @@ def run_lifesim_gui(max_turns: int = 50) -> None:
     screen = pygame.display.set_mode(WIN)
     pygame.display.set_caption("LifeSim GUI – Ava (KI)")
     clock = pygame.time.Clock()
-    font = pygame.font.SysFont(None, 22)
+    text = TextCache(pygame.font.SysFont(None, 22))
+    renderer = GridRenderer(screen, GRID, CELL, pygame.Rect(0, GRID[1] * CELL, WIN[0], HUD_H))
 
-    state: Dict[str, Any] = {
-        "pos": (GRID[0] // 2, GRID[1] // 2),
+    engine = GridEngine(GRID, agents=("ava",))
+    state: Dict[str, Any] = engine.reset()
+    # UI-only keys live next to the engine state
+    state.update({
         "hint": "",
-        "speech": "",
-        "thoughts": "",
-        "perceptions": "",
-        "wishes": "",
-        "fears": "",
-        "notes": "",
         "auto": False,
-    }
+        "ttfo_ms": None,
+        "thinking": False,
+    })
+
+    history = ContextWindow(SYSTEM)
+    history.add("user", f"Startposition: {state['pos']['ava']} auf einem leeren Gitter. Warte auf deine Aktion.")
 
-    history: List[Dict[str, str]] = [
-        {"role": "system", "content": SYSTEM},
-        {"role": "user", "content": f"Startposition: {state['pos']} auf einem leeren Gitter. Warte auf deine Aktion."}
-    ]
+    worker = LLMWorker(game="lifesim_gui")
+
+    def start_turn() -> None:
+        state["turn_mark"] = engine.checkpoint()
+        worker.submit(history.messages(), turn=turn + 1)
+        state["prompt_tokens"] = history.last_prompt_tokens
 
     turn = 0
     auto_frames = 0
@@ -111,61 +149,59 @@ def run_lifesim_gui(max_turns: int = 50) -> None:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                renderer.invalidate()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
-                    running = False
+                    # Esc cancels a pending turn first, quits otherwise
+                    if worker.cancel():
+                        _settle(engine, rollback=True)
+                        state["auto"] = False
+                    else:
+                        running = False
                 elif event.key == pygame.K_SPACE:
                     state["auto"] = not state.get("auto", False)
                     auto_frames = 0
                 elif event.key == pygame.K_RETURN:
+                    if worker.pending:
+                        continue
                     hint = state.get("hint", "").strip()
                     if hint:
-                        history.append({"role": "user", "content": f"Benutzer-Hinweis: {hint}"})
+                        history.add("user", f"Benutzer-Hinweis: {hint}")
                         state["hint"] = ""
-                    if _step_ai(history, state):
-                        turn += 1
+                    start_turn()
                 elif event.key == pygame.K_BACKSPACE:
                     state["hint"] = state.get("hint", "")[:-1]
                 else:
                     if event.unicode and event.unicode.isprintable():
                         state["hint"] = state.get("hint", "") + event.unicode
 
-        # Auto-step pacing (every ~40 frames)
-        if running and state.get("auto", False):
+        # Deliver streamed fields / finished turns from the worker
+        for kind, _, payload in worker.poll():
+            if kind == "event":
+                _on_stream_event(engine, *payload)
+            elif kind == "done":
+                if _finish_ai(history, engine, payload):
+                    turn += 1
+            else:
+                print("KI-Fehler:", payload)
+                state["auto"] = False
+
+        # Auto-step pacing (every ~40 frames once the previous turn is done)
+        if running and state.get("auto", False) and not worker.pending:
             auto_frames += 1
             if auto_frames >= 40:
-                if _step_ai(history, state):
-                    turn += 1
+                start_turn()
                 auto_frames = 0
 
-        draw_grid(screen)
-        ax, ay = state["pos"]
-        rect = pygame.Rect(ax * CELL + 4, ay * CELL + 4, CELL - 8, CELL - 8)
-        pygame.draw.rect(screen, (80, 180, 250), rect)
-
-        panel = pygame.Rect(0, GRID[1] * CELL, WIN[0], 140)
-        pygame.draw.rect(screen, (15, 15, 18), panel)
-        txt = font.render(
-            f"Enter=Zug  Space=Auto {'ON' if state.get('auto') else 'OFF'}  | Hinweis: {state.get('hint','')}",
-            True, (230, 230, 230)
-        )
-        screen.blit(txt, (8, GRID[1] * CELL + 8))
-        pos_txt = font.render(f"Pos: {state['pos']}  Turn: {turn}", True, (200, 200, 200))
-        screen.blit(pos_txt, (8, GRID[1] * CELL + 30))
-        y = GRID[1] * CELL + 52
-        if state.get("speech"):
-            screen.blit(font.render(f"Ava: {state['speech'][:90]}", True, (180, 220, 255)), (8, y)); y += 20
-        if state.get("thoughts"):
-            screen.blit(font.render(f"Gedanken: {state['thoughts'][:90]}", True, (220, 200, 160)), (8, y)); y += 20
-        if state.get("perceptions"):
-            screen.blit(font.render(f"Wahrnehmung: {state['perceptions'][:90]}", True, (200, 230, 200)), (8, y)); y += 20
-        wishes = state.get("wishes", ""); fears = state.get("fears", "")
-        if wishes or fears:
-            screen.blit(font.render(f"Wünsche/Ängste: {wishes[:40]} | {fears[:40]}", True, (230, 200, 200)), (8, y)); y += 20
-        if state.get("notes"):
-            screen.blit(font.render(f"Notizen: {state['notes'][:90]}", True, (210, 210, 210)), (8, y))
-
-        pygame.display.flip()
+        state["thinking"] = worker.pending
+        _draw_frame(renderer, text, state, turn)
         clock.tick(60)
 
+    worker.close()
+    print(renderer.report())
+    print(text.report())
+    print(history.report())
+    print(validity_stats("lifesim_gui").report())
+    print(llm_metrics.summary("lifesim_gui"))
     pygame.quit()
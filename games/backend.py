@@ -0,0 +1,50 @@
+import os
+from typing import Dict
+from urllib.parse import urlsplit
+
+from .http_pool import ConnectionPool
+
+# Where Ollama lives and the shared connection pool. Kept free of pydantic and
+# the game modules so `main.py --check` stays cheap; llm_client re-exports all
+# of it.
+
+# Backend address, read per request from OLLAMA_HOST (the variable the ollama
+# CLI uses too), e.g. "127.0.0.1:11435" or "http://gpu-box:11434".
+# `main.py --ollama-url` and `--mock` set it for the launcher's child processes.
+ENV_HOST = "OLLAMA_HOST"
+DEFAULT_HOST = "http://localhost:11434"
+
+# One keep-alive pool for every game in this process
+POOL = ConnectionPool(maxsize=4)
+
+
+def base_url() -> str:
+    raw = os.environ.get(ENV_HOST, "").strip() or DEFAULT_HOST
+    if "://" not in raw:
+        raw = "http://" + raw
+    raw = raw.rstrip("/")
+    if urlsplit(raw).port is None:
+        raw += ":11434"
+    return raw
+
+
+def set_base_url(url: str) -> None:
+    os.environ[ENV_HOST] = url
+
+
+def connection_stats() -> Dict[str, int]:
+    """Counters for new vs. reused backend connections."""
+    return POOL.snapshot()
+
+
+def ensure_ollama_up(verbose: bool = False) -> bool:
+    try:
+        status, _, _ = POOL.request("GET", base_url() + "/api/tags", timeout=2)
+        if status == 200:
+            if verbose:
+                print("Ollama server erreichbar.")
+            return True
+    except Exception as e:
+        if verbose:
+            print(f"Ollama scheint nicht zu laufen auf {base_url()}", e)
+    return False
@@ -0,0 +1,628 @@
+import builtins
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import registry
+from .mock_ollama import MockOllama, MockProfile
+
+# Benchmark suite against the mock backend. Every benchmark returns flat
+# metrics; results are written as JSON and can be compared with a stored
+# baseline:
+#
+#   python -m games.bench --out bench.json
+#   python -m games.bench --save-baseline bench_baseline.json
+#   python -m games.bench --baseline bench_baseline.json   # exit code 1 on regression
+#   python -m games.bench --only imports                    # exit code 1 over the import budget
+#
+# Metrics ending in _per_sec or _rate are better when higher, all others
+# (milliseconds, tokens) when lower.
+
+Metrics = Dict[str, float]
+
+# Deterministic, fast backend so numbers reflect our code rather than the model
+BENCH_PROFILE = MockProfile(ttft=0.02, tokens_per_sec=1000)
+
+GAME_IDS = registry.ids()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    idx = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _summary(prefix: str, samples_s: Sequence[float]) -> Metrics:
+    ms = [s * 1000 for s in samples_s]
+    if not ms:
+        return {}
+    return {
+        f"{prefix}.median_ms": statistics.median(ms),
+        f"{prefix}.p95_ms": _percentile(ms, 0.95),
+        f"{prefix}.max_ms": max(ms),
+    }
+
+
+# -- end-to-end console turns --------------------------------------------------------
+
+def _scripted_input(answers: Callable[[str], str], marker: str, marks: List[float]) -> Callable[..., str]:
+    def fake_input(prompt: str = "") -> str:
+        if marker in prompt:
+            marks.append(time.perf_counter())
+        return answers(prompt)
+    return fake_input
+
+
+def bench_turn_latency(turns: int) -> Metrics:
+    """Wall time per turn of run_lifesim/run_coplay, including prompt building and rules."""
+    from .ai_coplay import run_coplay
+    from .ai_lifesim import run_lifesim
+
+    out: Metrics = {}
+    real_input = builtins.input
+    # sessions are journaled like a real run; the folder lives for all cases
+    with tempfile.TemporaryDirectory(prefix="bench_journal_") as folder:
+        cases = (
+            ("lifesim", lambda: run_lifesim(turns, os.path.join(folder, "lifesim.jsonl")), "Weiter mit Enter",
+             lambda p: "", True),
+            ("coplay", lambda: run_coplay(turns + 1, os.path.join(folder, "coplay.jsonl")), "Ben Aktion",
+             lambda p: "d" if "Ben Aktion" in p else "", False),
+        )
+        for name, run, marker, answers, from_start in cases:
+            marks: List[float] = []
+            builtins.input = _scripted_input(answers, marker, marks)
+            start = time.perf_counter()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    run()
+            finally:
+                builtins.input = real_input
+            points = ([start] if from_start else []) + marks
+            out.update(_summary(f"turn_latency.{name}", [b - a for a, b in zip(points, points[1:])]))
+    return out
+
+
+# -- parser throughput -------------------------------------------------------------------
+
+_REAL_OUTPUTS = [
+    '{"thoughts": "Der Flur ist dunkel", "action": "move_up", "speech": "Ich gehe nach Norden.", '
+    '"design_feedback": "Eine Lampe im Flur wäre schön.", "experience": "Ich bin im Flur."}',
+    '{"thoughts": "Ein Schlüssel!", "action": "interact", "speech": "Den nehme ich mit.", "design_feedback": "", '
+    '"world_patch": {"set_goal": "Öffne die Tür im Flur"}, "insights": "Schlüssel öffnen Türen"}',
+    '```json\n{"thoughts": "Hmm", "action": "wait", "speech": "Ich warte auf Ben.", "design_feedback": ""}\n```',
+    'Hier ist mein Zug:\n{"thoughts": "Neugierig", "action": "gehe nord", "speech": "Los!", "design_feedback": "",}',
+    '{"thoughts": "Ich erschaffe etwas", "action": "wait", "speech": "Eine Werkstatt!", "design_feedback": "", '
+    '"world_patch": {"create_place": {"name": "Werkstatt", "connect_from": "Flur", "dir": "nord"}}}',
+    '{"thoughts": "Abgeschnitten", "action": "move_left", "speech": "Ich gehe nach West',
+    "{'thoughts': 'Python-Stil', 'action': 'move_down', 'speech': 'Zurück.', 'design_feedback': None}",
+    "Ich kann dazu leider nichts sagen.",
+]
+
+
+def parse_corpus(size: int = 400) -> List[str]:
+    from .mock_ollama import MockBackend
+
+    backend = MockBackend(MockProfile(malformed_rate=0.3), seed=0)
+    corpus = list(_REAL_OUTPUTS)
+    while len(corpus) < size:
+        corpus.append(backend.content_for({}))
+    return corpus
+
+
+def bench_parse(rounds: int) -> Metrics:
+    from .llm_client import parse_ava_turn
+
+    corpus = parse_corpus()
+    valid = sum(1 for text in corpus if parse_ava_turn(text) is not None)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in corpus:
+            parse_ava_turn(text)
+    seconds = time.perf_counter() - start
+    return {
+        "parse.turns_per_sec": rounds * len(corpus) / seconds,
+        "parse.valid_rate": valid / len(corpus),
+    }
+
+
+# -- command grammar ----------------------------------------------------------------------
+
+# Free-text actions as small models phrase them (before the schema limited
+# `action`, and still what lifesim_command/normalize_action receive)
+_REAL_ACTIONS = [
+    "gehe nord", "gehe sued", "gehe ost", "gehe west", "nimm Schlüssel", "öffne tür", "schaue",
+    "Gehe nach Norden", "Ich gehe nach Norden in den Flur.", "laufe richtung süden", "Geh in den Flur",
+    "Ich schaue mich um.", "schaue dich um", "Umsehen", "sieh dich im Raum um", "untersuche den Tisch",
+    "Nimm den Schlüssel", "hebe den Schlüssel auf", "Ich nehme den Schlüssel vom Tisch.", "nimm die Blume",
+    "Öffne die Tür mit dem Schlüssel", "öffne die Türe", "benutze den Schlüssel an der Tür",
+    "gehe zum Fenster", "gehe in den Garten", "gehe zur Blume", "warte", "Ich warte auf Ben.",
+    "move_up", "move_left", "interact", "wait", "sage: Hallo Ben!", "rede mit Ben",
+    "gehe nach norden und nimm den schlüssel", "schaue nach norden", "tanze im Kreis", "denke nach",
+    "pflücke die Blume im Garten", "laufe vorsichtig nach Westen zurück in den Flur",
+]
+
+
+def bench_commands(rounds: int) -> Metrics:
+    """Throughput of the LifeSim command grammar and rules over _REAL_ACTIONS."""
+    from .commands import GRAMMAR
+    from .engine import apply_lifesim_action, initial_lifesim_state
+
+    recognized = sum(1 for text in _REAL_ACTIONS if GRAMMAR.parse(text).verb != "unknown")
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in _REAL_ACTIONS:
+            GRAMMAR.parse(text)  # uncached; apply_lifesim_action goes through the LRU
+    parse_s = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(rounds):
+        state = initial_lifesim_state()
+        for text in _REAL_ACTIONS:
+            apply_lifesim_action(state, text)
+    apply_s = time.perf_counter() - start
+    n = rounds * len(_REAL_ACTIONS)
+    return {
+        "commands.parse_per_sec": n / parse_s,
+        "commands.apply_per_sec": n / apply_s,
+        "commands.recognized_rate": recognized / len(_REAL_ACTIONS),
+    }
+
+
+# -- perception ---------------------------------------------------------------------------
+
+def bench_perception(ticks: int) -> Metrics:
+    """Cost and prompt size of Ava's field of view on a sparse and a crowded 1000×1000 map."""
+    from .engine import GridEngine
+    from .perception import sight
+    from .tilemap import TileMap
+
+    out: Metrics = {}
+    moves = ("move_up", "move_right", "move_down", "move_left")
+    for name, item_rate in (("sparse", 0.01), ("crowded", 0.3)):
+        engine = GridEngine((1000, 1000), tilemap=TileMap((1000, 1000), seed=0, wall_rate=0.08, item_rate=item_rate))
+        engine.reset(0)
+        longest = 0
+        start = time.perf_counter()
+        for _ in range(ticks):
+            engine.act("ava", moves[engine.rng.randrange(4)])
+            longest = max(longest, len(sight(engine)))
+        elapsed = time.perf_counter() - start
+        out[f"perception.{name}.ticks_per_sec"] = ticks / elapsed
+        out[f"perception.{name}.max_chars"] = longest
+    return out
+
+
+# -- session journal ----------------------------------------------------------------------
+
+def _record_session(path: str, game: str, turns: int) -> List[float]:
+    """Play `turns` random rounds of a console game into a journal; seconds spent journaling per round."""
+    from .ai_coplay import make_engine
+    from .context_window import ContextWindow
+    from .engine import LifeSimEngine
+    from .journal import Journal
+    from .policies import RandomPolicy
+
+    engine: Any = LifeSimEngine() if game == "lifesim" else make_engine()
+    ben = RandomPolicy(1) if game == "coplay" else None
+    state = engine.reset(0)
+    ava = RandomPolicy(0, patch_rate=0.3)
+    history = ContextWindow("System")
+    journal = Journal(path, game, 0)
+    journal.begin(state, history)
+    samples = []
+    for _ in range(turns):
+        turn = ava.decide(state)
+        ben_action = ben.decide(state).action if ben is not None else None
+        raw = json.dumps(turn.model_dump(exclude_none=True), ensure_ascii=False)
+        state, events = engine.step(ben_action, turn)
+        history.add("assistant", raw)
+        history.add("user", " ".join(e.text for e in events))
+        start = time.perf_counter()
+        journal.turn(state, history, raw, turn, ben_action)
+        samples.append(time.perf_counter() - start)
+    # a crashed session: a few records after the last snapshot, no closing one
+    journal.turn(state, history, "", None, "wait" if ben is not None else None)
+    return samples
+
+
+def bench_journal(turns: int) -> Metrics:
+    """Journal cost per turn late in a long session, and --resume time for it."""
+    from .journal import load
+
+    out: Metrics = {}
+    folder = tempfile.mkdtemp(prefix="bench_journal_")
+    try:
+        for game in ("lifesim", "coplay"):
+            path = os.path.join(folder, f"{game}.jsonl")
+            samples = _record_session(path, game, turns)
+            start = time.perf_counter()
+            load(path)
+            out[f"journal.{game}.resume_ms"] = (time.perf_counter() - start) * 1000
+            out.update(_summary(f"journal.{game}.last100", samples[-100:]))
+            out[f"journal.{game}.bytes_per_turn"] = os.path.getsize(path) / turns
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return out
+
+
+def bench_replay(turns: int) -> Metrics:
+    """Model-free replay of a recorded `turns`-round session (parse + rules + digest check)."""
+    from .replay import replay
+
+    out: Metrics = {}
+    folder = tempfile.mkdtemp(prefix="bench_replay_")
+    try:
+        for game in ("lifesim", "coplay"):
+            path = os.path.join(folder, f"{game}.jsonl")
+            _record_session(path, game, turns)
+            result = replay(path)
+            if not result.ok:
+                raise RuntimeError(result.report())
+            out[f"replay.{game}.ms_per_1000_turns"] = result.seconds * 1000 * 1000 / result.rounds
+            out[f"replay.{game}.turns_per_sec"] = result.rounds / result.seconds
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return out
+
+
+# -- prompt growth ------------------------------------------------------------------------
+
+def bench_prompt_growth(turns: int) -> Metrics:
+    """Prompt tokens per LifeSim turn when driven like the console game, without a model."""
+    from .ai_lifesim import INTRO, SYSTEM
+    from .context_window import ContextWindow
+    from .engine import LifeSimEngine
+    from .policies import RandomPolicy
+    from .state_codec import StateDeltaEncoder
+
+    engine = LifeSimEngine()
+    state = engine.reset(0)
+    policy = RandomPolicy(0, patch_rate=0.3)
+    codec = StateDeltaEncoder()
+    history = ContextWindow(SYSTEM)
+    snapshot_msg = history.add("user", f"Szene: {INTRO}\n{codec.encode(state)}")
+    sizes: List[int] = []
+    repr_chars = len(repr(state))  # what the old f"Zustand: {state}" prompts cost
+    for _ in range(turns):
+        history.messages()
+        sizes.append(history.last_prompt_tokens)
+        turn = policy.decide(state)
+        assert turn is not None
+        state, events = engine.step(None, turn)
+        history.add("assistant", json.dumps(turn.model_dump(exclude_none=True), ensure_ascii=False))
+        if not history.holds(snapshot_msg):
+            codec.force_resync()
+        reaction = " ".join(e.text for e in events if e.kind == "world")
+        msg = history.add("user", f"Weltreaktion: {reaction}. {codec.encode(state)}")
+        repr_chars += len(repr(state))
+        if codec.last_was_full:
+            snapshot_msg = msg
+    tail = sizes[-20:]
+    return {
+        "prompt.first_tokens": float(sizes[0]),
+        "prompt.mean_tokens": statistics.mean(sizes),
+        "prompt.max_tokens": float(max(sizes)),
+        "prompt.last20_mean_tokens": statistics.mean(tail),
+        "prompt.state_chars": float(codec.chars_sent),
+        "prompt.state_repr_chars": float(repr_chars),
+    }
+
+
+# -- GUI frame time -----------------------------------------------------------------------
+
+def bench_gui_frames(frames: int) -> Metrics:
+    """CPU time per frame (event handling up to clock.tick, i.e. without the 60 fps sleep)
+    with SDL's dummy driver."""
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import pygame
+
+    from .ai_coplay_gui import run_coplay_gui
+    from .ai_lifesim_gui import run_lifesim_gui
+
+    out: Metrics = {}
+    real_get, real_clock = pygame.event.get, pygame.time.Clock
+    turn_every = 30
+    # (name, game, keys on frame n, keys on frame n % turn_every)
+    cases = (
+        ("coplay_gui", run_coplay_gui, {2: pygame.K_d}, {3: pygame.K_RETURN}),
+        # Ben walks east through a generated 1000×1000 map, the camera follows
+        ("coplay_gui_1000", lambda: run_coplay_gui(world=(1000, 1000)), {}, {2: pygame.K_d, 3: pygame.K_RETURN}),
+        ("lifesim_gui", run_lifesim_gui, {2: pygame.K_SPACE}, {}),
+    )
+    for name, run, script, repeat in cases:
+        starts: List[float] = []
+        work: List[float] = []
+
+        def fake_get(*args: Any, **kwargs: Any) -> List[Any]:
+            starts.append(time.perf_counter())
+            n = len(starts)
+            events = list(real_get(*args, **kwargs))
+            key = script.get(n) or repeat.get(n % turn_every)
+            if key:
+                events.append(pygame.event.Event(pygame.KEYDOWN, key=key, unicode=""))
+            if n >= frames:
+                events.append(pygame.event.Event(pygame.QUIT))
+            return events
+
+        class TimedClock:
+            def __init__(self) -> None:
+                self._clock = real_clock()
+
+            def tick(self, framerate: int = 0) -> int:
+                if starts:
+                    work.append(time.perf_counter() - starts[-1])
+                return self._clock.tick(framerate)
+
+        pygame.event.get, pygame.time.Clock = fake_get, TimedClock
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                run()
+        finally:
+            pygame.event.get, pygame.time.Clock = real_get, real_clock
+        out.update(_summary(f"frame.{name}", work))
+    return out
+
+
+# -- startup ------------------------------------------------------------------------------
+
+def bench_startup(repeats: int, game_ids: Sequence[str] = GAME_IDS) -> Metrics:
+    """Time from spawning `main.py --run <id>` until the game prints its first line."""
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1", SDL_VIDEODRIVER="dummy", PYTHONUNBUFFERED="1")
+    out: Metrics = {}
+    for game_id in game_ids:
+        samples: List[float] = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            proc = subprocess.Popen(
+                [sys.executable, os.path.join(ROOT, "main.py"), "--run", game_id],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env, cwd=ROOT,
+            )
+            assert proc.stdout is not None
+            line = proc.stdout.readline()
+            elapsed = time.perf_counter() - start
+            proc.kill()
+            proc.wait()
+            if line:
+                samples.append(elapsed)
+        if samples:
+            out[f"startup.{game_id}.median_ms"] = statistics.median(samples) * 1000
+    return out
+
+
+# -- import-time budget ----------------------------------------------------------------------
+
+# Entry points that must start without pygame or pydantic. The budget covers
+# all imports (-X importtime, top-level cumulative, interpreter startup included);
+# --check also pulls in http.client for the health check.
+# tests/test_import_budget.py enforces the same budget with import_problems().
+IMPORT_CASES: Dict[str, List[str]] = {
+    "check": ["main.py", "--check"],
+    "number_guess": ["-c", "import main; from games import registry; registry.load('number_guess')"],
+    "tic_tac_toe": ["-c", "import main; from games import registry; registry.load('tic_tac_toe')"],
+}
+IMPORT_BUDGET_MS: Dict[str, float] = {"check": 120.0, "number_guess": 80.0, "tic_tac_toe": 80.0}
+HEAVY_MODULES = ("pygame", "pydantic")
+
+
+def import_profile(args: Sequence[str]) -> Tuple[Dict[str, float], List[str]]:
+    """For `python -X importtime <args>`: module -> cumulative import ms of the
+    top-level imports, and every module imported at all (nested ones included)."""
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        env=env, cwd=ROOT, text=True, timeout=60,
+    )
+    top: Dict[str, float] = {}
+    modules: List[str] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # the column header
+        modules.append(name.strip())
+        if not name[1:].startswith(" "):
+            top[name.strip()] = int(cumulative) / 1000
+    return top, modules
+
+
+def heavy_imports(modules: Sequence[str]) -> List[str]:
+    """The HEAVY_MODULES packages among `modules`."""
+    return sorted({m.split(".")[0] for m in modules} & set(HEAVY_MODULES))
+
+
+def import_problems(case: str, ms: float, heavy: Sequence[str]) -> List[str]:
+    """Budget violations of one IMPORT_CASES entry (empty if within budget)."""
+    problems = []
+    if ms > IMPORT_BUDGET_MS[case]:
+        problems.append(f"{case}: Importe {ms:.0f} ms > Budget {IMPORT_BUDGET_MS[case]:.0f} ms")
+    if heavy:
+        problems.append(f"{case}: importiert {', '.join(heavy)}")
+    return problems
+
+
+def bench_imports(repeats: int) -> Metrics:
+    out: Metrics = {}
+    for case, args in IMPORT_CASES.items():
+        totals: List[float] = []
+        heavy: List[str] = []
+        for _ in range(repeats):
+            top, modules = import_profile(args)
+            totals.append(sum(top.values()))
+            heavy = heavy_imports(modules)
+        out[f"imports.{case}.ms"] = statistics.median(totals)
+        out[f"imports.{case}.heavy"] = float(len(heavy))
+    return out
+
+
+def import_budget_violations(metrics: Metrics) -> List[str]:
+    problems = []
+    for case in IMPORT_CASES:
+        ms, heavy = metrics.get(f"imports.{case}.ms"), metrics.get(f"imports.{case}.heavy")
+        if ms is None:
+            continue
+        problems += import_problems(case, ms, list(HEAVY_MODULES) if heavy else [])
+    return problems
+
+
+# -- launcher click to first frame ---------------------------------------------------------
+
+@contextlib.contextmanager
+def _quiet_fd1() -> Iterator[None]:
+    """Point fd 1 at /dev/null so spawned games print nothing into the JSON output."""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        yield
+    finally:
+        os.dup2(saved, 1)
+        os.close(devnull)
+        os.close(saved)
+
+
+def bench_launch(repeats: int) -> Metrics:
+    """Click-to-first-frame for GUI games: a warmed-up pool worker vs. one started on click."""
+    from .warm_pool import GUI_GAMES, WarmPool
+
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    out: Metrics = {}
+    for game_id in GUI_GAMES:
+        for warm in (True, False):
+            samples: List[float] = []
+            for _ in range(repeats):
+                with _quiet_fd1():
+                    pool = WarmPool(1)
+                    if warm:
+                        pool.start().wait_ready()
+                    pool.launch(game_id)  # without an idle worker this spawns one on the click
+                    pool.size = 0  # no replacement worker competing for the CPU
+                    deadline = time.monotonic() + 60
+                    while not pool.latencies and time.monotonic() < deadline:
+                        pool.poll()
+                        time.sleep(0.002)
+                    pool.stop_games()
+                    pool.close()
+                samples.extend(ms / 1000 for _, ms, _ in pool.latencies)
+            if samples:
+                out[f"launch.{game_id}.{'warm' if warm else 'cold'}_ms"] = statistics.median(samples) * 1000
+    return out
+
+
+# -- driver ---------------------------------------------------------------------------------
+
+BENCHES: Dict[str, Callable[[bool], Metrics]] = {
+    "turn_latency": lambda quick: bench_turn_latency(5 if quick else 20),
+    "parse": lambda quick: bench_parse(2 if quick else 10),
+    "commands": lambda quick: bench_commands(200 if quick else 2000),
+    "perception": lambda quick: bench_perception(2000 if quick else 20000),
+    "journal": lambda quick: bench_journal(300 if quick else 2000),
+    "replay": lambda quick: bench_replay(300 if quick else 1000),
+    "prompt": lambda quick: bench_prompt_growth(60 if quick else 200),
+    "frame": lambda quick: bench_gui_frames(90 if quick else 300),
+    "startup": lambda quick: bench_startup(1 if quick else 3),
+    "launch": lambda quick: bench_launch(1 if quick else 3),
+    "imports": lambda quick: bench_imports(1 if quick else 5),
+}
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_sec") or metric.endswith("_rate")
+
+
+def run(names: Sequence[str], quick: bool = False) -> Dict[str, Any]:
+    mock = MockOllama(BENCH_PROFILE, seed=0).start()
+    previous = os.environ.get("OLLAMA_HOST")
+    os.environ["OLLAMA_HOST"] = mock.url  # inherited by the startup subprocesses
+    metrics: Metrics = {}
+    try:
+        for name in names:
+            print(f"[bench] {name} …", file=sys.stderr)
+            metrics.update(BENCHES[name](quick))
+    finally:
+        mock.stop()
+        if previous is None:
+            os.environ.pop("OLLAMA_HOST", None)
+        else:
+            os.environ["OLLAMA_HOST"] = previous
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "quick": quick,
+        },
+        "metrics": {k: round(v, 4) for k, v in sorted(metrics.items())},
+    }
+
+
+def compare(current: Metrics, baseline: Metrics, tolerance: float) -> List[str]:
+    """Report lines for every shared metric; regressions are marked with '!!'."""
+    lines = []
+    for key in sorted(set(current) & set(baseline)):
+        old, new = baseline[key], current[key]
+        change = (new - old) / old if old else 0.0
+        worse = -change if higher_is_better(key) else change
+        flag = "!!" if worse > tolerance else "  "
+        lines.append(f"{flag} {key:42s} {old:12.2f} -> {new:12.2f} ({change:+.1%})")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmarks against the mock Ollama backend")
+    parser.add_argument("--only", help=f"Comma-separated subset of: {', '.join(BENCHES)}")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations (smoke run)")
+    parser.add_argument("--out", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="Compare against this results file; exit 1 on regression")
+    parser.add_argument("--save-baseline", help="Also store the results as a baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression (default 0.15)")
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.only.split(",")] if args.only else list(BENCHES)
+    unknown = [n for n in names if n not in BENCHES]
+    if unknown:
+        parser.error(f"unbekannte Benchmarks: {', '.join(unknown)}")
+    result = run(names, quick=args.quick)
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    failed = False
+    for problem in import_budget_violations(result["metrics"]):
+        print("!! " + problem, file=sys.stderr)
+        failed = True
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["metrics"]
+        lines = compare(result["metrics"], baseline, args.tolerance)
+        print("\n".join(lines), file=sys.stderr)
+        failed = failed or any(line.startswith("!!") for line in lines)
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import re
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+# Command grammar for LifeSim actions. Verbs, their synonyms (including
+# multi-word and separable forms like "sieh dich um"), directions and filler
+# words are declared once below and compiled into a token trie plus lookup
+# tables. parse_command() tokenises an action and returns a typed Command:
+# the first verb phrase decides, a bare direction means "go", and whatever is
+# left (minus fillers) is the object, e.g. "nimm den roten Apfel" ->
+# Command("take", None, ("roten", "apfel"), ("den", "roten", "apfel")).
+
+VERBS: Dict[str, Tuple[str, ...]] = {
+    "go": ("gehe", "geh", "gehen", "laufe", "lauf", "laufen", "renne", "renn", "bewege", "wandere",
+           "betrete", "move", "go", "walk"),
+    "look": ("schaue", "schau", "schauen", "umschauen", "umsehen", "sieh", "sehe", "betrachte",
+             "untersuche", "erkunde", "look", "wait", "warte", "warten", "schaue dich um", "sieh dich um",
+             "sehe mich um", "schaue mich um"),
+    "take": ("nimm", "nehme", "nehmen", "hebe", "heb", "greife", "greif", "sammle", "pflücke", "take",
+             "pick up", "hebe auf"),
+    "open": ("öffne", "oeffne", "öffnen", "schließe auf", "schliesse auf", "sperre auf", "open", "unlock"),
+    "use": ("benutze", "benutzen", "verwende", "nutze", "use", "interagiere", "interact"),
+    "speak": ("sage", "sag", "spreche", "sprich", "rede", "speak", "say"),
+}
+
+DIRECTIONS: Dict[str, Tuple[str, ...]] = {
+    "nord": ("nord", "norden", "n", "hoch", "oben", "up", "north", "move_up"),
+    "sued": ("sued", "süd", "süden", "sueden", "s", "runter", "unten", "down", "south", "move_down"),
+    "ost": ("ost", "osten", "o", "rechts", "right", "east", "move_right"),
+    "west": ("west", "westen", "w", "links", "left", "move_left"),
+}
+
+FILLERS = frozenset((
+    "auf", "den", "die", "das", "der", "dem", "des", "ein", "eine", "einen", "einem", "nach", "zum", "zur",
+    "zu", "in", "im", "ins", "mit", "mich", "dich", "sich", "um", "richtung", "bitte", "ich", "the", "a",
+    "an", "to", "and", "und", "dann", "vorsichtig", "langsam", "schnell", "hier", "da", "dort",
+))
+
+_TOKEN = re.compile(r"[\w']+")
+
+
+class _Node:
+    __slots__ = ("next", "verb")
+
+    def __init__(self) -> None:
+        self.next: Dict[str, "_Node"] = {}
+        self.verb: Optional[str] = None  # set where a complete phrase ends
+
+
+class Command(NamedTuple):
+    verb: str  # key of VERBS, or "unknown"
+    direction: Optional[str] = None  # key of DIRECTIONS
+    words: Tuple[str, ...] = ()  # content words after the verb, lower-case
+    rest: Tuple[str, ...] = ()  # every token after the verb, fillers and directions included
+
+    @property
+    def obj(self) -> str:
+        return " ".join(self.words)
+
+
+class Grammar:
+    """VERBS/DIRECTIONS/FILLERS compiled into a phrase trie and token lookups."""
+
+    def __init__(
+        self,
+        verbs: Dict[str, Sequence[str]],
+        directions: Dict[str, Sequence[str]],
+        fillers: Sequence[str],
+    ) -> None:
+        self.trie = _Node()
+        for verb, phrases in verbs.items():
+            for phrase in phrases:
+                node = self.trie
+                for token in phrase.split():
+                    node = node.next.setdefault(token, _Node())
+                node.verb = verb
+        self.directions = {syn: canon for canon, syns in directions.items() for syn in syns}
+        self.fillers = frozenset(fillers)
+
+    def _verb_at(self, tokens: Sequence[str], i: int) -> Tuple[Optional[str], int]:
+        """Longest verb phrase starting at tokens[i] -> (verb, tokens consumed)."""
+        node = self.trie
+        best, used = None, 0
+        for j in range(i, len(tokens)):
+            child = node.next.get(tokens[j])
+            if child is None:
+                break
+            node = child
+            if node.verb is not None:
+                best, used = node.verb, j - i + 1
+        return best, used
+
+    def parse(self, text: str) -> Command:
+        tokens = tokens_of(text)
+        verb: Optional[str] = None
+        direction: Optional[str] = None
+        words = []
+        rest = []
+        i = 0
+        while i < len(tokens):
+            found, used = self._verb_at(tokens, i)
+            if found and verb is None:
+                verb = found
+                i += used
+                continue
+            if found:
+                break  # a second clause ("... und nimm ...") belongs to the next action
+            token = tokens[i]
+            rest.append(token)
+            canon = self.directions.get(token)
+            if canon and direction is None and (verb in (None, "go") or len(token) > 1):
+                direction = canon
+            elif token not in self.fillers:
+                words.append(token)
+            i += 1
+        if verb is None:
+            verb = "go" if direction else "unknown"
+        return Command(verb, direction, tuple(words), tuple(rest))
+
+    def direction(self, word: str) -> Optional[str]:
+        return self.directions.get(word.lower())
+
+
+def tokens_of(text: str) -> Tuple[str, ...]:
+    return tuple(_TOKEN.findall(text.lower()))
+
+
+_ENDINGS = ("en", "er", "es", "em", "e", "n", "s")
+
+
+@lru_cache(maxsize=4096)
+def stem(word: str) -> str:
+    """Crude German stem so inflected adjectives match ("roten" / "roter" -> "rot")."""
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            return word[: -len(ending)]
+    return word
+
+
+GRAMMAR = Grammar(VERBS, DIRECTIONS, FILLERS)
+
+
+@lru_cache(maxsize=1024)
+def parse_command(text: str) -> Command:
+    return GRAMMAR.parse(text)
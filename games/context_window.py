@@ -0,0 +1,187 @@
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from .llm_client import extract_json_block
+
+# Token-budgeted conversation history for the Ava games.
+# Layout of every prompt: pinned system prompt, one rolling summary of evicted
+# turns, then the most recent messages. Failed-parse retry pairs only live until
+# the next valid answer, so they never accumulate.
+
+# Rough heuristic for gemma-style tokenizers on German text; no tokenizer needed
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD
+
+
+def _summary_line(msg: Dict[str, str], limit: int) -> str:
+    text = msg["content"]
+    if msg["role"] == "assistant":
+        # Keep only what Ava did and said, not the whole JSON turn
+        data = extract_json_block(text)
+        if data:
+            text = f"{data.get('action', '')} – {data.get('speech', '')}".strip(" –")
+    text = " ".join(text.split())
+    if len(text) > limit:
+        text = text[: limit - 1] + "…"
+    who = "Ava" if msg["role"] == "assistant" else "Welt"
+    return f"{who}: {text}"
+
+
+class ContextWindow:
+    """Conversation history that never exceeds a token budget."""
+
+    def __init__(self, system: str, budget: int = 1500, min_recent: int = 4, summary_budget: int = 300) -> None:
+        self.system = {"role": "system", "content": system}
+        self.budget = budget
+        self.min_recent = min_recent
+        self.summary_budget = summary_budget
+        self._recent: Deque[Dict[str, str]] = deque()
+        self._retry: List[Dict[str, str]] = []  # retry pairs awaiting a valid answer (identity-tracked)
+        self._summary: Deque[str] = deque()
+        self._recent_tokens = 0
+        self._summary_tokens = 0
+        self.prompt_tokens: List[int] = []      # estimated prompt size per request
+        self.evicted = 0
+        # Set to [] to collect every pushed message (retry ones marked), e.g. for the session journal
+        self.added: Optional[List[Dict[str, Any]]] = None
+
+    # -- building the history -------------------------------------------------
+    def add(self, role: str, content: str) -> Dict[str, str]:
+        msg = {"role": role, "content": content}
+        if role == "assistant" and self._retry:
+            # A valid answer supersedes earlier failed attempts
+            self._drop_retries()
+        self._push(msg)
+        return msg
+
+    def holds(self, msg: Dict[str, str]) -> bool:
+        """Whether this exact message (as returned by add) is still in the window."""
+        return any(m is msg for m in self._recent)
+
+    def add_retry(self, bad_content: str, nudge: str) -> None:
+        """Record a failed-parse answer plus correction request; dropped after the next valid answer."""
+        for msg in ({"role": "assistant", "content": bad_content}, {"role": "user", "content": nudge}):
+            self._retry.append(msg)
+            self._push(msg, retry=True)
+
+    def pop(self) -> Optional[Dict[str, str]]:
+        """Remove the newest message (e.g. the prompt of a cancelled turn)."""
+        if not self._recent:
+            return None
+        msg = self._recent.pop()
+        self._recent_tokens -= estimate_tokens(msg["content"])
+        self._retry = [m for m in self._retry if m is not msg]
+        if self.added:
+            # Not handed out by take_added() yet: the journal must not see it. Retry
+            # messages are recorded as marked copies that share the content object.
+            for i in range(len(self.added) - 1, -1, -1):
+                entry = self.added[i]
+                if entry is msg or (entry.get("retry") and entry["content"] is msg["content"]):
+                    del self.added[i]
+                    break
+        return msg
+
+    def _push(self, msg: Dict[str, str], retry: bool = False) -> None:
+        self._recent.append(msg)
+        self._recent_tokens += estimate_tokens(msg["content"])
+        if self.added is not None:
+            self.added.append(dict(msg, retry=True) if retry else msg)
+        self._trim()
+
+    def _drop_retries(self) -> None:
+        ids = {id(m) for m in self._retry}
+        kept = deque(m for m in self._recent if id(m) not in ids)
+        self._recent_tokens = sum(estimate_tokens(m["content"]) for m in kept)
+        self._recent = kept
+        self._retry = []
+
+    def _trim(self) -> None:
+        fixed = estimate_tokens(self.system["content"]) + self._summary_tokens
+        while fixed + self._recent_tokens > self.budget and len(self._recent) > self.min_recent:
+            old = self._recent.popleft()
+            self._recent_tokens -= estimate_tokens(old["content"])
+            self.evicted += 1
+            if any(old is m for m in self._retry):
+                self._retry = [m for m in self._retry if m is not old]
+                continue  # failed attempts are not worth summarising
+            self._summarise(old)
+            fixed = estimate_tokens(self.system["content"]) + self._summary_tokens
+        # Do not start the window with an orphaned answer
+        while len(self._recent) > self.min_recent and self._recent[0]["role"] == "assistant":
+            old = self._recent.popleft()
+            self._recent_tokens -= estimate_tokens(old["content"])
+            self._summarise(old)
+
+    def _summarise(self, msg: Dict[str, str]) -> None:
+        line = _summary_line(msg, 120)
+        self._summary.append(line)
+        self._summary_tokens += estimate_tokens(line)
+        # Rolling: the oldest summary lines fall out first
+        while self._summary_tokens > self.summary_budget and self._summary:
+            self._summary_tokens -= estimate_tokens(self._summary.popleft())
+
+    # -- saving and restoring --------------------------------------------------
+    def take_added(self) -> List[Dict[str, Any]]:
+        """Messages pushed since the last call (needs `added` switched on)."""
+        out, self.added = self.added or [], []
+        return out
+
+    def replay(self, messages: List[Dict[str, Any]]) -> None:
+        """Push messages as take_added() returned them."""
+        for i, msg in enumerate(messages):
+            if msg.get("retry"):
+                if msg["role"] == "assistant":
+                    nudge = messages[i + 1]["content"] if i + 1 < len(messages) else ""
+                    self.add_retry(msg["content"], nudge)
+            else:
+                self.add(msg["role"], msg["content"])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary and recent messages; system prompt and budgets come from the game."""
+        retry = {id(m) for m in self._retry}
+        return {
+            "summary": list(self._summary),
+            "recent": [dict(m, retry=True) if id(m) in retry else dict(m) for m in self._recent],
+            "evicted": self.evicted,
+        }
+
+    def restore(self, data: Dict[str, Any]) -> None:
+        self._summary = deque(data.get("summary", []))
+        self._summary_tokens = sum(estimate_tokens(line) for line in self._summary)
+        self._recent = deque()
+        self._retry = []
+        for m in data.get("recent", []):
+            msg = {"role": m["role"], "content": m["content"]}
+            self._recent.append(msg)
+            if m.get("retry"):
+                self._retry.append(msg)
+        self._recent_tokens = sum(estimate_tokens(m["content"]) for m in self._recent)
+        self.evicted = data.get("evicted", 0)
+
+    # -- reading ---------------------------------------------------------------
+    def messages(self) -> List[Dict[str, str]]:
+        """Prompt for the next request; records its estimated size."""
+        out: List[Dict[str, str]] = [self.system]
+        if self._summary:
+            out.append({"role": "user", "content": "Bisheriger Verlauf (gekürzt):\n" + "\n".join(self._summary)})
+        out.extend(self._recent)
+        self.prompt_tokens.append(sum(estimate_tokens(m["content"]) for m in out))
+        return out
+
+    @property
+    def last_prompt_tokens(self) -> int:
+        return self.prompt_tokens[-1] if self.prompt_tokens else 0
+
+    def report(self) -> str:
+        if not self.prompt_tokens:
+            return "Kontext: noch keine Anfrage."
+        n = len(self.prompt_tokens)
+        avg = sum(self.prompt_tokens) / n
+        return (
+            f"Kontext über {n} Anfragen: Ø ~{avg:.0f} Tokens, max ~{max(self.prompt_tokens)} "
+            f"(Budget {self.budget}, {self.evicted} Nachrichten verdichtet)"
+        )
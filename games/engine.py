@@ -0,0 +1,447 @@
+import random
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .commands import GRAMMAR, Command, parse_command, stem, tokens_of
+from .profiling import timed
+from .schemas import AvaTurn, WorldPatch
+from .tilemap import TileMap
+from .world import World
+
+# I/O-free game rules. Engines own the state dict and only return events; the
+# console and pygame front-ends print/draw them, policies (LLM, scripted,
+# random) supply Ava's turns. Without a model a run is pure Python, so turns
+# can be simulated in bulk (see simulate() and `python -m games.engine`).
+
+Pos = Tuple[int, int]
+
+
+class Event(NamedTuple):
+    kind: str  # "world", "patch", "feedback", "hint", "speech"
+    text: str
+
+
+# -- LifeSim (text world) ------------------------------------------------------------
+
+MEMORY_KEYS = ("experience", "insights", "conclusions", "wishes", "fears")
+
+# AvaTurn actions -> LifeSim verbs (the schema only allows the grid actions)
+_DIRECTIONS = {"move_up": "nord", "move_down": "sued", "move_right": "ost", "move_left": "west"}
+
+
+def initial_lifesim_state() -> Dict[str, Any]:
+    return {
+        "location": "Raum",
+        "inventory": [],
+        "notes": "",
+        "memory": {k: [] for k in MEMORY_KEYS},
+        "ava_identity": "Ava, neugierige KI-Entdeckerin",
+        "world": World.from_dict({
+            "Raum": {"items": ["Schlüssel"], "exits": {"nord": "Flur"}},
+            "Flur": {"items": [], "exits": {"sued": "Raum"}},
+            "Garten": {"items": ["Blume"], "exits": {"west": "Flur"}}
+        }),
+        "turn": 0,
+    }
+
+
+def lifesim_command(state: Dict[str, Any], action: str) -> str:
+    """Verb command for an AvaTurn action; free text passes through unchanged."""
+    if action in _DIRECTIONS:
+        return f"gehe {_DIRECTIONS[action]}"
+    if action == "interact":
+        items = state["world"].items_at(state["location"])
+        if items:
+            return f"nimm {items[0]}"
+        if state["location"] == "Flur":
+            return "öffne tür"
+        return "schaue"
+    if action == "wait":
+        return "schaue"
+    return action
+
+
+def _go(state: Dict[str, Any], cmd: Command) -> str:
+    world: World = state["world"]
+    loc = state["location"]
+    exits = world.exits_of(loc)
+    direction = cmd.direction
+    target = exits.get(direction) if direction else None
+    if target is None and direction:
+        # exits created by patches may be keyed "norden", "hoch", ...
+        direction = next((key for key in exits if GRAMMAR.direction(key) == direction), direction)
+        target = exits.get(direction)
+    if target is None and not direction:
+        # "gehe treppe" (named exit), "gehe in den Garten" (room), "gehe zum Schlüssel" (item):
+        # one step along the shortest path
+        named = {key.lower(): key for key in exits}
+        goal = next((named[w] for w in cmd.words if w in named), None)
+        if goal is not None:
+            direction, target = goal, exits[goal]
+        else:
+            room = world.find_room(cmd.obj) or next(filter(None, map(world.find_room, cmd.words)), None)
+            if room is None:
+                room = next((world.where(w)[0] for w in cmd.words if world.where(w)), None)
+            steps = world.path(loc, room) if room else None
+            if steps:
+                direction, target = steps[0], exits[steps[0]]
+    if target:
+        state["location"] = target
+        return f"Ava geht {direction} nach {target}."
+    return "Dort ist kein Ausgang."
+
+
+def _look(state: Dict[str, Any], cmd: Command) -> str:
+    visible_items = state["world"].items_at(state["location"])
+    return f"Du siehst {', '.join(visible_items) if visible_items else 'nichts Besonderes'}."
+
+
+def _take(state: Dict[str, Any], cmd: Command) -> str:
+    world: World = state["world"]
+    loc = state["location"]
+    item = world.find_item(loc, cmd.obj) if cmd.words else None
+    if item is None:
+        # multi-word or hyphenated names: every token of the item appears in the command
+        said = {stem(w) for w in cmd.rest}
+        item = next((i for i in world.items_at(loc) if {stem(w) for w in tokens_of(i)} <= said), None)
+    taken = world.remove_item(loc, item) if item else None
+    if taken:
+        state["inventory"].append(taken)
+        return f"Ava nimmt {taken}."
+    return "Nichts zum Aufheben gefunden."
+
+
+def _open(state: Dict[str, Any], cmd: Command) -> str:
+    if not any(w.startswith(("tür", "tuer")) for w in cmd.rest):
+        return _no_effect(state, cmd)
+    if "Schlüssel" in state["inventory"] and state["location"] == "Flur":
+        state["world"].connect("Flur", "ost", "Garten")
+        return "Ava öffnet die Tür mit dem Schlüssel. Der Garten ist nun nach Osten erreichbar."
+    return "Die Tür ist verschlossen. Ein Schlüssel wäre hilfreich."
+
+
+def _no_effect(state: Dict[str, Any], cmd: Command) -> str:
+    return "Die Aktion hat keinen offensichtlichen Effekt."
+
+
+# Command verbs (games/commands.py) -> rules; "use" only matters for the door so far
+_HANDLERS: Dict[str, Callable[[Dict[str, Any], Command], str]] = {
+    "go": _go,
+    "look": _look,
+    "take": _take,
+    "open": _open,
+    "use": _open,
+}
+
+
+def apply_lifesim_action(state: Dict[str, Any], action: str) -> str:
+    cmd = parse_command(action)
+    return _HANDLERS.get(cmd.verb, _no_effect)(state, cmd)
+
+
+def apply_world_patch(state: Dict[str, Any], wp: WorldPatch) -> List[Event]:
+    """Apply Ava's small, whitelisted world changes; returns what happened."""
+    events: List[Event] = []
+    world: World = state["world"]
+    if wp.open_exit:
+        src = wp.open_exit.get("from")
+        direction = wp.open_exit.get("dir")
+        to = wp.open_exit.get("to")
+        if src and direction and to and src in world:
+            world.connect(src, direction, to)
+            events.append(Event("patch", f"Design: Ausgang geöffnet {src} --{direction}--> {to}"))
+    if wp.add_item:
+        at = wp.add_item.get("at")
+        item = wp.add_item.get("item")
+        if at and item and at in world:
+            world.add_item(at, item)
+            events.append(Event("patch", f"Design: Item hinzugefügt {item} @ {at}"))
+    if wp.set_goal:
+        state["notes"] = (state.get("notes", "") + f"\nZiel: {wp.set_goal}").strip()
+        events.append(Event("patch", f"Ziel gesetzt: {wp.set_goal}"))
+    if wp.create_place:
+        name = wp.create_place.get("name")
+        conn = wp.create_place.get("connect_from")
+        d = wp.create_place.get("dir")
+        if name and conn and d and name not in world and conn in world:
+            world.add_room(name)
+            world.connect(conn, d, name)
+            events.append(Event("patch", f"Design: Ort erschaffen '{name}' und von {conn} via {d} verbunden"))
+    if wp.create_item:
+        at = wp.create_item.get("at")
+        item = wp.create_item.get("item")
+        if at and item and at in world:
+            world.add_item(at, item)
+            events.append(Event("patch", f"Design: Neues Objekt erschaffen {item} @ {at}"))
+    if wp.set_trait:
+        tgt = wp.set_trait.get("target")
+        key = wp.set_trait.get("key")
+        val = wp.set_trait.get("value")
+        if tgt and key and val:
+            if tgt == "ava":
+                state["ava_identity"] = (state.get("ava_identity", "Ava") + f"; {key}={val}").strip()
+                events.append(Event("patch", f"Ava-Attribut gesetzt: {key}={val}"))
+            elif tgt in world:
+                world.set_trait(tgt, key, val)
+                events.append(Event("patch", f"Ort-Attribut gesetzt: {tgt}.{key}={val}"))
+            elif tgt == "world":
+                # globale Notiz/Regeländerung nur als Notiz
+                state["notes"] = (state.get("notes", "") + f"\nRegel: {key}={val}").strip()
+                events.append(Event("patch", f"Notiz (Regel): {key}={val}"))
+    return events
+
+
+class LifeSimEngine:
+    """Text-world rules: Ava acts, reshapes the world via patches and remembers."""
+
+    def __init__(self) -> None:
+        self.state: Dict[str, Any] = {}
+        self.rng = random.Random()
+
+    def reset(self, seed: Optional[int] = None) -> Dict[str, Any]:
+        self.rng = random.Random(seed)
+        self.state = initial_lifesim_state()
+        return self.state
+
+    @timed("apply")
+    def step(self, ben_action: Optional[str], ava_turn: AvaTurn) -> Tuple[Dict[str, Any], List[Event]]:
+        """One round. `ben_action` is the human's free-text influence (no rule effect)."""
+        state = self.state
+        events: List[Event] = []
+        if ben_action:
+            events.append(Event("hint", ben_action))
+        events.append(Event("world", apply_lifesim_action(state, lifesim_command(state, ava_turn.action))))
+        if ava_turn.world_patch:
+            events.extend(apply_world_patch(state, ava_turn.world_patch))
+        if ava_turn.design_feedback:
+            events.append(Event("feedback", ava_turn.design_feedback))
+        if ava_turn.self_update:
+            state["ava_identity"] = (state.get("ava_identity", "Ava") + "; " + ava_turn.self_update).strip()
+        # Perception & Memory
+        mem = state["memory"]
+        for key in MEMORY_KEYS:
+            value = getattr(ava_turn, key)
+            if value:
+                mem[key].append(value)
+        state["turn"] += 1
+        return state, events
+
+
+# -- Co-Play / grid worlds -------------------------------------------------------------
+
+class GridEngine:
+    """Grid rules shared by Co-Play (Ava + Ben) and the LifeSim GUI (Ava alone)."""
+
+    def __init__(
+        self,
+        grid: Pos,
+        agents: Sequence[str] = ("ava", "ben"),
+        start: Optional[Dict[str, Pos]] = None,
+        items: Optional[Dict[Pos, str]] = None,
+        tilemap: Optional[TileMap] = None,
+    ) -> None:
+        # with a tilemap the grid is its size, walls block moves and
+        # state["items"] is the map's SpatialHash instead of a plain dict
+        self.tilemap = tilemap
+        self.grid = tilemap.size if tilemap else grid
+        self.agents = tuple(agents)
+        self.start = dict(start or {})
+        self.items = dict(items or {})
+        self.state: Dict[str, Any] = {}
+        self.rng = random.Random()
+        self._taken: Optional[List[Tuple[str, Pos, str]]] = None  # pickups since the oldest checkpoint
+
+    def reset(self, seed: Optional[int] = None) -> Dict[str, Any]:
+        self.rng = random.Random(seed)
+        self._taken = None
+        center = (self.grid[0] // 2, self.grid[1] // 2)
+        pos = {who: self.start.get(who, center) for who in self.agents}
+        items: Any = dict(self.items)
+        if self.tilemap:
+            self.tilemap.reset()
+            for p in list(pos.values()) + list(self.items):
+                self.tilemap.carve(p)
+            self.tilemap.items.update(self.items)
+            items = self.tilemap.items
+        self.state = {
+            "pos": pos,
+            "items": items,
+            "inv": {who: [] for who in self.agents},
+            "log": [],
+            "notes": "",
+            "speech": "",
+            "thoughts": "",
+            "feedback": "",
+            "perceptions": "",
+            "wishes": "",
+            "fears": "",
+            "turn": 0,
+        }
+        return self.state
+
+    def clamp(self, pos: Pos) -> Pos:
+        x, y = pos
+        x = max(0, min(self.grid[0] - 1, x))
+        y = max(0, min(self.grid[1] - 1, y))
+        return x, y
+
+    def pickup(self, who: str) -> str:
+        state = self.state
+        p = tuple(state["pos"][who])
+        if p in state["items"]:
+            item = state["items"].pop(p)
+            state["inv"][who].append(item)
+            if self._taken is not None:
+                self._taken.append((who, p, item))
+            return f"{who} hebt {item} auf."
+        return "Nichts zum Aufheben."
+
+    @timed("apply")
+    def act(self, who: str, action: str) -> str:
+        """Apply one agent's action and describe the result."""
+        if action.lower().startswith("speak:"):
+            # speaking has no position change
+            return f"{who} spricht: {action.split(':', 1)[1].strip()}"
+        x, y = self.state["pos"][who]
+        if action == "move_up":
+            y -= 1
+        elif action == "move_down":
+            y += 1
+        elif action == "move_left":
+            x -= 1
+        elif action == "move_right":
+            x += 1
+        # wait/interact: no movement change
+        target = self.clamp((x, y))
+        blocked = self.tilemap is not None and not self.tilemap.passable(target)
+        if not blocked:
+            self.state["pos"][who] = target
+        out = f"{who} {action} -> {self.state['pos'][who]}"
+        if blocked:
+            out += " | Wand im Weg."
+        if action == "interact":
+            out += " | " + self.pickup(who)
+        return out
+
+    @timed("apply")
+    def absorb(
+        self, ava_turn: AvaTurn, ben_action: str = "wait", human_feedback: str = "", round_no: Optional[int] = None
+    ) -> List[Event]:
+        """Record the non-movement parts of Ava's turn (speech, feedback, memory).
+
+        The log entry's "turn" is the caller's round number (rounds without a
+        usable answer count too); without one, the engine's own turn counter.
+        """
+        state = self.state
+        events: List[Event] = []
+        state["speech"] = ava_turn.speech
+        state["thoughts"] = ava_turn.thoughts
+        state["feedback"] = ava_turn.design_feedback
+        state["perceptions"] = ava_turn.perceptions or ""
+        state["wishes"] = ava_turn.wishes or ""
+        state["fears"] = ava_turn.fears or ""
+        if ava_turn.speech:
+            events.append(Event("speech", ava_turn.speech))
+        if ava_turn.design_feedback:
+            events.append(Event("feedback", ava_turn.design_feedback))
+        if ava_turn.self_update:
+            state["notes"] = (state.get("notes", "") + " | " + ava_turn.self_update).strip(" |")
+        if ava_turn.world_patch and ava_turn.world_patch.set_goal:
+            # Grid worlds keep patches small: goals become notes
+            state["notes"] = (state.get("notes", "") + f" | Ziel: {ava_turn.world_patch.set_goal}").strip(" |")
+            events.append(Event("patch", f"Ziel gesetzt: {ava_turn.world_patch.set_goal}"))
+        state["turn"] += 1
+        state["log"].append({
+            "turn": round_no if round_no is not None else state["turn"],
+            "ben_action": ben_action,
+            "ava_action": ava_turn.action,
+            "human_feedback": human_feedback,
+            "ava_feedback": ava_turn.design_feedback,
+        })
+        return events
+
+    # The GUIs apply moves before the model's answer is validated (early
+    # action, Ben's move on Enter); checkpoints let them take those back when
+    # the turn is cancelled or the answer turns out different or unusable.
+
+    def checkpoint(self) -> Tuple[Dict[str, Pos], int]:
+        """Mark to roll back to: the positions now and every pickup from here on."""
+        if self._taken is None:
+            self._taken = []
+        return dict(self.state["pos"]), len(self._taken)
+
+    def rollback(self, mark: Tuple[Dict[str, Pos], int]) -> None:
+        """Undo moves and pickups since `mark`; older marks stay valid."""
+        pos, n = mark
+        taken = self._taken or []
+        for who, p, item in reversed(taken[n:]):
+            self.state["inv"][who].pop()
+            self.state["items"][p] = item
+        del taken[n:]
+        self.state["pos"].update(pos)
+
+    def commit(self) -> None:
+        """Drop all checkpoints (stops recording pickups)."""
+        self._taken = None
+
+    def step(self, ben_action: Optional[str], ava_turn: AvaTurn) -> Tuple[Dict[str, Any], List[Event]]:
+        """One round: Ben acts (if present), then Ava."""
+        events: List[Event] = []
+        ben = ben_action or "wait"
+        if "ben" in self.state["pos"]:
+            events.append(Event("world", self.act("ben", ben)))
+        events.append(Event("world", self.act("ava", ava_turn.action)))
+        events.extend(self.absorb(ava_turn, ben))
+        return self.state, events
+
+
+# -- bulk simulation ----------------------------------------------------------------------
+
+def simulate(engine: Any, ava: Any, ben: Any = None, turns: int = 1000, seed: Optional[int] = 0) -> Dict[str, float]:
+    """Run `turns` rounds with policies (see games.policies) and report throughput."""
+    state = engine.reset(seed)
+    events_total = 0
+    skipped = 0
+    start = time.perf_counter()
+    for _ in range(turns):
+        turn = ava.decide(state)
+        if turn is None:
+            skipped += 1
+            continue
+        ben_action = ben.decide(state).action if ben is not None else None
+        state, events = engine.step(ben_action, turn)
+        ava.observe(state, events)
+        events_total += len(events)
+    seconds = time.perf_counter() - start
+    return {
+        "turns": float(turns - skipped),
+        "skipped": float(skipped),
+        "events": float(events_total),
+        "seconds": seconds,
+        "turns_per_sec": (turns - skipped) / seconds if seconds else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    from .policies import RandomPolicy
+
+    parser = argparse.ArgumentParser(description="Simulate LifeSim/Co-Play turns without a model")
+    parser.add_argument("--game", choices=("lifesim", "coplay"), default="coplay")
+    parser.add_argument("--turns", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    if args.game == "lifesim":
+        stats = simulate(LifeSimEngine(), RandomPolicy(args.seed), turns=args.turns, seed=args.seed)
+    else:
+        engine = GridEngine((15, 10), start={"ben": (1, 1)}, items={(3, 3): "Schlüssel", (8, 2): "Apfel"})
+        stats = simulate(engine, RandomPolicy(args.seed), RandomPolicy(args.seed + 1), turns=args.turns, seed=args.seed)
+    print(
+        f"{args.game}: {stats['turns']:.0f} Züge in {stats['seconds']:.3f} s "
+        f"({stats['turns_per_sec']:.0f} Züge/s, {stats['events']:.0f} Ereignisse)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+import asyncio
+import itertools
+import json
+import statistics
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Tuple
+
+from . import llm_metrics
+from .ai_coplay import GRID as COPLAY_GRID, CoplayPolicy, ava_round, normalize_human_action
+from .ai_lifesim import LifeSimPolicy
+from .engine import Event, GridEngine, LifeSimEngine
+from .policies import LLMPolicy
+from .world import World
+
+# Many LifeSim/Co-Play sessions in one process (`main.py --serve`). Sessions
+# are driven by thin clients over a small local HTTP/JSON API; their model
+# calls go through one scheduler that caps concurrent backend requests,
+# serves sessions round-robin and rejects work when the queue is full.
+#
+#   POST   /sessions              {"game": "lifesim"|"coplay"}   -> {"id", "state"}
+#   POST   /sessions/<id>/turn    {"action": "d", "hint": "..."} -> {"ok", "events", "speech", "state"}
+#   GET    /sessions/<id>                                         -> {"state", "turns"}
+#   DELETE /sessions/<id>
+#   GET    /metrics                                               -> scheduler, session and LLM call counters
+
+
+class Overloaded(Exception):
+    """The scheduler queue is full; the client should retry later."""
+
+
+class SessionClosed(Exception):
+    """The session was closed or expired while its turn was waiting."""
+
+
+class _Job:
+    def __init__(self, fn: Callable[[], Any], future: "asyncio.Future[Any]") -> None:
+        self.fn = fn
+        self.future = future
+        self.queued = time.perf_counter()
+
+
+class Scheduler:
+    """Bounded-concurrency, per-session round-robin queue in front of the model backend."""
+
+    def __init__(self, concurrency: int = 2, max_queue: int = 64, max_per_session: int = 2) -> None:
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_per_session = max_per_session
+        self._queues: Dict[str, Deque[_Job]] = {}
+        self._ring: Deque[str] = deque()  # sessions with waiting jobs, in service order
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="llm-sched")
+        self.in_flight = 0
+        self.queued = 0
+        self.stats: Dict[str, int] = {"completed": 0, "failed": 0, "rejected": 0, "max_queue_depth": 0}
+        self._wait_ms: Deque[float] = deque(maxlen=500)
+        self._service_ms: Deque[float] = deque(maxlen=500)
+
+    def admit(self, session_id: str) -> None:
+        """Raise Overloaded if a job for this session would not be accepted now."""
+        queue = self._queues.get(session_id, ())
+        if self.queued >= self.max_queue or len(queue) >= self.max_per_session:
+            self.stats["rejected"] += 1
+            raise Overloaded()
+
+    async def run(self, session_id: str, fn: Callable[[], Any]) -> Any:
+        """Run blocking `fn` (a model call) when a slot is free; raises Overloaded."""
+        self.admit(session_id)
+        future: "asyncio.Future[Any]" = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(session_id, deque()).append(_Job(fn, future))
+        if session_id not in self._ring:
+            self._ring.append(session_id)
+        self.queued += 1
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self.queued)
+        self._dispatch()
+        return await future
+
+    def _dispatch(self) -> None:
+        while self.in_flight < self.concurrency and self._ring:
+            session_id = self._ring.popleft()
+            queue = self._queues[session_id]
+            job = queue.popleft()
+            if queue:
+                # Others get a turn before this session's next job
+                self._ring.append(session_id)
+            else:
+                del self._queues[session_id]
+            self.queued -= 1
+            self.in_flight += 1
+            asyncio.ensure_future(self._execute(job))
+
+    async def _execute(self, job: _Job) -> None:
+        started = time.perf_counter()
+        self._wait_ms.append((started - job.queued) * 1000)
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, job.fn)
+        except Exception as e:
+            self.stats["failed"] += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            self.stats["completed"] += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._service_ms.append((time.perf_counter() - started) * 1000)
+            self.in_flight -= 1
+            self._dispatch()
+
+    def drop(self, session_id: str) -> None:
+        """Fail the queued (not yet running) jobs of a closed session with SessionClosed."""
+        queue = self._queues.pop(session_id, None)
+        if queue:
+            self.queued -= len(queue)
+            for job in queue:
+                # not future.cancel(): the CancelledError would escape route() and leave
+                # the waiting client without a response
+                if not job.future.done():
+                    job.future.set_exception(SessionClosed())
+        if session_id in self._ring:
+            self._ring.remove(session_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        def pct(values: Deque[float], q: float) -> float:
+            if not values:
+                return 0.0
+            ordered = sorted(values)
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "sessions_waiting": len(self._ring),
+            **self.stats,
+            "wait_ms_p50": pct(self._wait_ms, 0.5),
+            "wait_ms_p95": pct(self._wait_ms, 0.95),
+            "service_ms_p50": pct(self._service_ms, 0.5),
+            "service_ms_p95": pct(self._service_ms, 0.95),
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _jsonable(obj: Any) -> Any:
+    # Grid states use (x, y) tuples, also as dict keys
+    if isinstance(obj, World):
+        return obj.to_dict()
+    if isinstance(obj, dict):
+        return {(",".join(map(str, k)) if isinstance(k, tuple) else str(k)): _jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_jsonable(v) for v in obj]
+    return obj
+
+
+def _events(events: List[Event]) -> List[Dict[str, str]]:
+    return [{"kind": e.kind, "text": e.text} for e in events]
+
+
+class Session:
+    """One game: engine + LLM policy. Turns of a session never overlap."""
+
+    def __init__(self, session_id: str, game: str) -> None:
+        self.id = session_id
+        self.game = game
+        self.turns = 0
+        self.closed = False
+        self.last_active = time.monotonic()
+        self.lock = asyncio.Lock()
+        self.policy: LLMPolicy
+        if game == "lifesim":
+            self.engine: Any = LifeSimEngine()
+            self.state = self.engine.reset()
+            self.policy = LifeSimPolicy(self.state, game="lifesim")
+        else:
+            self.engine = GridEngine(COPLAY_GRID, start={"ben": (0, 0)})
+            self.state = self.engine.reset()
+            self.policy = CoplayPolicy(self.state, game="coplay", engine=self.engine)
+
+    def public_state(self) -> Dict[str, Any]:
+        return _jsonable(self.state)
+
+    async def turn(self, scheduler: Scheduler, action: str, hint: str) -> Dict[str, Any]:
+        async with self.lock:
+            if self.closed:
+                raise SessionClosed()
+            self.last_active = time.monotonic()
+            # Refuse before Ben moves, so a rejected turn leaves no trace
+            scheduler.admit(self.id)
+            events: List[Event] = []
+            action_ben = ""
+            if isinstance(self.policy, CoplayPolicy):
+                action_ben = normalize_human_action(action)
+                mark = self.engine.checkpoint()
+                world_ben = self.engine.act("ben", action_ben)
+                events.append(Event("world", world_ben))
+                self.policy.announce_ben(self.state, action_ben, world_ben, hint)
+            elif hint:
+                self.policy.history.add("user", f"Benutzer-Hinweis: {hint}")
+            try:
+                ava_turn = await scheduler.run(self.id, lambda: self.policy.decide(self.state))
+            except Exception:
+                # A failed turn leaves no trace either: drop the prompt and undo Ben's move
+                if isinstance(self.policy, CoplayPolicy):
+                    self.policy.history.pop()
+                    self.engine.rollback(mark)
+                    self.engine.commit()
+                elif hint:
+                    self.policy.history.pop()
+                raise
+            if isinstance(self.policy, CoplayPolicy):
+                self.engine.commit()  # an unusable answer still leaves Ben's move standing
+            if ava_turn is None:
+                return {"ok": False, "events": _events(events), "state": self.public_state()}
+            if isinstance(self.policy, CoplayPolicy):
+                new_events = ava_round(self.engine, ava_turn, action_ben, hint, self.turns + 1)
+            else:
+                _, new_events = self.engine.step(None, ava_turn)
+            self.policy.observe(self.state, new_events)
+            self.turns += 1
+            return {
+                "ok": True,
+                "events": _events(events + new_events),
+                "speech": ava_turn.speech,
+                "thoughts": ava_turn.thoughts,
+                "state": self.public_state(),
+            }
+
+
+class GameServer:
+    """Session registry, admission control and the HTTP front."""
+
+    def __init__(self, scheduler: Scheduler, max_sessions: int = 32, idle_timeout: float = 1800.0) -> None:
+        self.scheduler = scheduler
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions: Dict[str, Session] = {}
+        self._ids = itertools.count(1)
+        self.stats: Dict[str, int] = {"created": 0, "refused": 0, "expired": 0, "turns": 0}
+
+    # -- sessions ---------------------------------------------------------------------
+    def create(self, game: str) -> Session:
+        self._expire()
+        if len(self.sessions) >= self.max_sessions:
+            self.stats["refused"] += 1
+            raise Overloaded()
+        session = Session(f"s{next(self._ids)}", game)
+        self.sessions[session.id] = session
+        self.stats["created"] += 1
+        return session
+
+    def close(self, session_id: str) -> bool:
+        self.scheduler.drop(session_id)
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.closed = True  # turns still waiting for the lock answer 410
+        return True
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for sid, s in list(self.sessions.items()):
+            if now - s.last_active > self.idle_timeout and not s.lock.locked():
+                self.close(sid)
+                self.stats["expired"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        turns = [s.turns for s in self.sessions.values()]
+        return {
+            "sessions": len(self.sessions),
+            "max_sessions": self.max_sessions,
+            **self.stats,
+            "turns_per_session_mean": round(statistics.mean(turns), 2) if turns else 0.0,
+            "scheduler": self.scheduler.metrics(),
+            "llm": llm_metrics.registry().snapshot(),
+        }
+
+    # -- HTTP -------------------------------------------------------------------------
+    async def route(self, method: str, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        parts = [p for p in path.split("?")[0].split("/") if p]
+        if parts == ["metrics"] and method == "GET":
+            return 200, self.metrics()
+        if parts == ["sessions"] and method == "POST":
+            game = body.get("game", "coplay")
+            if game not in ("lifesim", "coplay"):
+                return 400, {"error": "game muss 'lifesim' oder 'coplay' sein"}
+            try:
+                session = self.create(game)
+            except Overloaded:
+                return 503, {"error": "zu viele Sessions"}
+            return 201, {"id": session.id, "game": game, "state": session.public_state()}
+        if len(parts) >= 2 and parts[0] == "sessions":
+            session = self.sessions.get(parts[1])
+            if session is None:
+                return 404, {"error": "unbekannte Session"}
+            if len(parts) == 2 and method == "GET":
+                return 200, {"id": session.id, "game": session.game, "turns": session.turns, "state": session.public_state()}
+            if len(parts) == 2 and method == "DELETE":
+                self.close(session.id)
+                return 200, {"closed": session.id}
+            if parts[2:] == ["turn"] and method == "POST":
+                try:
+                    result = await session.turn(self.scheduler, str(body.get("action", "")), str(body.get("hint", "")))
+                except Overloaded:
+                    return 429, {"error": "Backend ausgelastet, bitte später erneut"}
+                except SessionClosed:
+                    return 410, {"error": "Session wurde beendet"}
+                except Exception as e:
+                    return 502, {"error": f"KI-Fehler: {e}"}
+                self.stats["turns"] += 1
+                return 200, result
+        return 404, {"error": "nicht gefunden"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                raw = await reader.readexactly(int(headers.get("content-length") or 0))
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    body = None
+                if not isinstance(body, dict):
+                    status, payload = 400, {"error": "Body muss ein JSON-Objekt sein"}
+                else:
+                    status, payload = await self.route(method.upper(), path, body)
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 410: "Gone",
+            429: "Too Many Requests", 502: "Bad Gateway", 503: "Service Unavailable"}
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8765, concurrency: int = 2, max_sessions: int = 32) -> None:
+    scheduler = Scheduler(concurrency=concurrency)
+    server = GameServer(scheduler, max_sessions=max_sessions)
+    tcp = await asyncio.start_server(server.handle, host, port)
+    print(f"Spielserver auf http://{host}:{port} (max. {max_sessions} Sessions, {concurrency} parallele Modellanfragen)")
+    try:
+        async with tcp:
+            await tcp.serve_forever()
+    finally:
+        scheduler.close()
+
+
+def run_server(host: str = "127.0.0.1", port: int = 8765, concurrency: int = 2, max_sessions: int = 32) -> None:
+    try:
+        asyncio.run(serve(host, port, concurrency, max_sessions))
+    except KeyboardInterrupt:
+        print("Spielserver beendet.")
+    print(llm_metrics.summary())
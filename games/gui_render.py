@@ -0,0 +1,267 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import pygame  # type: ignore
+
+from .profiling import timed
+
+# Rendering helpers for the pygame GUIs. The static grid is rasterised once
+# into a background surface; each frame only the cells whose contents changed
+# and the HUD (when its text changed) are redrawn and pushed with
+# display.update(rects). Per-frame cost depends on what changed, not on the
+# grid size. Text surfaces are cached per font and word-wrapped (TextCache).
+# Worlds larger than the window are drawn through a Camera: the renderer's
+# grid is the viewport and scenes pass viewport-relative cells.
+
+Pos = Tuple[int, int]
+Color = Tuple[int, int, int]
+# What occupies a cell: ("agent", color) squares, ("item", color) dots, ("wall", color) blocks
+Glyph = Tuple[str, Color]
+
+# Called once after the first frame is on screen (warm_pool reports click-to-frame latency)
+_first_frame_hooks: List[Callable[[], None]] = []
+
+
+def on_first_frame(callback: Callable[[], None]) -> None:
+    _first_frame_hooks.append(callback)
+
+
+def render_grid(grid: Pos, cell: int, bg: Color, line: Color) -> pygame.Surface:
+    """Static background: fill plus one line per row/column (not one rect per cell)."""
+    w, h = grid[0] * cell, grid[1] * cell
+    surface = pygame.Surface((w, h)).convert() if pygame.display.get_surface() else pygame.Surface((w, h))
+    surface.fill(bg)
+    for x in range(grid[0] + 1):
+        px = min(x * cell, w - 1)
+        pygame.draw.line(surface, line, (px, 0), (px, h - 1))
+        if 0 < x < grid[0]:
+            pygame.draw.line(surface, line, (px - 1, 0), (px - 1, h - 1))
+    for y in range(grid[1] + 1):
+        py = min(y * cell, h - 1)
+        pygame.draw.line(surface, line, (0, py), (w - 1, py))
+        if 0 < y < grid[1]:
+            pygame.draw.line(surface, line, (0, py - 1), (w - 1, py - 1))
+    return surface
+
+
+class Camera:
+    """Viewport of `view` cells onto a `world`-sized grid, kept centred on a target."""
+
+    def __init__(self, view: Pos, world: Pos) -> None:
+        self.view = view
+        self.world = world
+        self.origin: Pos = (0, 0)
+
+    def follow(self, pos: Pos) -> bool:
+        """Centre on `pos` (clamped to the world edges); True if the view moved."""
+        x = max(0, min(self.world[0] - self.view[0], pos[0] - self.view[0] // 2))
+        y = max(0, min(self.world[1] - self.view[1], pos[1] - self.view[1] // 2))
+        moved = (x, y) != self.origin
+        self.origin = (x, y)
+        return moved
+
+    def rect(self) -> Tuple[int, int, int, int]:
+        """Visible world area as (x0, y0, x1, y1), end exclusive."""
+        x, y = self.origin
+        return x, y, x + min(self.view[0], self.world[0]), y + min(self.view[1], self.world[1])
+
+    def to_view(self, pos: Pos) -> Optional[Pos]:
+        x, y = pos[0] - self.origin[0], pos[1] - self.origin[1]
+        if 0 <= x < self.view[0] and 0 <= y < self.view[1]:
+            return x, y
+        return None
+
+
+class GridRenderer:
+    """Redraws changed cells and the HUD only; reports frame CPU time."""
+
+    def __init__(
+        self,
+        screen: pygame.Surface,
+        grid: Pos,
+        cell: int,
+        hud_rect: pygame.Rect,
+        bg: Color = (20, 20, 25),
+        line: Color = (40, 40, 50),
+    ) -> None:
+        self.screen = screen
+        self.grid = grid
+        self.cell = cell
+        self.hud_rect = hud_rect
+        self.background = render_grid(grid, cell, bg, line)
+        self._cells: Dict[Pos, Sequence[Glyph]] = {}
+        self._hud_key: Optional[Hashable] = None
+        self._full = True
+        self.frames = 0
+        self.cpu_ms = 0.0
+        self.cells_redrawn = 0
+        self.hud_redraws = 0
+
+    def invalidate(self) -> None:
+        """Force a full redraw next frame (window exposed/resized)."""
+        self._full = True
+
+    def cell_rect(self, pos: Pos) -> pygame.Rect:
+        return pygame.Rect(pos[0] * self.cell, pos[1] * self.cell, self.cell, self.cell)
+
+    def _draw_cell(self, pos: Pos, glyphs: Sequence[Glyph]) -> pygame.Rect:
+        rect = self.cell_rect(pos)
+        self.screen.blit(self.background, rect, rect)
+        c = self.cell
+        for kind, color in glyphs:
+            if kind == "item":
+                pygame.draw.circle(self.screen, color, rect.center, max(2, c // 5))
+            elif kind == "wall":
+                pygame.draw.rect(self.screen, color, rect.inflate(-2, -2))
+            else:
+                pygame.draw.rect(self.screen, color, rect.inflate(-c // 4, -c // 4))
+        return rect
+
+    @timed("render")
+    def render(
+        self,
+        cells: Dict[Pos, Sequence[Glyph]],
+        hud_key: Hashable,
+        draw_hud: Callable[[pygame.Surface], None],
+    ) -> List[pygame.Rect]:
+        """Draw one frame. `cells` maps occupied positions to their glyphs (in z order);
+        `draw_hud` runs only when `hud_key` differs from the previous frame."""
+        start = time.perf_counter()
+        dirty: List[pygame.Rect] = []
+        if self._full:
+            self.screen.blit(self.background, (0, 0))
+            changed = list(cells)
+        else:
+            changed = [p for p in set(cells) | set(self._cells) if cells.get(p) != self._cells.get(p)]
+        for pos in changed:
+            if 0 <= pos[0] < self.grid[0] and 0 <= pos[1] < self.grid[1]:
+                dirty.append(self._draw_cell(pos, cells.get(pos, ())))
+        self.cells_redrawn += len(dirty)
+        if self._full or hud_key != self._hud_key:
+            draw_hud(self.screen)
+            dirty.append(self.hud_rect)
+            self._hud_key = hud_key
+            self.hud_redraws += 1
+        self._cells = dict(cells)
+        if self._full:
+            pygame.display.flip()
+            self._full = False
+            while _first_frame_hooks:
+                _first_frame_hooks.pop(0)()
+        elif dirty:
+            pygame.display.update(dirty)
+        self.frames += 1
+        self.cpu_ms += (time.perf_counter() - start) * 1000
+        return dirty
+
+    def report(self) -> str:
+        if not self.frames:
+            return "Rendering: keine Frames."
+        return (
+            f"Rendering: {self.frames} Frames, Ø {self.cpu_ms / self.frames:.2f} ms CPU/Frame, "
+            f"Ø {self.cells_redrawn / self.frames:.2f} Zellen neu, HUD {self.hud_redraws}× neu gezeichnet"
+        )
+
+
+class TextCache:
+    """LRU cache of rendered text surfaces (and word-wrapped lines) for one font.
+
+    Entries are keyed by content, so changed text simply misses and old
+    surfaces age out; glyphs are only rasterised when a line is new.
+    """
+
+    def __init__(self, font: pygame.font.Font, max_entries: int = 256) -> None:
+        self.font = font
+        self.max_entries = max_entries
+        self._surfaces: "OrderedDict[Tuple[str, Color, bool], pygame.Surface]" = OrderedDict()
+        self._wraps: "OrderedDict[Tuple[str, int, Optional[int]], List[str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _put(cache: "OrderedDict[Any, Any]", key: Any, value: Any, limit: int) -> None:
+        cache[key] = value
+        if len(cache) > limit:
+            cache.popitem(last=False)
+
+    def render(self, text: str, color: Color, antialias: bool = True) -> pygame.Surface:
+        key = (text, color, antialias)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = self.font.render(text, antialias, color)
+        self._put(self._surfaces, key, surface, self.max_entries)
+        return surface
+
+    def _split_long(self, word: str, width: int) -> List[str]:
+        parts: List[str] = []
+        current = ""
+        for ch in word:
+            if current and self.font.size(current + ch)[0] > width:
+                parts.append(current)
+                current = ch
+            else:
+                current += ch
+        return parts + [current]
+
+    def wrap(self, text: str, width: int, max_lines: Optional[int] = None) -> List[str]:
+        """Greedy word wrap to `width` pixels; with `max_lines` the last line ends in '…'."""
+        key = (text, width, max_lines)
+        lines = self._wraps.get(key)
+        if lines is not None:
+            self._wraps.move_to_end(key)
+            return lines
+        lines = []
+        current = ""
+        for word in text.split():
+            candidate = f"{current} {word}" if current else word
+            if self.font.size(candidate)[0] <= width:
+                current = candidate
+                continue
+            if current:
+                lines.append(current)
+            pieces = self._split_long(word, width) if self.font.size(word)[0] > width else [word]
+            lines.extend(pieces[:-1])
+            current = pieces[-1]
+        if current:
+            lines.append(current)
+        if max_lines is not None and len(lines) > max_lines:
+            lines = lines[:max_lines]
+            last = lines[-1]
+            while last and self.font.size(last + "…")[0] > width:
+                last = last[:-1]
+            lines[-1] = last.rstrip() + "…"
+        self._put(self._wraps, key, lines, self.max_entries)
+        return lines
+
+    def blit(self, screen: pygame.Surface, text: str, color: Color, pos: Tuple[int, int]) -> pygame.Surface:
+        surface = self.render(text, color)
+        screen.blit(surface, pos)
+        return surface
+
+    def blit_wrapped(
+        self,
+        screen: pygame.Surface,
+        text: str,
+        color: Color,
+        pos: Tuple[int, int],
+        width: int,
+        max_lines: Optional[int] = None,
+        line_height: Optional[int] = None,
+    ) -> int:
+        """Draw wrapped text; returns the y below the last line."""
+        x, y = pos
+        step = line_height or self.font.get_linesize()
+        for line in self.wrap(text, width, max_lines):
+            screen.blit(self.render(line, color), (x, y))
+            y += step
+        return y
+
+    def report(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"Text-Cache: {self.misses} Zeilen gerendert, {self.hits} aus dem Cache ({rate:.0%})"
@@ -0,0 +1,142 @@
+import http.client
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Keep-alive HTTP connection pool shared by all games that talk to Ollama.
+# Idle connections are kept per (scheme, host, port); a reused socket that the
+# server already closed is detected on first use and replaced transparently.
+
+HostKey = Tuple[str, str, int]
+
+# Errors that indicate a dead keep-alive socket rather than a real server failure
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+)
+
+
+class ConnectionPool:
+    """Thread-safe pool of persistent http.client connections."""
+
+    def __init__(self, maxsize: int = 4, timeout: float = 60) -> None:
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._idle: Dict[HostKey, Deque[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"new": 0, "reused": 0, "reconnects": 0, "discarded": 0}
+
+    @staticmethod
+    def _key(url: str) -> Tuple[HostKey, str]:
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        port = parts.port or (443 if scheme == "https" else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        return (scheme, parts.hostname or "localhost", port), path
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _checkout(self, key: HostKey, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                self.stats["reused"] += 1
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+        return self._connect(key, timeout), False
+
+    def _connect(self, key: HostKey, timeout: float) -> http.client.HTTPConnection:
+        self._count("new")
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(host, port, timeout=timeout)
+
+    def _checkin(self, key: HostKey, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, deque())
+            if len(idle) < self.maxsize:
+                idle.append(conn)
+                return
+            self.stats["discarded"] += 1
+        conn.close()
+
+    @contextmanager
+    def open(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[http.client.HTTPResponse]:
+        """Send a request and yield the response; the connection returns to the pool afterwards.
+
+        The connection is only reused if the caller consumed the whole body.
+        """
+        key, path = self._key(url)
+        t = self.timeout if timeout is None else timeout
+        conn, reused = self._checkout(key, t)
+        try:
+            try:
+                conn.request(method, path, body=body, headers=dict(headers or {}))
+                resp = conn.getresponse()
+            except _STALE_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+                # Server closed the idle socket; retry once on a fresh connection
+                self._count("reconnects")
+                conn = self._connect(key, t)
+                conn.request(method, path, body=body, headers=dict(headers or {}))
+                resp = conn.getresponse()
+        except BaseException:
+            conn.close()
+            raise
+
+        try:
+            yield resp
+        except BaseException:
+            conn.close()
+            raise
+        if resp.isclosed() and not resp.will_close:
+            self._checkin(key, conn)
+        else:
+            conn.close()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Tuple[int, str, bytes]:
+        """Perform a request and return (status, reason, body)."""
+        with self.open(method, url, body=body, headers=headers, timeout=timeout) as resp:
+            data = resp.read()
+            return resp.status, resp.reason, data
+
+    def close(self) -> None:
+        with self._lock:
+            conns = [c for idle in self._idle.values() for c in idle]
+            self._idle.clear()
+        for c in conns:
+            c.close()
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            out = dict(self.stats)
+            out["idle"] = sum(len(d) for d in self._idle.values())
+        return out
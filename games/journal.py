@@ -0,0 +1,414 @@
+import hashlib
+import json
+import os
+import time
+from collections.abc import MutableMapping
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .context_window import ContextWindow
+from .world import World
+
+# Append-only session journal for the console LifeSim and Co-Play games. One
+# JSONL file per session, opened for appending and flushed after every
+# record; nothing is ever rewritten:
+#   {"type": "header", "game", "version", "seed", "created"}
+#   {"type": "turn", "round", "turn", "prompt", "raw", "parsed", "input", "delta", "digest"[, "feedback"]}
+#   {"type": "snap", "round", "turn", "state", "history", "digest"}
+# "prompt" holds the messages appended to the ContextWindow since the
+# previous record (retry pairs marked), "input" is Ben's action as handed to
+# the rules, "feedback" (only if given) the feedback Ben typed for Ava,
+# "delta" lists what changed in the state as [path, "=", value] (set),
+# [path, "+", values] (list grew) or [path, "-", null] (key removed),
+# and "digest" chains a hash over all deltas so far. A snapshot (full state +
+# history) follows the header, the end of a session and at least SNAP_EVERY
+# turn records, once those add up to half the size of the previous snapshot
+# (so a state that keeps growing, like Co-Play's log, costs O(n) disk space
+# rather than O(n²)). resume() only reads the file backwards to the last
+# snapshot and applies the records after it, however long the session was.
+
+VERSION = 1
+SNAP_EVERY = 20
+ENV_DIR = "NEWTRY3_JOURNAL_DIR"  # where sessions are journaled; "off" disables
+
+Path = Tuple[str, ...]
+
+
+def default_dir() -> Optional[str]:
+    raw = os.environ.get(ENV_DIR, "").strip()
+    if raw.lower() in ("off", "0", "none"):
+        return None
+    return raw or os.path.join(os.path.expanduser("~"), ".newtry3", "sessions")
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+# -- state codec ---------------------------------------------------------------------
+
+
+def _is_tree(value: Any) -> bool:
+    """Plain str-keyed dicts are diffed key by key; everything else as one value."""
+    return type(value) is dict and all(isinstance(k, str) and not k.startswith("$") for k in value)
+
+
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def encode(value: Any) -> Any:
+    """JSON-ready form of a state value (World, tuples and tuple-keyed maps tagged)."""
+    if type(value) in _SCALARS:
+        return value
+    if isinstance(value, World):
+        return {"$world": value.compact()}
+    if isinstance(value, tuple):
+        return {"$t": [encode(v) for v in value]}
+    if isinstance(value, list):
+        return [encode(v) for v in value]
+    if _is_tree(value):
+        return {k: encode(v) for k, v in value.items()}
+    if isinstance(value, (dict, MutableMapping)):
+        return {"$pairs": [[encode(k), encode(v)] for k, v in value.items()]}
+    return value
+
+
+def decode(value: Any) -> Any:
+    if isinstance(value, list):
+        return [decode(v) for v in value]
+    if isinstance(value, dict):
+        if "$world" in value:
+            return World.from_compact(value["$world"])
+        if "$t" in value:
+            return tuple(decode(v) for v in value["$t"])
+        if "$pairs" in value:
+            return {decode(k): decode(v) for k, v in value["$pairs"]}
+        return {k: decode(v) for k, v in value.items()}
+    return value
+
+
+def _assign(target: Any, key: str, value: Any) -> None:
+    old = target.get(key)
+    if isinstance(old, MutableMapping) and type(old) is not dict and isinstance(value, dict):
+        # e.g. the tile map's SpatialHash: keep the object the engine holds on to
+        old.clear()
+        old.update(value)
+    else:
+        target[key] = value
+
+
+def apply_delta(state: Dict[str, Any], ops: List[List[Any]]) -> None:
+    """Replay one record's delta onto `state` in place."""
+    for path, op, value in ops:
+        target = state
+        for key in path[:-1]:
+            target = target[key]
+        key = path[-1]
+        if op == "+":
+            target[key].extend(decode(value))
+        elif op == "-":
+            target.pop(key, None)
+        else:
+            _assign(target, key, decode(value))
+
+
+def restore_state(state: Dict[str, Any], decoded: Dict[str, Any]) -> None:
+    """Replace the contents of `state` in place (engine and policies keep their reference)."""
+    for key in list(state):
+        if key not in decoded:
+            del state[key]
+    for key, value in decoded.items():
+        _assign(state, key, value)
+
+
+class StateTracker:
+    """Turns successive versions of a state dict into journal deltas.
+
+    Lists are assumed to grow at the end (logs, memories, inventory): as long
+    as the list object, its earlier length and its previous last element are
+    unchanged, only the new tail is recorded, so a turn costs the size of what
+    changed rather than the size of the session. Worlds are compared by their
+    version counter.
+    """
+
+    def __init__(self, digest: str = "") -> None:
+        self._seen: Dict[Path, Tuple[Any, ...]] = {}
+        self.digest = digest
+
+    def prime(self, state: Dict[str, Any]) -> None:
+        """Take `state` as the baseline without recording anything."""
+        self._seen = {}
+        self._tree((), state, None)
+
+    def delta(self, state: Dict[str, Any]) -> List[List[Any]]:
+        """Changes since the previous call; advances the digest."""
+        ops: List[List[Any]] = []
+        self._tree((), state, ops)
+        self.digest = hashlib.sha1((self.digest + _dumps(ops)).encode("utf-8")).hexdigest()[:16]
+        return ops
+
+    # `ops` is None while priming: only remember, encode nothing
+
+    def _tree(self, path: Path, value: Dict[str, Any], ops: Optional[List[List[Any]]]) -> None:
+        seen = self._seen.get(path)
+        keys = tuple(value)
+        if seen is not None and seen[0] == "tree" and seen[1] != keys:
+            for key in seen[1]:
+                if key not in value:
+                    if ops is not None:
+                        ops.append([list(path + (key,)), "-", None])
+                    self._forget(path + (key,))
+        self._seen[path] = ("tree", keys)
+        for key, child in value.items():
+            self._check(path + (key,), child, ops)
+
+    def _forget(self, path: Path) -> None:
+        n = len(path)
+        for key in [k for k in self._seen if k[:n] == path]:
+            del self._seen[key]
+
+    def _check(self, path: Path, value: Any, ops: Optional[List[List[Any]]]) -> None:
+        seen = self._seen.get(path)
+        if seen is not None and seen[0] == "tree" and not _is_tree(value):
+            self._forget(path)
+        if _is_tree(value):
+            if seen is None or seen[0] != "tree":
+                if ops is not None:
+                    ops.append([list(path), "=", encode(value)])
+                self._forget(path)
+                self._tree(path, value, None)
+            else:
+                self._tree(path, value, ops)
+            return
+        if isinstance(value, World):
+            mark = ("world", id(value), value.version)
+            if seen != mark:
+                if ops is not None:
+                    ops.append([list(path), "=", encode(value)])
+                self._seen[path] = mark
+            return
+        if isinstance(value, list):
+            last = _dumps(encode(value[-1])) if value else ""
+            if seen is not None and seen[0] == "list" and seen[1] == id(value) and seen[2] <= len(value):
+                n = seen[2]
+                before = last if n == len(value) else _dumps(encode(value[n - 1])) if n else ""
+                grown = before == seen[3]
+            else:
+                n, grown = 0, False
+            if ops is not None:
+                if not grown:
+                    ops.append([list(path), "=", encode(value)])
+                elif n < len(value):
+                    ops.append([list(path), "+", encode(value[n:])])
+            self._seen[path] = ("list", id(value), len(value), last)
+            return
+        text = _dumps(encode(value))
+        if seen != ("value", text):
+            if ops is not None:
+                ops.append([list(path), "=", encode(value)])
+            self._seen[path] = ("value", text)
+
+
+# -- writing ---------------------------------------------------------------------------
+
+
+class Journal:
+    """Writer for one session file; every record is flushed right away."""
+
+    def __init__(self, path: str, game: str, seed: Optional[int] = None, snap_every: int = SNAP_EVERY) -> None:
+        self.path = path
+        self.game = game
+        self.seed = seed
+        self.snap_every = snap_every
+        self.tracker = StateTracker()
+        self.round = 0
+        self.records = 0
+        self._since_snap = 0
+        self._tail_bytes = 0
+        self._snap_bytes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        fresh = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not fresh:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+        self._file = open(path, "a", encoding="utf-8")
+        if not fresh and torn:
+            self._file.write("\n")  # a killed session may have left half a line; it stays unreadable
+        if fresh:
+            self._write({"type": "header", "game": game, "version": VERSION, "seed": seed, "created": time.time()})
+
+    @classmethod
+    def create(cls, game: str, seed: Optional[int] = None, path: Optional[str] = None) -> Optional["Journal"]:
+        """Journal under `path` or a fresh file in default_dir(); None if journaling is off."""
+        if path is None:
+            folder = default_dir()
+            if folder is None:
+                return None
+            path = os.path.join(folder, f"{game}-{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+        return cls(path, game, seed)
+
+    def _write(self, record: Dict[str, Any]) -> int:
+        line = _dumps(record) + "\n"
+        self._file.write(line)
+        self._file.flush()
+        self.records += 1
+        return len(line)
+
+    def begin(self, state: Dict[str, Any], history: ContextWindow) -> None:
+        """Baseline snapshot; from here on the history's new messages are collected."""
+        self.snapshot(state, history)
+        history.added = []
+
+    def resume(self, point: "ResumePoint", state: Dict[str, Any], history: ContextWindow) -> None:
+        """Continue an existing file from a restored session (digest chain included)."""
+        self.tracker = StateTracker(point.digest)
+        self.round = point.round
+        self.snapshot(state, history)  # marks where the restored session picks up
+        history.added = []
+
+    def snapshot(self, state: Dict[str, Any], history: ContextWindow) -> None:
+        self.tracker.prime(state)
+        self._snap_bytes = self._write({
+            "type": "snap",
+            "round": self.round,
+            "turn": state.get("turn", 0),
+            "state": encode(state),
+            "history": history.to_dict(),
+            "digest": self.tracker.digest,
+        })
+        self._since_snap = 0
+        self._tail_bytes = 0
+
+    def turn(
+        self,
+        state: Dict[str, Any],
+        history: ContextWindow,
+        raw: str,
+        parsed: Any,
+        ben_action: Optional[str] = None,
+        round_no: Optional[int] = None,
+        feedback: str = "",
+    ) -> None:
+        """One round: what the model saw and said, and how the state changed."""
+        self.round = round_no if round_no is not None else self.round + 1
+        delta = self.tracker.delta(state)
+        record = {
+            "type": "turn",
+            "round": self.round,
+            "turn": state.get("turn", 0),
+            "prompt": history.take_added(),
+            "raw": raw,
+            "parsed": parsed.model_dump(exclude_none=True) if parsed is not None else None,
+            "input": ben_action,
+            "delta": delta,
+            "digest": self.tracker.digest,
+        }
+        if feedback:
+            record["feedback"] = feedback
+        self._tail_bytes += self._write(record)
+        self._since_snap += 1
+        if self._since_snap >= self.snap_every and self._tail_bytes * 2 >= self._snap_bytes:
+            self.snapshot(state, history)
+
+    def close(self, state: Dict[str, Any], history: ContextWindow) -> str:
+        """Final snapshot (messages added after the last turn included); returns a status line."""
+        if self._file.closed:
+            return ""
+        self.snapshot(state, history)
+        self._file.close()
+        return f"Journal: {self.path} ({self.records} Einträge geschrieben, fortsetzen mit --resume)"
+
+
+# -- reading ---------------------------------------------------------------------------
+
+
+class JournalError(ValueError):
+    """A journal that cannot be resumed (not a journal, no snapshot, damaged, other game)."""
+
+
+class ResumePoint(NamedTuple):
+    header: Dict[str, Any]
+    round: int
+    state: Dict[str, Any]  # decoded, tail deltas applied
+    history: Dict[str, Any]  # ContextWindow.to_dict() at the snapshot
+    prompts: List[List[Dict[str, Any]]]  # messages of each turn record after it
+    digest: str
+
+
+def _parse(line: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None  # e.g. the last line of a session that was killed mid-write
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        header = _parse(f.readline())
+    if not header or header.get("type") != "header":
+        raise JournalError(f"{path}: kein Sitzungsjournal")
+    if header.get("version") != VERSION:
+        raise JournalError(f"{path}: Journal-Version {header.get('version')} wird nicht unterstützt")
+    return header
+
+
+def _tail_records(path: str, block: int = 1 << 16) -> List[Dict[str, Any]]:
+    """Records from the last snapshot to the end, reading the file backwards."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        buf = b""
+        records: List[Dict[str, Any]] = []
+        while end > 0:
+            start = max(0, end - block)
+            f.seek(start)
+            buf = f.read(end - start) + buf
+            end = start
+            lines = buf.split(b"\n")
+            buf = lines[0] if start > 0 else b""  # possibly cut off: completed by the next block
+            for line in reversed(lines[1:] if start > 0 else lines):
+                if not line.strip():
+                    continue
+                record = _parse(line)
+                if record is None:
+                    continue
+                records.append(record)
+                if record.get("type") == "snap":
+                    records.reverse()
+                    return records
+    raise JournalError(f"{path}: kein Snapshot gefunden")
+
+
+def load(path: str) -> ResumePoint:
+    """Last snapshot plus the turn records after it; cost independent of session length."""
+    try:
+        header = read_header(path)
+        records = _tail_records(path)
+    except OSError as e:
+        raise JournalError(f"{path}: {e.strerror or e}") from e
+    snap, tail = records[0], [r for r in records[1:] if r.get("type") == "turn"]
+    try:
+        state = decode(snap["state"])
+        digest = snap.get("digest", "")
+        round_no = snap.get("round", 0)
+        for record in tail:
+            apply_delta(state, record["delta"])
+            digest = record["digest"]
+            round_no = record["round"]
+        return ResumePoint(header, round_no, state, snap["history"], [r["prompt"] for r in tail], digest)
+    except (KeyError, IndexError, TypeError, AttributeError) as e:
+        raise JournalError(f"{path}: Journal beschädigt ({type(e).__name__}: {e})") from e
+
+
+def resume_into(path: str, game: str, state: Dict[str, Any], history: ContextWindow) -> Tuple[Journal, ResumePoint]:
+    """Restore `state` and `history` in place from `path` and keep journaling into it."""
+    point = load(path)
+    if point.header.get("game") != game:
+        raise JournalError(f"{path}: Journal gehört zu '{point.header.get('game')}', nicht zu '{game}'")
+    restore_state(state, point.state)
+    history.restore(point.history)
+    for messages in point.prompts:
+        history.replay(messages)
+    journal = Journal(path, game, point.header.get("seed"))
+    journal.resume(point, state, history)
+    return journal, point
@@ -0,0 +1,233 @@
+import json
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, Literal, Optional, Tuple, Type, Union, cast, get_args, get_origin
+
+from pydantic import BaseModel
+
+from .commands import parse_command
+
+# Salvages near-valid model output before the caller gives up and re-asks the
+# model. Every stage is cheap string work; each successful repair is one LLM
+# round trip (plus two history messages) saved.
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.S)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "„": '"', "«": '"', "»": '"'})
+_PY_LITERALS = re.compile(r"(?<![\w\"])(True|False|None)(?![\w\"])")
+_UNQUOTED_KEY = re.compile(r"([{,]\s*)([A-Za-z_][\w-]*)(\s*:)")
+# A string literal with the escapes first_balanced_object() honours; an unclosed one runs to the end
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*\\?(?:"|\Z)', re.S)
+
+# Free-form action phrases -> Action literal, via the command grammar
+# (games/commands.py): a move needs a direction, other verbs map by kind.
+_MOVES = {"nord": "move_up", "sued": "move_down", "west": "move_left", "ost": "move_right"}
+_VERB_ACTIONS = {"take": "interact", "open": "interact", "use": "interact", "look": "wait", "speak": "wait"}
+
+
+class RepairStats:
+    """Counts parses that only succeeded thanks to a repair step."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.json_fixed = 0     # syntax repaired (fences, commas, quotes, truncation)
+        self.fields_fixed = 0   # schema repaired (action mapped, keys dropped, types coerced)
+        self.round_trips_saved = 0
+
+    def report(self) -> str:
+        return (
+            f"JSON-Reparatur: {self.round_trips_saved} Anfragen gespart "
+            f"({self.json_fixed} Syntax, {self.fields_fixed} Schema)"
+        )
+
+
+STATS = RepairStats()
+_local = threading.local()
+
+
+def note_saved(kind: str) -> None:
+    """Mark the current parse as repaired ("json" = syntax, otherwise schema)."""
+    kinds = getattr(_local, "kinds", None)
+    if kinds is None:
+        kinds = _local.kinds = set()
+    kinds.add(kind)
+
+
+def consume_repaired(valid: bool = True) -> bool:
+    """Whether the last parse on this thread needed a repair; resets the marks.
+
+    Only repairs that ended in a valid turn are counted as saved round trips.
+    """
+    kinds = getattr(_local, "kinds", None) or set()
+    _local.kinds = set()
+    if not kinds or not valid:
+        return False
+    with STATS.lock:
+        if "json" in kinds:
+            STATS.json_fixed += 1
+        if kinds - {"json"}:
+            STATS.fields_fixed += 1
+        STATS.round_trips_saved += 1
+    return True
+
+
+def strip_code_fences(text: str) -> str:
+    m = _FENCE.search(text)
+    return m.group(1) if m else text
+
+
+def first_balanced_object(text: str) -> Optional[str]:
+    """Span of the first complete {...} object; a truncated one gets closed."""
+    start = text.find("{")
+    if start == -1:
+        return None
+    stack = []
+    in_str = False
+    escape = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_str:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return text[start:i + 1]
+    # Output cut off mid-object: close open string and brackets
+    tail = '"' if in_str else ""
+    return text[start:] + tail + "".join(reversed(stack))
+
+
+def _outside_strings(s: str, fix: Callable[[str], str]) -> str:
+    """Apply `fix` only to the parts of `s` between string literals."""
+    out = []
+    pos = 0
+    for m in _STRING.finditer(s):
+        out.append(fix(s[pos:m.start()]))
+        out.append(m.group())
+        pos = m.end()
+    out.append(fix(s[pos:]))
+    return "".join(out)
+
+
+def _fix_tokens(code: str) -> str:
+    code = _PY_LITERALS.sub(lambda m: {"True": "true", "False": "false", "None": "null"}[m.group(1)], code)
+    code = _UNQUOTED_KEY.sub(r'\1"\2"\3', code)
+    return _TRAILING_COMMA.sub(r"\1", code)
+
+
+def _fix_syntax(snippet: str) -> str:
+    s = snippet.translate(_SMART_QUOTES)
+    if "'" in s and '"' not in s:
+        s = s.replace("'", '"')
+    # Speech like "Hallo, Ben: ..." or "True, ]" must survive untouched
+    return _outside_strings(s, _fix_tokens)
+
+
+def _loads_object(snippet: str) -> Optional[Dict[str, Any]]:
+    try:
+        raw = json.loads(snippet)
+    except ValueError:
+        return None
+    return cast(Dict[str, Any], raw) if isinstance(raw, dict) else None
+
+
+def repair_json(text: str) -> Optional[Dict[str, Any]]:
+    """Best-effort extraction of one JSON object from model output."""
+    body = strip_code_fences(text)
+    snippet = first_balanced_object(body)
+    if snippet is None:
+        return None
+    data = _loads_object(snippet)
+    if data is None:
+        data = _loads_object(_fix_syntax(snippet))
+        if data is not None:
+            note_saved("json")
+    return data
+
+
+def normalize_action(raw: Any, allowed: Iterable[str]) -> Tuple[str, str]:
+    """Map a free-form action onto the allowed literals.
+
+    Returns (action, spoken_text); spoken_text is filled for 'speak:<text>'.
+    """
+    text = str(raw or "").strip()
+    allowed = tuple(allowed)
+    if text in allowed:
+        return text, ""
+    spoken = ""
+    low = text.lower()
+    if ":" in low and low.split(":", 1)[0].strip() in ("speak", "sage", "spreche", "say"):
+        spoken = text.split(":", 1)[1].strip()
+        return ("wait" if "wait" in allowed else allowed[0]), spoken
+    cmd = parse_command(low)
+    if cmd.direction and cmd.verb == "go":
+        action = _MOVES[cmd.direction]
+    else:
+        action = _VERB_ACTIONS.get(cmd.verb, "wait")
+    if action in allowed:
+        return action, spoken
+    return ("wait" if "wait" in allowed else allowed[0]), spoken
+
+
+def _unwrap_optional(annotation: Any) -> Tuple[Any, bool]:
+    if get_origin(annotation) is Union:
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            return args[0], True
+    return annotation, False
+
+
+def coerce_to_model(data: Dict[str, Any], model: Type[BaseModel]) -> Tuple[Dict[str, Any], bool]:
+    """Fit a dict to a pydantic model: drop unknown keys, map Literal values,
+    stringify values of str/Dict[str, str] fields. Returns (data, changed)."""
+    out: Dict[str, Any] = {}
+    changed = False
+    for key, value in data.items():
+        field = model.model_fields.get(key)
+        if field is None:
+            changed = True
+            continue
+        ann, optional = _unwrap_optional(field.annotation)
+        origin = get_origin(ann)
+        new = value
+        if value is None:
+            pass
+        elif isinstance(ann, type) and issubclass(ann, BaseModel):
+            if isinstance(value, dict):
+                new, sub_changed = coerce_to_model(value, ann)
+                changed = changed or sub_changed
+            else:
+                new = None
+        elif origin is Literal:
+            new, spoken = normalize_action(value, [str(a) for a in get_args(ann)])
+            if spoken and not data.get("speech"):
+                out["speech"] = spoken
+        elif ann is str and not isinstance(value, str):
+            new = "; ".join(str(v) for v in value) if isinstance(value, list) else str(value)
+        elif origin is dict:
+            if isinstance(value, dict):
+                new = {
+                    str(k): v if isinstance(v, str) else json.dumps(v, ensure_ascii=False)
+                    for k, v in value.items() if v is not None
+                }
+            else:
+                new = None
+        if new is None and not optional:
+            # Not nullable: fall back to the field default
+            changed = True
+            continue
+        if new != value:
+            changed = True
+        out[key] = new
+    return out, changed
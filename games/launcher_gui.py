@@ -5,12 +5,17 @@ from typing import List, Tuple, Dict, Any
 
 # Simple Pygame-based GUI launcher that spawns each game in a separate Python process.
 # Console games are launched with a new console window on Windows for proper input handling.
+# GUI games go to a pre-started worker from games/warm_pool.py when one is available.
 
 try:
     import pygame  # type: ignore
 except Exception as e:  # pragma: no cover
     raise RuntimeError("Pygame ist erforderlich für den GUI-Launcher. Bitte 'pip install -r requirements.txt' ausführen.") from e
 
+from . import registry
+from .gui_render import TextCache
+from .warm_pool import WarmPool
+
 
 CELL_H = 56
 PAD_X = 20
@@ -46,19 +51,12 @@ def _spawn_game(run_id: str, needs_console: bool) -> None:
 
 
 def run_launcher() -> None:
-    entries: List[Dict[str, Any]] = [
-        {"title": "Zahlenraten (Konsole)", "run": "number_guess", "console": True},
-        {"title": "Tic-Tac-Toe (Konsole)", "run": "tic_tac_toe", "console": True},
-        {"title": "KI-Quiz (Ollama, Konsole)", "run": "ollama_quiz", "console": True},
-        {"title": "LifeSim (Text, KI)", "run": "lifesim", "console": True},
-        {"title": "LifeSim GUI (pygame, KI)", "run": "lifesim_gui", "console": False},
-        {"title": "Co-Play (Text: Ava+Ben)", "run": "coplay", "console": True},
-        {"title": "Co-Play GUI (pygame: Ava+Ben)", "run": "coplay_gui", "console": False},
-    ]
+    entries: List[Dict[str, Any]] = [{"title": g.title, "run": g.id, "console": g.console} for g in registry.GAMES]
 
     pygame.init()
-    font = pygame.font.SysFont(None, 24)
-    title_font = pygame.font.SysFont(None, 32, bold=True)
+    # Labels are static, so after the first frame every text blit is a cache hit
+    text = TextCache(pygame.font.SysFont(None, 24))
+    title_text = TextCache(pygame.font.SysFont(None, 32, bold=True))
 
     width = PAD_X * 2 + BTN_W
     height = PAD_Y * 2 + (BTN_H + GAP) * len(entries) + 80
@@ -75,6 +73,9 @@ def run_launcher() -> None:
         y += BTN_H + GAP
 
     quit_rect = pygame.Rect(PAD_X, height - PAD_Y - BTN_H, BTN_W, BTN_H)
+    titles = {str(e["run"]): str(e["title"]) for e in entries}
+    pool = WarmPool().start()
+    status = ""
 
     running = True
     while running:
@@ -90,13 +91,19 @@ def run_launcher() -> None:
                 else:
                     for rect, meta in buttons:
                         if rect.collidepoint(mx, my):
-                            _spawn_game(str(meta["run"]), bool(meta.get("console", False)))
+                            if not pool.launch(str(meta["run"])):
+                                _spawn_game(str(meta["run"]), bool(meta.get("console", False)))
                             break
 
+        for run_id, ms, warm in pool.poll():
+            status = f"{titles[run_id]}: erstes Bild nach {ms:.0f} ms ({'warm' if warm else 'kalt'})"
+            print(status)
+
         # Draw
         screen.fill((18, 18, 22))
-        title = title_font.render("Python Spielesammlung – Launcher", True, (235, 235, 245))
-        screen.blit(title, (PAD_X, PAD_Y))
+        title_text.blit(screen, "Python Spielesammlung – Launcher", (235, 235, 245), (PAD_X, PAD_Y))
+        if status:
+            text.blit_wrapped(screen, status, (170, 190, 170), (PAD_X, PAD_Y + 32), BTN_W, max_lines=1)
 
         mouse = pygame.mouse.get_pos()
         for rect, meta in buttons:
@@ -105,19 +112,18 @@ def run_launcher() -> None:
             pygame.draw.rect(screen, color, rect, border_radius=8)
             pygame.draw.rect(screen, (20, 40, 80), rect, width=2, border_radius=8)
 
-            label = meta["title"]
-            txt = font.render(label, True, (240, 240, 250))
-            screen.blit(txt, (rect.x + 12, rect.y + 12))
+            text.blit_wrapped(screen, meta["title"], (240, 240, 250), (rect.x + 12, rect.y + 12), rect.w - 24, max_lines=1)
 
         # Quit button
         hover_q = quit_rect.collidepoint(mouse)
         qcolor = (200, 70, 70) if hover_q else (160, 50, 50)
         pygame.draw.rect(screen, qcolor, quit_rect, border_radius=8)
         pygame.draw.rect(screen, (90, 30, 30), quit_rect, width=2, border_radius=8)
-        qtxt = font.render("Beenden (Esc)", True, (250, 235, 235))
-        screen.blit(qtxt, (quit_rect.x + 12, quit_rect.y + 12))
+        text.blit(screen, "Beenden (Esc)", (250, 235, 235), (quit_rect.x + 12, quit_rect.y + 12))
 
         pygame.display.flip()
         clock.tick(60)
 
+    pool.close()
+    print(pool.report())
     pygame.quit()
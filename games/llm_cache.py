@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Mapping, Optional, Set
+
+# Optional, content-addressed cache for model answers. Keys hash model,
+# messages and request options, so replays, demos and tests that send the
+# same conversation get the stored answer instead of waiting for the model.
+#
+# Layers: in-memory LRU -> size-bounded SQLite file. Identical requests that
+# are in flight at the same time are collapsed into one backend call.
+#
+# Enabled per game id via enable() or the NEWTRY3_LLM_CACHE environment
+# variable (comma-separated ids, "*" for all), e.g. set by `main.py --cache`.
+
+ENV_GAMES = "NEWTRY3_LLM_CACHE"
+ENV_PATH = "NEWTRY3_LLM_CACHE_PATH"
+
+
+def default_path() -> str:
+    return os.environ.get(ENV_PATH) or os.path.join(os.path.expanduser("~"), ".newtry3", "llm_cache.sqlite")
+
+
+def cache_key(model: str, messages: List[Dict[str, str]], options: Optional[Mapping[str, Any]] = None) -> str:
+    blob = json.dumps(
+        {"model": model, "messages": messages, "options": options or {}},
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class ResponseCache:
+    """LRU memory front over a size-bounded SQLite store, with single-flight requests."""
+
+    def __init__(self, path: Optional[str] = None, mem_entries: int = 256, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.path = path or default_path()
+        self.mem_entries = mem_entries
+        self.max_bytes = max_bytes
+        self._mem: "OrderedDict[str, str]" = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"mem_hits": 0, "disk_hits": 0, "misses": 0, "joined": 0, "stored": 0, "evicted": 0}
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "size INTEGER NOT NULL, atime REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_atime ON entries (atime)")
+        self._db.commit()
+
+    # -- lookups ---------------------------------------------------------------
+    def lookup(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._mem.get(key)
+            if value is not None:
+                self._mem.move_to_end(key)
+                self.stats["mem_hits"] += 1
+                return value
+            row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._db.execute("UPDATE entries SET atime = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.stats["disk_hits"] += 1
+            self._remember(key, row[0])
+            return row[0]
+
+    def store(self, key: str, value: str) -> None:
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._remember(key, value)
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, atime) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self.stats["stored"] += 1
+            self._evict_disk()
+            self._db.commit()
+
+    def _remember(self, key: str, value: str) -> None:
+        self._mem[key] = value
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.mem_entries:
+            self._mem.popitem(last=False)
+
+    def _evict_disk(self) -> None:
+        (total,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        while total > self.max_bytes:
+            row = self._db.execute("SELECT key, size FROM entries ORDER BY atime LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (row[0],))
+            self._mem.pop(row[0], None)
+            total -= row[1]
+            self.stats["evicted"] += 1
+
+    # -- single flight -----------------------------------------------------------
+    def begin(self, key: str) -> Optional[_Flight]:
+        """Claim a miss. Returns None if the caller must fetch and then complete()/abandon(),
+        or the in-flight request of another caller to wait on."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.stats["joined"] += 1
+                return flight
+            self._flights[key] = _Flight()
+            return None
+
+    def complete(self, key: str, value: str) -> None:
+        self.store(key, value)
+        with self._lock:
+            flight = self._flights.pop(key, None)
+        if flight:
+            flight.value = value
+            flight.done.set()
+
+    def abandon(self, key: str, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            flight = self._flights.pop(key, None)
+        if flight:
+            flight.error = error or RuntimeError("Anfrage abgebrochen")
+            flight.done.set()
+
+    def fetch(self, key: str, compute: Callable[[], str]) -> str:
+        """Cached value for key, computing it at most once across concurrent callers."""
+        value = self.lookup(key)
+        if value is not None:
+            return value
+        flight = self.begin(key)
+        if flight is not None:
+            return wait(flight)
+        try:
+            value = compute()
+        except BaseException as e:
+            self.abandon(key, e)
+            raise
+        self.complete(key, value)
+        return value
+
+    def report(self) -> str:
+        s = self.stats
+        hits = s["mem_hits"] + s["disk_hits"]
+        total = hits + s["misses"]
+        rate = hits / total if total else 0.0
+        return (
+            f"LLM-Cache: {hits}/{total} Treffer ({rate:.0%}; RAM {s['mem_hits']}, Disk {s['disk_hits']}), "
+            f"{s['joined']} zusammengelegt, {s['evicted']} verdrängt"
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def wait(flight: _Flight, timeout: Optional[float] = None) -> str:
+    if not flight.done.wait(timeout):
+        raise RuntimeError("Zeitüberschreitung beim Warten auf identische Anfrage")
+    if flight.error is not None:
+        raise RuntimeError(f"Identische Anfrage fehlgeschlagen: {flight.error}") from flight.error
+    return flight.value or ""
+
+
+# -- per-game switch -------------------------------------------------------------
+_enabled: Set[str] = set()
+_cache: Optional[ResponseCache] = None
+_env_loaded = False
+_switch_lock = threading.Lock()
+
+
+def enable(game_ids: List[str], path: Optional[str] = None) -> None:
+    """Turn caching on for the given game ids ("*" = every game)."""
+    global _cache
+    with _switch_lock:
+        _enabled.update(game_ids)
+        if path and (_cache is None or _cache.path != path):
+            _cache = ResponseCache(path)
+
+
+def _load_env() -> None:
+    global _env_loaded
+    _env_loaded = True
+    raw = os.environ.get(ENV_GAMES, "")
+    _enabled.update(g.strip() for g in raw.split(",") if g.strip())
+
+
+def cache_for(game: Optional[str]) -> Optional[ResponseCache]:
+    """The shared cache if caching is enabled for this game, else None."""
+    global _cache
+    with _switch_lock:
+        if not _env_loaded:
+            _load_env()
+        if not _enabled or not ("*" in _enabled or (game is not None and game in _enabled)):
+            return None
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+
+def active_cache() -> Optional[ResponseCache]:
+    return _cache
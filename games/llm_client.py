@@ -1,68 +1,359 @@
+import http.client
 import json
-import urllib.request
-import urllib.error
-from typing import Dict, Any, List, Mapping, Optional, cast
+import time
+from typing import Callable, Dict, Any, Iterator, List, Mapping, NamedTuple, Optional, Tuple
 
+from pydantic import ValidationError
+
+from .backend import DEFAULT_HOST, ENV_HOST, POOL, base_url, connection_stats, ensure_ollama_up, set_base_url
+from .json_repair import coerce_to_model, consume_repaired, note_saved, repair_json
+from .llm_cache import cache_for, cache_key, wait as wait_for_flight
+from .llm_metrics import call_context, record_call
+from .profiling import begin_turn, section
 from .schemas import AvaTurn
+from .stream_parser import stream_turn
 
-OLLAMA_API_URL = "http://localhost:11434/api/chat"
 DEFAULT_MODEL = "gemma3:1b"
 
+# JSON schema passed as Ollama's `format` so the model can only emit valid turns
+AVA_TURN_SCHEMA: Dict[str, Any] = AvaTurn.model_json_schema()
 
-def ensure_ollama_up(verbose: bool = False) -> bool:
-    try:
-        with urllib.request.urlopen("http://localhost:11434/api/tags", timeout=2) as resp:
-            if resp.status == 200:
-                if verbose:
-                    print("Ollama server erreichbar.")
-                return True
-    except Exception as e:
-        if verbose:
-            print("Ollama scheint nicht zu laufen auf http://localhost:11434", e)
-    return False
-
-
-def chat(messages: List[Dict[str, str]], model: str = DEFAULT_MODEL, stream: bool = False, timeout: int = 60) -> str:
-    data = json.dumps({
+# Extra requests allowed per turn when the answer still fails validation
+RETRY_BUDGET: Dict[str, int] = {
+    "lifesim": 2,
+    "coplay": 2,
+    "lifesim_gui": 1,
+    "coplay_gui": 1,
+    "ollama_quiz": 2,
+}
+DEFAULT_RETRY_BUDGET = 1
+RETRY_NUDGE = "Bitte antworte strikt als JSON im vereinbarten Schema."
+
+
+def _payload(messages: List[Dict[str, str]], model: str, stream: bool, format: Optional[Dict[str, Any]]) -> bytes:
+    body: Dict[str, Any] = {
         "model": model,
         "messages": messages,
         "stream": stream
-    }).encode("utf-8")
+    }
+    if format is not None:
+        body["format"] = format
+    return json.dumps(body).encode("utf-8")
+
+
+def _options(format: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    return {"format": format} if format is not None else None
+
+
+def _final_stats(chunk: Mapping[str, Any]) -> Dict[str, Any]:
+    """Counters and durations of Ollama's final message (everything but the content)."""
+    return {k: v for k, v in chunk.items() if k != "message"}
+
+
+def _chat_once(
+    messages: List[Dict[str, str]],
+    model: str,
+    stream: bool,
+    timeout: int,
+    format: Optional[Dict[str, Any]] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> str:
+    data = _payload(messages, model, stream, format)
+
+    try:
+        status, reason, body = POOL.request(
+            "POST", base_url() + "/api/chat", body=data, headers={"Content-Type": "application/json"}, timeout=timeout
+        )
+    except (OSError, http.client.HTTPException) as e:
+        raise RuntimeError(f"Ollama URLError: {e}") from e
+    if status >= 400:
+        raise RuntimeError(f"Ollama HTTPError: {status} {reason}")
+    payload: Dict[str, Any] = json.loads(body.decode("utf-8"))
+    if stats is not None:
+        stats.update(_final_stats(payload))
+    msg: Mapping[str, Any] = payload.get("message", {}) or {}
+    content = str(msg.get("content", ""))
+    return content
+
 
-    req = urllib.request.Request(OLLAMA_API_URL, data=data, headers={"Content-Type": "application/json"})
+def _timed_chat(
+    messages: List[Dict[str, str]],
+    model: str,
+    stream: bool,
+    timeout: int,
+    format: Optional[Dict[str, Any]],
+    game: Optional[str],
+) -> str:
+    stats: Dict[str, Any] = {}
+    start = time.perf_counter()
     try:
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            payload: Dict[str, Any] = json.loads(resp.read().decode("utf-8"))
-            msg: Mapping[str, Any] = payload.get("message", {}) or {}
-            content = str(msg.get("content", ""))
-            return content
-    except urllib.error.HTTPError as e:
-        raise RuntimeError(f"Ollama HTTPError: {e.code} {e.reason}") from e
-    except urllib.error.URLError as e:
-        raise RuntimeError(f"Ollama URLError: {e.reason}") from e
+        content = _chat_once(messages, model, stream, timeout, format, stats)
+    except BaseException:
+        record_call(game, model, (time.perf_counter() - start) * 1000, stats, ok=False)
+        raise
+    record_call(game, model, (time.perf_counter() - start) * 1000, stats)
+    return content
+
+
+def chat(
+    messages: List[Dict[str, str]],
+    model: str = DEFAULT_MODEL,
+    stream: bool = False,
+    timeout: int = 60,
+    game: Optional[str] = None,
+    format: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Single request; `format` is a JSON schema for Ollama structured outputs."""
+    cache = cache_for(game)
+    if cache is None:
+        return _timed_chat(messages, model, stream, timeout, format, game)
+    key = cache_key(model, messages, _options(format))
+    called = False
+
+    def fetch() -> str:
+        nonlocal called
+        called = True
+        return _timed_chat(messages, model, stream, timeout, format, game)
+
+    start = time.perf_counter()
+    content = cache.fetch(key, fetch)
+    if not called:
+        record_call(game, model, (time.perf_counter() - start) * 1000, cached=True)
+    return content
+
+
+def _stream_once(
+    messages: List[Dict[str, str]],
+    model: str,
+    timeout: int,
+    format: Optional[Dict[str, Any]] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Iterator[str]:
+    data = _payload(messages, model, True, format)
+
+    try:
+        with POOL.open(
+            "POST", base_url() + "/api/chat", body=data, headers={"Content-Type": "application/json"}, timeout=timeout
+        ) as resp:
+            if resp.status >= 400:
+                resp.read()
+                raise RuntimeError(f"Ollama HTTPError: {resp.status} {resp.reason}")
+            # One JSON object per line; the last one carries "done": true
+            for line in resp:
+                if not line.strip():
+                    continue
+                chunk: Dict[str, Any] = json.loads(line.decode("utf-8"))
+                if chunk.get("error"):
+                    raise RuntimeError(f"Ollama error: {chunk['error']}")
+                msg: Mapping[str, Any] = chunk.get("message", {}) or {}
+                delta = str(msg.get("content", ""))
+                if delta:
+                    yield delta
+                if chunk.get("done"):
+                    if stats is not None:
+                        stats.update(_final_stats(chunk))
+                    resp.read()
+                    break
+    except (OSError, http.client.HTTPException) as e:
+        raise RuntimeError(f"Ollama URLError: {e}") from e
+
+
+def _timed_stream(
+    messages: List[Dict[str, str]],
+    model: str,
+    timeout: int,
+    format: Optional[Dict[str, Any]],
+    game: Optional[str],
+) -> Iterator[str]:
+    """_stream_once plus a metrics record; calls abandoned by the consumer count as failed."""
+    stats: Dict[str, Any] = {}
+    start = time.perf_counter()
+    first: Optional[float] = None
+    try:
+        for delta in _stream_once(messages, model, timeout, format, stats):
+            if first is None:
+                first = (time.perf_counter() - start) * 1000
+            yield delta
+    except BaseException:
+        record_call(game, model, (time.perf_counter() - start) * 1000, stats, first, ok=False)
+        raise
+    record_call(game, model, (time.perf_counter() - start) * 1000, stats, first)
+
+
+def chat_stream(
+    messages: List[Dict[str, str]],
+    model: str = DEFAULT_MODEL,
+    timeout: int = 60,
+    game: Optional[str] = None,
+    format: Optional[Dict[str, Any]] = None,
+) -> Iterator[str]:
+    """Yield content deltas from Ollama's NDJSON stream as they are generated.
+
+    With the response cache enabled for `game`, a hit is yielded as one chunk.
+    """
+    cache = cache_for(game)
+    if cache is None:
+        yield from _timed_stream(messages, model, timeout, format, game)
+        return
+    key = cache_key(model, messages, _options(format))
+    start = time.perf_counter()
+    hit = cache.lookup(key)
+    if hit is not None:
+        record_call(game, model, (time.perf_counter() - start) * 1000, cached=True)
+        yield hit
+        return
+    flight = cache.begin(key)
+    if flight is not None:
+        # Identical request already streaming elsewhere; wait for its answer
+        answer = wait_for_flight(flight)
+        record_call(game, model, (time.perf_counter() - start) * 1000, cached=True)
+        yield answer
+        return
+    parts: List[str] = []
+    try:
+        for delta in _timed_stream(messages, model, timeout, format, game):
+            parts.append(delta)
+            yield delta
+    except BaseException as e:
+        cache.abandon(key, e)
+        raise
+    cache.complete(key, "".join(parts))
+
+
+def chat_streaming_turn(
+    messages: List[Dict[str, str]],
+    on_event: Optional[Callable[[str, str, Any], None]] = None,
+    model: str = DEFAULT_MODEL,
+    timeout: int = 60,
+    game: Optional[str] = None,
+    format: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, Dict[str, float]]:
+    """Stream one turn, surfacing fields via on_event; returns (content, timings_ms)."""
+    return stream_turn(chat_stream(messages, model=model, timeout=timeout, game=game, format=format), on_event)
 
 
 def extract_json_block(text: str) -> Optional[Dict[str, Any]]:
-    """Extract first top-level JSON object from text, if present."""
-    start = text.find("{")
-    end = text.rfind("}")
-    if start != -1 and end != -1 and end > start:
-        snippet = text[start:end+1]
-        try:
-            raw = json.loads(snippet)
-            if isinstance(raw, dict):
-                return cast(Dict[str, Any], raw)
-        except Exception:
-            return None
-    return None
+    """Extract the first JSON object from text, repairing small syntax defects."""
+    return repair_json(text)
 
 
 def parse_ava_turn(text: str) -> Optional[AvaTurn]:
-    """Parse and validate an Ava turn from model output; returns None if invalid."""
+    """Parse and validate an Ava turn from model output; returns None if invalid.
+
+    Schema defects (free-form action, unknown keys, wrong value types) are
+    repaired once before giving up.
+    """
     raw = extract_json_block(text)
     if not raw:
         return None
     try:
         return AvaTurn.model_validate(raw)
-    except Exception:
+    except ValidationError:
+        pass
+    fixed, changed = coerce_to_model(raw, AvaTurn)
+    if not changed:
         return None
+    try:
+        turn = AvaTurn.model_validate(fixed)
+    except ValidationError:
+        return None
+    note_saved("schema")
+    return turn
+
+
+class ValidityStats:
+    """How often the first answer of a turn validates, and what retries cost."""
+
+    def __init__(self) -> None:
+        self.turns = 0
+        self.first_try_valid = 0
+        self.retries = 0
+        self.failed = 0
+        self.repaired = 0
+        self.retry_ms = 0.0
+
+    def record(self, retries: int, valid: bool, retry_ms: float, repaired: bool = False) -> None:
+        self.turns += 1
+        if repaired:
+            self.repaired += 1
+        self.retries += retries
+        self.retry_ms += retry_ms
+        if valid and retries == 0:
+            self.first_try_valid += 1
+        if not valid:
+            self.failed += 1
+
+    @property
+    def first_try_rate(self) -> float:
+        return self.first_try_valid / self.turns if self.turns else 0.0
+
+    @property
+    def retries_per_turn(self) -> float:
+        return self.retries / self.turns if self.turns else 0.0
+
+    def report(self) -> str:
+        return (
+            f"JSON-Validität: {self.first_try_rate:.0%} beim ersten Versuch, "
+            f"{self.retries_per_turn:.2f} Wiederholungen/Zug ({self.retry_ms:.0f} ms), "
+            f"{self.repaired} per Reparatur gerettet, {self.failed} Züge verworfen"
+        )
+
+
+_validity: Dict[str, ValidityStats] = {}
+
+
+def validity_stats(game: Optional[str]) -> ValidityStats:
+    return _validity.setdefault(game or "", ValidityStats())
+
+
+class TurnResult(NamedTuple):
+    content: str
+    parsed: Any                # parse() result, None if every attempt failed
+    timings: Dict[str, float]  # of the last attempt, plus retry_ms for earlier ones
+    retries: int
+
+
+def request_turn(
+    messages: List[Dict[str, str]],
+    game: Optional[str] = None,
+    on_event: Optional[Callable[[str, str, Any], None]] = None,
+    parse: Optional[Callable[[str], Any]] = None,
+    schema: Optional[Dict[str, Any]] = AVA_TURN_SCHEMA,
+    stream_fn: Optional[Callable[..., Iterator[str]]] = None,
+    model: str = DEFAULT_MODEL,
+    timeout: int = 60,
+    turn: Optional[int] = None,
+) -> TurnResult:
+    """Stream a schema-constrained turn and re-ask within the game's retry budget.
+
+    Retry exchanges are only sent along with the retry itself; the caller's
+    history is not modified. `turn` tags the call metrics (default: this
+    game's request count).
+    """
+    parse = parse or parse_ava_turn
+    budget = RETRY_BUDGET.get(game or "", DEFAULT_RETRY_BUDGET)
+    if turn is None:
+        turn = validity_stats(game).turns + 1
+    begin_turn(game, turn)
+    convo = list(messages)
+    retries = 0
+    retry_ms = 0.0
+    while True:
+        if stream_fn is not None:
+            chunks = stream_fn(convo, format=schema)
+        else:
+            chunks = chat_stream(convo, model=model, timeout=timeout, game=game, format=schema)
+        with call_context(game, turn, retries > 0), section("llm"):
+            content, timings = stream_turn(chunks, on_event)
+        consume_repaired(valid=False)
+        with section("parse"):
+            parsed = parse(content)
+        repaired = consume_repaired(valid=parsed is not None)
+        if parsed is not None or retries >= budget:
+            break
+        retries += 1
+        retry_ms += timings["total"]
+        convo = convo + [{"role": "assistant", "content": content}, {"role": "user", "content": RETRY_NUDGE}]
+    timings["retry_ms"] = retry_ms
+    validity_stats(game).record(retries, parsed is not None, retry_ms, repaired)
+    return TurnResult(content, parsed, timings, retries)
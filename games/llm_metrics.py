@@ -0,0 +1,332 @@
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+# Per-call metrics for model requests. llm_client records one CallRecord per
+# HTTP call (and per cache hit): wall-clock latency, time to first token and
+# the counters Ollama puts into its final message (prompt_eval_count,
+# eval_count, total/load/prompt_eval/eval_duration), tagged with game id,
+# turn and whether the call was a retry. request_turn() sets game/turn/retry
+# for the calls it makes via call_context(), a thread-local like the repair
+# marks in json_repair.
+#
+# The registry keeps fixed-bucket histograms per game and the most recent
+# records. Percentiles in summaries come from the last SAMPLES raw values of
+# each histogram, not from the buckets: interpolating inside a 0-50 ms
+# bucket would report a p50 of 25 ms for calls that all took 1-10 ms.
+# Exports: JSONL (one line per call, appended and flushed as calls finish)
+# and the Prometheus text format. NEWTRY3_METRICS=<prefix> (set by
+# `main.py --metrics <prefix>`) writes <prefix>.jsonl live and <prefix>.prom
+# at session end.
+
+ENV_PREFIX = "NEWTRY3_METRICS"
+
+# Upper bucket bounds; +Inf is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)  # seconds
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+SAMPLES = 4096  # raw values kept per histogram for exact percentiles
+
+
+class CallRecord(NamedTuple):
+    ts: float  # unix time at the end of the call
+    game: str
+    turn: Optional[int]
+    retry: bool
+    cached: bool
+    ok: bool
+    model: str
+    wall_ms: float
+    ttft_ms: Optional[float]  # first content delta (streaming only)
+    prompt_eval_count: Optional[int]
+    eval_count: Optional[int]
+    total_ms: Optional[float]  # Ollama's durations, converted from ns
+    load_ms: Optional[float]
+    prompt_eval_ms: Optional[float]
+    eval_ms: Optional[float]
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus semantics) with sum, count, max
+    and the most recent raw values."""
+
+    def __init__(self, buckets: Sequence[float], samples: int = SAMPLES) -> None:
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=samples)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def quantile(self, q: float) -> float:
+        """Exact percentile of the recent values, interpolated between the two nearest ranks."""
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        pos = q * (len(ordered) - 1)
+        i = int(pos)
+        if i + 1 >= len(ordered):
+            return ordered[-1]
+        return ordered[i] + (ordered[i + 1] - ordered[i]) * (pos - i)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+
+_HISTOGRAMS: Tuple[Tuple[str, Tuple[float, ...], str], ...] = (
+    ("wall_seconds", LATENCY_BUCKETS, "Wall-clock time of a model call"),
+    ("ttft_seconds", LATENCY_BUCKETS, "Time to the first streamed token"),
+    ("prompt_tokens", TOKEN_BUCKETS, "prompt_eval_count reported by Ollama"),
+    ("output_tokens", TOKEN_BUCKETS, "eval_count reported by Ollama"),
+)
+_COUNTERS: Tuple[Tuple[str, str], ...] = (
+    ("calls_total", "Model calls"),
+    ("retries_total", "Calls that re-asked after an invalid answer"),
+    ("cache_hits_total", "Answers served from the response cache"),
+    ("errors_total", "Calls that failed or were abandoned"),
+    ("load_seconds_total", "Ollama load_duration"),
+    ("prompt_eval_seconds_total", "Ollama prompt_eval_duration"),
+    ("eval_seconds_total", "Ollama eval_duration"),
+)
+
+
+class _GameMetrics:
+    def __init__(self) -> None:
+        self.hist = {name: Histogram(buckets) for name, buckets, _ in _HISTOGRAMS}
+        self.counters = {name: 0.0 for name, _ in _COUNTERS}
+
+
+class MetricsRegistry:
+    """Histograms and counters per game plus the last `keep` call records."""
+
+    def __init__(self, keep: int = 10_000, jsonl_path: Optional[str] = None) -> None:
+        self._lock = threading.Lock()
+        self._games: Dict[str, _GameMetrics] = {}
+        self.records: Deque[CallRecord] = deque(maxlen=keep)
+        self._sink = open(jsonl_path, "a", encoding="utf-8") if jsonl_path else None
+
+    def record(self, rec: CallRecord) -> None:
+        with self._lock:
+            self.records.append(rec)
+            m = self._games.setdefault(rec.game, _GameMetrics())
+            c = m.counters
+            c["calls_total"] += 1
+            c["retries_total"] += rec.retry
+            c["cache_hits_total"] += rec.cached
+            c["errors_total"] += not rec.ok
+            if self._sink is not None:
+                self._sink.write(_json_line(rec))
+                self._sink.flush()
+            if not rec.ok:
+                return
+            m.hist["wall_seconds"].observe(rec.wall_ms / 1000)
+            if rec.ttft_ms is not None:
+                m.hist["ttft_seconds"].observe(rec.ttft_ms / 1000)
+            if rec.prompt_eval_count is not None:
+                m.hist["prompt_tokens"].observe(rec.prompt_eval_count)
+            if rec.eval_count is not None:
+                m.hist["output_tokens"].observe(rec.eval_count)
+            c["load_seconds_total"] += (rec.load_ms or 0.0) / 1000
+            c["prompt_eval_seconds_total"] += (rec.prompt_eval_ms or 0.0) / 1000
+            c["eval_seconds_total"] += (rec.eval_ms or 0.0) / 1000
+
+    def games(self) -> List[str]:
+        with self._lock:
+            return sorted(self._games)
+
+    def histogram(self, game: str, name: str) -> Histogram:
+        with self._lock:
+            return self._games.setdefault(game, _GameMetrics()).hist[name]
+
+    # -- exports -------------------------------------------------------------------------
+
+    def write_jsonl(self, path: str) -> int:
+        """Dump the retained records; returns the number of lines written."""
+        with self._lock:
+            records = list(self.records)
+        with open(path, "w", encoding="utf-8") as f:
+            for rec in records:
+                f.write(_json_line(rec))
+        return len(records)
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            games = sorted(self._games.items())
+            for name, help_text in _COUNTERS:
+                metric = f"newtry3_llm_{name}"
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+                lines += [f'{metric}{{game="{g}"}} {_num(m.counters[name])}' for g, m in games]
+            for name, _, help_text in _HISTOGRAMS:
+                metric = f"newtry3_llm_{name}"
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+                for g, m in games:
+                    h = m.hist[name]
+                    cumulative = 0
+                    for bound, n in zip(h.bounds + (float("inf"),), h.counts):
+                        cumulative += n
+                        le = "+Inf" if bound == float("inf") else _num(bound)
+                        lines.append(f'{metric}_bucket{{game="{g}",le="{le}"}} {cumulative}')
+                    lines.append(f'{metric}_sum{{game="{g}"}} {_num(h.sum)}')
+                    lines.append(f'{metric}_count{{game="{g}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per-game key figures as plain numbers (for JSON endpoints)."""
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for g, m in sorted(self._games.items()):
+                wall = m.hist["wall_seconds"]
+                out[g] = {
+                    "calls": int(m.counters["calls_total"]),
+                    "retries": int(m.counters["retries_total"]),
+                    "cache_hits": int(m.counters["cache_hits_total"]),
+                    "errors": int(m.counters["errors_total"]),
+                    "wall_p50_ms": round(wall.quantile(0.5) * 1000, 1),
+                    "wall_p95_ms": round(wall.quantile(0.95) * 1000, 1),
+                    "prompt_tokens_mean": round(m.hist["prompt_tokens"].mean, 1),
+                    "output_tokens_mean": round(m.hist["output_tokens"].mean, 1),
+                }
+        return out
+
+    def summary(self, game: Optional[str] = None) -> str:
+        """One line per game (or only `game`) for the end of a session."""
+        with self._lock:
+            items = sorted(self._games.items()) if game is None else [(game, self._games.get(game))]
+        out = []
+        for g, m in items:
+            if m is None or not m.counters["calls_total"]:
+                out.append(f"LLM-Aufrufe ({g or '-'}): keine.")
+                continue
+            c, wall, ttft = m.counters, m.hist["wall_seconds"], m.hist["ttft_seconds"]
+            prompt, output = m.hist["prompt_tokens"], m.hist["output_tokens"]
+            line = (
+                f"LLM-Aufrufe ({g or '-'}): {c['calls_total']:.0f} ({c['retries_total']:.0f} Wiederholungen, "
+                f"{c['cache_hits_total']:.0f} aus dem Cache, {c['errors_total']:.0f} Fehler/Abbrüche), "
+                f"Latenz p50 {wall.quantile(0.5) * 1000:.0f} ms / p95 {wall.quantile(0.95) * 1000:.0f} ms"
+            )
+            if ttft.count:
+                line += f", erstes Token p50 {ttft.quantile(0.5) * 1000:.0f} ms"
+            if prompt.count:
+                line += f", Prompt Ø {prompt.mean:.0f} Tok"
+            if output.count:
+                line += f", Ausgabe Ø {output.mean:.0f} Tok"
+            if c["eval_seconds_total"] > 0 and output.count:
+                line += f" ({output.sum / c['eval_seconds_total']:.0f} Tok/s)"
+            out.append(line)
+        return "\n".join(out) if out else "LLM-Aufrufe: keine."
+
+    def close(self) -> None:
+        with self._lock:
+            if self._sink is not None:
+                self._sink.close()
+                self._sink = None
+
+
+def _num(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(round(value, 6))
+
+
+def _json_line(rec: CallRecord) -> str:
+    return json.dumps(rec._asdict(), ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _ms(ns: Any) -> Optional[float]:
+    return ns / 1e6 if isinstance(ns, (int, float)) else None
+
+
+def _count(value: Any) -> Optional[int]:
+    return int(value) if isinstance(value, (int, float)) else None
+
+
+# -- module registry and call context --------------------------------------------------------
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+_local = threading.local()
+
+
+def registry() -> MetricsRegistry:
+    """The process-wide registry; streams JSONL to $NEWTRY3_METRICS.jsonl if set."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            prefix = os.environ.get(ENV_PREFIX)
+            if prefix:
+                os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+            _registry = MetricsRegistry(jsonl_path=prefix + ".jsonl" if prefix else None)
+        return _registry
+
+
+@contextlib.contextmanager
+def call_context(game: Optional[str], turn: Optional[int], retry: bool) -> Iterator[None]:
+    """Tag model calls made on this thread inside the block."""
+    previous = getattr(_local, "ctx", None)
+    _local.ctx = (game, turn, retry)
+    try:
+        yield
+    finally:
+        _local.ctx = previous
+
+
+def record_call(
+    game: Optional[str],
+    model: str,
+    wall_ms: float,
+    stats: Optional[Mapping[str, Any]] = None,
+    ttft_ms: Optional[float] = None,
+    cached: bool = False,
+    ok: bool = True,
+) -> CallRecord:
+    """Record one call; `stats` is Ollama's final message (durations in ns)."""
+    ctx_game, turn, retry = getattr(_local, "ctx", None) or (None, None, False)
+    stats = stats or {}
+    rec = CallRecord(
+        ts=time.time(),
+        game=game or ctx_game or "",
+        turn=turn,
+        retry=retry,
+        cached=cached,
+        ok=ok,
+        model=model,
+        wall_ms=round(wall_ms, 3),
+        ttft_ms=round(ttft_ms, 3) if ttft_ms is not None else None,
+        prompt_eval_count=_count(stats.get("prompt_eval_count")),
+        eval_count=_count(stats.get("eval_count")),
+        total_ms=_ms(stats.get("total_duration")),
+        load_ms=_ms(stats.get("load_duration")),
+        prompt_eval_ms=_ms(stats.get("prompt_eval_duration")),
+        eval_ms=_ms(stats.get("eval_duration")),
+    )
+    registry().record(rec)
+    return rec
+
+
+def summary(game: Optional[str] = None) -> str:
+    return registry().summary(game)
+
+
+def export() -> None:
+    """Write $NEWTRY3_METRICS.prom (if configured) and close the JSONL stream."""
+    prefix = os.environ.get(ENV_PREFIX)
+    if _registry is None or not prefix:
+        return
+    _registry.write_prometheus(prefix + ".prom")
+    _registry.close()
@@ -0,0 +1,124 @@
+import functools
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from .llm_client import chat_stream, request_turn
+
+# Background worker that keeps model calls off the pygame event loop.
+# The GUI submits a turn, keeps rendering, and drains results via poll() once
+# per frame. All game state is still mutated on the GUI thread only.
+
+# Messages delivered by poll():
+#   ("event", request_id, (kind, key, value))  streamed field from TurnStreamParser
+#   ("done", request_id, TurnResult)            validated turn (parsed is None if invalid)
+#   ("error", request_id, exception)
+Message = Tuple[str, int, Any]
+
+StreamFn = Callable[..., Iterator[str]]  # (messages, format=schema) -> deltas
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class LLMWorker:
+    """Runs streamed, validated chat turns on a daemon thread with request/response queues."""
+
+    def __init__(self, stream_fn: Optional[StreamFn] = None, game: Optional[str] = None) -> None:
+        self.game = game
+        self._stream_fn: StreamFn = stream_fn or functools.partial(chat_stream, game=game)
+        self._requests: "queue.Queue[Optional[Tuple[int, List[Dict[str, str]], Optional[int]]]]" = queue.Queue()
+        self._responses: "queue.Queue[Message]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._pending: Optional[int] = None
+        self._cancelled: Set[int] = set()
+        self._thread = threading.Thread(target=self._run, name="llm-worker", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self) -> bool:
+        """True while a submitted turn has not been delivered or cancelled yet."""
+        return self._pending is not None
+
+    def submit(self, messages: List[Dict[str, str]], turn: Optional[int] = None) -> int:
+        with self._lock:
+            self._next_id += 1
+            rid = self._next_id
+            self._pending = rid
+        # Copy so the GUI may keep editing its history while the request runs
+        self._requests.put((rid, [dict(m) for m in messages], turn))
+        return rid
+
+    def cancel(self) -> bool:
+        """Abandon the pending turn; its late results are dropped. Returns False if idle."""
+        with self._lock:
+            rid = self._pending
+            if rid is None:
+                return False
+            self._cancelled.add(rid)
+            self._pending = None
+        return True
+
+    def poll(self) -> List[Message]:
+        """Drain all results that arrived since the last frame (non-blocking)."""
+        out: List[Message] = []
+        while True:
+            try:
+                msg = self._responses.get_nowait()
+            except queue.Empty:
+                break
+            kind, rid, _ = msg
+            with self._lock:
+                if rid in self._cancelled:
+                    if kind != "event":
+                        self._cancelled.discard(rid)
+                    continue
+                if kind != "event" and rid == self._pending:
+                    self._pending = None
+            out.append(msg)
+        return out
+
+    def close(self) -> None:
+        self.cancel()
+        self._requests.put(None)
+
+    def _is_cancelled(self, rid: int) -> bool:
+        with self._lock:
+            return rid in self._cancelled
+
+    def _run(self) -> None:
+        while True:
+            job = self._requests.get()
+            if job is None:
+                return
+            rid, messages, turn = job
+            if self._is_cancelled(rid):
+                self._responses.put(("error", rid, _Cancelled()))
+                continue
+
+            def chunks(convo: List[Dict[str, str]], **kwargs: Any) -> Iterator[str]:
+                gen = self._stream_fn(convo, **kwargs)
+                try:
+                    for delta in gen:
+                        if self._is_cancelled(rid):
+                            # Closing the generator drops the HTTP connection
+                            raise _Cancelled()
+                        yield delta
+                finally:
+                    close = getattr(gen, "close", None)
+                    if close:
+                        close()
+
+            try:
+                result = request_turn(
+                    messages,
+                    game=self.game,
+                    on_event=lambda k, key, v: self._responses.put(("event", rid, (k, key, v))),
+                    stream_fn=chunks,
+                    turn=turn,
+                )
+                self._responses.put(("done", rid, result))
+            except Exception as e:
+                self._responses.put(("error", rid, e))
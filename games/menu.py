@@ -2,15 +2,7 @@ import os
 import sys
 from typing import Callable, Dict
 
-from .ollama_quiz import run_ollama_quiz
-from .llm_client import ensure_ollama_up
-from .ai_lifesim import run_lifesim
-from .ai_lifesim_gui import run_lifesim_gui
-from .ai_coplay import run_coplay
-from .ai_coplay_gui import run_coplay_gui
-from .launcher_gui import run_launcher
-from .number_guess import play_number_guess
-from .tic_tac_toe import play_tic_tac_toe
+from . import registry
 
 
 def clear_screen() -> None:
@@ -35,6 +27,8 @@ def health_check(verbose: bool = False) -> bool:
             print("Python version OK:", sys.version.split()[0])
 
     try:
+        from .backend import ensure_ollama_up
+
         up = ensure_ollama_up(verbose=verbose)
         ok = ok and up
     except Exception as e:
@@ -44,30 +38,25 @@ def health_check(verbose: bool = False) -> bool:
     return ok
 
 
+def _run_launcher() -> None:
+    from .launcher_gui import run_launcher
+
+    run_launcher()
+
+
 def main_menu() -> None:
     actions: Dict[str, Callable[[], None]] = {
-        "1": play_number_guess,
-        "2": play_tic_tac_toe,
-        "3": run_ollama_quiz,
-        "4": run_lifesim,
-        "5": run_lifesim_gui,
-        "6": run_coplay,
-        "7": run_coplay_gui,
-    "8": run_launcher,
-        "q": lambda: None,
+        str(n): (lambda run_id=g.id: registry.load(run_id)()) for n, g in enumerate(registry.GAMES, 1)
     }
+    launcher_key = str(len(registry.GAMES) + 1)
+    actions[launcher_key] = _run_launcher
 
     while True:
         clear_screen()
         print("=== Python Spielesammlung ===")
-        print("1) Zahlenraten (Konsole)")
-        print("2) Tic-Tac-Toe (Konsole)")
-        print("3) KI-Quiz (Ollama gemma3:1b)")
-        print("4) LifeSim: KI als Spielerin & Designerin")
-        print("5) LifeSim GUI (pygame)")
-        print("6) Co-Play: Ava (KI) + Ben (Mensch)")
-        print("7) Co-Play GUI (pygame)")
-        print("8) GUI-Launcher starten")
+        for n, g in enumerate(registry.GAMES, 1):
+            print(f"{n}) {g.menu}")
+        print(f"{launcher_key}) GUI-Launcher starten")
         print("q) Beenden")
         choice = prompt("Auswahl: ").strip().lower()
         if choice == "q":
@@ -0,0 +1,328 @@
+import json
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence
+
+# Local stand-in for the Ollama API (/api/tags, /api/chat with and without
+# streaming) so the AI games can be load-tested, benchmarked and run in CI
+# without a model. Answers are scripted or randomly generated AvaTurn/quiz
+# JSON; latency, error and malformed-output rates come from a profile.
+#
+#   python -m games.mock_ollama --profile cpu --port 11435
+#   OLLAMA_HOST=127.0.0.1:11435 python main.py --run lifesim
+#
+# or `python main.py --mock --run lifesim`, which starts one in-process.
+
+
+class MockProfile:
+    """Timing and failure knobs. tokens_per_sec <= 0 streams without delay."""
+
+    def __init__(
+        self,
+        ttft: float = 0.0,
+        tokens_per_sec: float = 0.0,
+        error_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        chars_per_token: int = 4,
+    ) -> None:
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.chars_per_token = chars_per_token
+
+
+PROFILES: Dict[str, MockProfile] = {
+    "instant": MockProfile(),
+    "fast": MockProfile(ttft=0.05, tokens_per_sec=200),
+    "cpu": MockProfile(ttft=0.4, tokens_per_sec=25),       # roughly gemma3:1b on a laptop CPU
+    "flaky": MockProfile(ttft=0.1, tokens_per_sec=80, error_rate=0.1, malformed_rate=0.25),
+}
+
+_ACTIONS = ("move_up", "move_down", "move_left", "move_right", "wait", "interact")
+_SPEECH = (
+    "Hallo Ben, los geht's!", "Ich sehe mich hier um.", "Wollen wir zusammen weitergehen?",
+    "Da hinten liegt etwas.", "Ich mag diesen Ort.", "Was meinst du, wohin als Nächstes?",
+)
+_THOUGHTS = ("Ich schaue mich um", "Neugierig auf den Flur", "Ben wirkt entschlossen", "Hier ist es ruhig")
+_QUIZ = (
+    ("Wie viele Kontinente gibt es?", "7"),
+    ("Welches Element hat das Symbol O?", "Sauerstoff"),
+    ("Wer führte Regie bei 'Jurassic Park'?", "Steven Spielberg"),
+    ("Wofür steht CPU?", "Central Processing Unit"),
+    ("Wie viele Spieler hat eine Fußballmannschaft auf dem Feld?", "11"),
+    ("Wie heißt die Hauptstadt von Kanada?", "Ottawa"),
+)
+
+
+class MockBackend:
+    """Produces answer contents; the HTTP server only handles transport."""
+
+    def __init__(self, profile: MockProfile, script: Optional[Sequence[str]] = None, seed: Optional[int] = None) -> None:
+        self.profile = profile
+        self.script = list(script or [])
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._index = 0
+        self.stats: Dict[str, int] = {"requests": 0, "streamed": 0, "errors": 0, "malformed": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _random_turn(self) -> Dict[str, Any]:
+        rng = self.rng
+        turn: Dict[str, Any] = {
+            "thoughts": rng.choice(_THOUGHTS),
+            "action": rng.choice(_ACTIONS),
+            "speech": rng.choice(_SPEECH),
+            "design_feedback": "",
+        }
+        if rng.random() < 0.3:
+            turn["experience"] = "Ich habe mich bewegt."
+        if rng.random() < 0.1:
+            turn["world_patch"] = {"set_goal": "Finde die Blume"}
+        return turn
+
+    def _malformed(self, content: str) -> str:
+        rng = self.rng
+        kind = rng.choice(("fence", "trailing_comma", "prose", "truncated", "verb", "garbage"))
+        if kind == "fence":
+            return f"```json\n{content}\n```"
+        if kind == "trailing_comma":
+            return content[:-1] + ",}"
+        if kind == "prose":
+            return f"Hier ist meine Antwort: {content} Viel Spaß!"
+        if kind == "truncated":
+            return content[: max(1, len(content) * 2 // 3)]
+        if kind == "verb":
+            return content.replace('"action": "', '"action": "gehe nach ', 1)
+        return "Entschuldigung, das kann ich nicht beantworten."
+
+    def content_for(self, request: Dict[str, Any]) -> str:
+        with self._lock:
+            if self.script:
+                content = self.script[self._index % len(self.script)]
+                self._index += 1
+                return content
+        schema = request.get("format")
+        props = schema.get("properties", {}) if isinstance(schema, dict) else {}
+        if "question" in props:
+            q, a = self.rng.choice(_QUIZ)
+            content = json.dumps({"question": q, "answer": a}, ensure_ascii=False)
+        else:
+            content = json.dumps(self._random_turn(), ensure_ascii=False)
+        if self.rng.random() < self.profile.malformed_rate:
+            self._count("malformed")
+            content = self._malformed(content)
+        return content
+
+    def should_fail(self) -> bool:
+        return self.rng.random() < self.profile.error_rate
+
+    def tokens(self, content: str) -> List[str]:
+        n = max(1, self.profile.chars_per_token)
+        return [content[i:i + n] for i in range(0, len(content), n)]
+
+
+def _ns(seconds: float) -> int:
+    return int(seconds * 1e9)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def setup(self) -> None:
+        super().setup()
+        # Small NDJSON lines: do not let Nagle hold them back
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(self, status: int, obj: Any) -> None:
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "/api/tags":
+            self._send_json(200, {"models": [{"name": m, "model": m} for m in self.server.models]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON body"})
+            return
+        if self.path.rstrip("/") != "/api/chat":
+            self._send_json(404, {"error": "not found"})
+            return
+        backend = self.server.backend
+        backend._count("requests")
+        if backend.should_fail():
+            backend._count("errors")
+            self._send_json(500, {"error": "mock: injected failure"})
+            return
+        content = backend.content_for(request)
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+        if request.get("stream", True):
+            backend._count("streamed")
+            self._stream(request, content, prompt_chars)
+        else:
+            self._reply(request, content, prompt_chars)
+
+    def _final(self, request: Dict[str, Any], tokens: int, prompt_chars: int, started: float, first: float) -> Dict[str, Any]:
+        now = time.perf_counter()
+        return {
+            "model": request.get("model", ""),
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": _ns(now - started),
+            "load_duration": 0,  # the mock keeps its "model" loaded
+            "prompt_eval_count": prompt_chars // 4 + 1,
+            "prompt_eval_duration": _ns(first - started),
+            "eval_count": tokens,
+            "eval_duration": _ns(now - first),
+        }
+
+    def _reply(self, request: Dict[str, Any], content: str, prompt_chars: int) -> None:
+        profile = self.server.backend.profile
+        started = time.perf_counter()
+        tokens = self.server.backend.tokens(content)
+        time.sleep(profile.ttft)
+        first = time.perf_counter()
+        if profile.tokens_per_sec > 0:
+            time.sleep(len(tokens) / profile.tokens_per_sec)
+        out = self._final(request, len(tokens), prompt_chars, started, first)
+        out["message"] = {"role": "assistant", "content": content}
+        self._send_json(200, out)
+
+    def _chunk(self, obj: Dict[str, Any]) -> None:
+        line = (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+    def _stream(self, request: Dict[str, Any], content: str, prompt_chars: int) -> None:
+        profile = self.server.backend.profile
+        started = time.perf_counter()
+        tokens = self.server.backend.tokens(content)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        time.sleep(profile.ttft)
+        first = time.perf_counter()
+        delay = 1.0 / profile.tokens_per_sec if profile.tokens_per_sec > 0 else 0.0
+        try:
+            for i, tok in enumerate(tokens):
+                if i and delay:
+                    time.sleep(delay)
+                self._chunk({"model": request.get("model", ""), "message": {"role": "assistant", "content": tok}, "done": False})
+            final = self._final(request, len(tokens), prompt_chars, started, first)
+            final["message"] = {"role": "assistant", "content": ""}
+            self._chunk(final)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client cancelled the turn
+            self.close_connection = True
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    backend: MockBackend
+    models: List[str]
+
+
+class MockOllama:
+    """Mock server on a background thread; port 0 picks a free port."""
+
+    def __init__(
+        self,
+        profile: Optional[MockProfile] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        script: Optional[Sequence[str]] = None,
+        seed: Optional[int] = None,
+        models: Sequence[str] = ("gemma3:1b",),
+    ) -> None:
+        self.backend = MockBackend(profile or PROFILES["instant"], script, seed)
+        self._server = _Server((host, port), _Handler)
+        self._server.backend = self.backend
+        self._server.models = list(models)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOllama":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockOllama":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def load_script(path: str) -> List[str]:
+    """One answer per line; JSON lines are sent verbatim (also malformed ones)."""
+    with open(path, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mock Ollama server for tests and benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="fast")
+    parser.add_argument("--ttft", type=float, help="Seconds until the first token")
+    parser.add_argument("--tps", type=float, help="Tokens per second (0 = unthrottled)")
+    parser.add_argument("--error-rate", type=float, help="Share of requests answered with HTTP 500")
+    parser.add_argument("--malformed-rate", type=float, help="Share of answers with broken JSON")
+    parser.add_argument("--script", help="File with one answer per line, replayed in order")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    base = PROFILES[args.profile]
+    profile = MockProfile(
+        ttft=base.ttft if args.ttft is None else args.ttft,
+        tokens_per_sec=base.tokens_per_sec if args.tps is None else args.tps,
+        error_rate=base.error_rate if args.error_rate is None else args.error_rate,
+        malformed_rate=base.malformed_rate if args.malformed_rate is None else args.malformed_rate,
+    )
+    script = load_script(args.script) if args.script else None
+    mock = MockOllama(profile, args.host, args.port, script, args.seed)
+    print(f"Mock-Ollama läuft auf {mock.url} (Profil {args.profile}). Strg+C beendet.")
+    print(f"Spiele damit starten: OLLAMA_HOST={mock.url} python main.py")
+    try:
+        mock._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock._server.server_close()
+        print("Mock-Ollama:", mock.backend.stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,95 +1,61 @@
-import json
-import urllib.request
-import urllib.error
-from typing import Optional, Dict, Any, List, TypedDict, Mapping, cast
+import random
+from typing import Optional, Dict, Any, List, TypedDict
+
+from . import llm_metrics
+from .json_repair import note_saved
+from .llm_client import ensure_ollama_up, extract_json_block, request_turn, validity_stats
+from .schemas import QuizQuestion
+from .quiz_bank import CATEGORIES, QuestionBank, QuizPrefetcher
 
-OLLAMA_API_URL = "http://localhost:11434/api/chat"
 MODEL_NAME = "gemma3:1b"
 
 
 SYSTEM_PROMPT = (
     "Du bist ein freundlicher Quizmaster für ein Konsolenspiel. "
-    "Stelle eine einzige Frage aus einer zufälligen Kategorie (Allgemeinwissen, Film, Tech, Sport). "
+    "Stelle eine einzige Frage aus der genannten Kategorie (Allgemeinwissen, Film, Tech, Sport). "
     "Gib die Antwort separat im JSON-Feld 'answer' als kurzer String an. "
     "Antwortformat: JSON mit Schlüsseln 'question' und 'answer' ohne zusätzliche Erklärungen."
 )
 
 
-def ensure_ollama_up(verbose: bool = False) -> bool:
-    try:
-        # Use the /api/tags endpoint to check if server is up
-        with urllib.request.urlopen("http://localhost:11434/api/tags", timeout=2) as resp:
-            if resp.status == 200:
-                if verbose:
-                    print("Ollama server erreichbar.")
-                return True
-    except Exception as e:
-        if verbose:
-            print("Ollama scheint nicht zu laufen auf http://localhost:11434", e)
-    return False
-
-
 class QuizQA(TypedDict):
     question: str
     answer: str
 
 
-def _chat(messages: List[Dict[str, str]]) -> str:
-    data = json.dumps({
-        "model": MODEL_NAME,
-        "messages": messages,
-        "stream": False
-    }).encode("utf-8")
+QUIZ_SCHEMA: Dict[str, Any] = QuizQuestion.model_json_schema()
 
-    req = urllib.request.Request(OLLAMA_API_URL, data=data, headers={"Content-Type": "application/json"})
-    try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            payload: Dict[str, Any] = json.loads(resp.read().decode("utf-8"))
-            # Ollama chat format: { message: { role, content }, ... }
-            msg: Dict[str, Any] = payload.get("message", {}) or {}
-            content: str = str(msg.get("content", ""))
-            return content
-    except urllib.error.HTTPError as e:
-        raise RuntimeError(f"Ollama HTTPError: {e.code} {e.reason}") from e
-    except urllib.error.URLError as e:
-        raise RuntimeError(f"Ollama URLError: {e.reason}") from e
-
-
-def get_quiz_question() -> Optional[QuizQA]:
-    content = _chat([
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": "Bitte eine Frage generieren."}
-    ])
-    try:
-        # Attempt to parse JSON from the model content
-        raw: Any = json.loads(content)
-    except Exception:
-        return None
 
-    parsed: Dict[str, Any]
-    if isinstance(raw, dict):
-        # Treat as Mapping[str, Any] for type checker
-        raw_map: Mapping[str, Any] = cast(Mapping[str, Any], raw)
-        parsed = {k: raw_map[k] for k in raw_map.keys()}
-        q: Any = parsed.get("question")
-        a: Any = parsed.get("answer")
-        if isinstance(q, str) and isinstance(a, str):
-            return {"question": q, "answer": a}
+def _parse_quiz(content: str) -> Optional[QuizQA]:
+    # Tolerates code fences, trailing commas and similar near-valid output
+    raw = extract_json_block(content)
+    if raw is None:
+        return None
+    q: Any = raw.get("question")
+    a: Any = raw.get("answer")
+    if isinstance(q, str) and isinstance(a, str):
+        return {"question": q, "answer": a}
+    if isinstance(q, str) and isinstance(a, (int, float)):
+        # Numeric answers ("1990") are fine once stringified
+        note_saved("schema")
+        return {"question": q, "answer": str(a)}
     return None
 
 
-def run_ollama_quiz() -> None:
-    print("KI-Quiz (gemma3:1b via Ollama)")
-    if not ensure_ollama_up(verbose=True):
-        print("Hinweis: Installiere und starte Ollama, und lade das Modell 'gemma3:1b'.")
-        print("Siehe README für Schritte.")
-        return
+def get_quiz_question(category: Optional[str] = None, avoid: Optional[List[str]] = None) -> Optional[QuizQA]:
+    category = category or random.choice(CATEGORIES)
+    request = f"Bitte eine Frage aus der Kategorie {category} generieren."
+    if avoid:
+        # Steer away from questions the bank already has
+        request += " Nicht wiederholen: " + " | ".join(avoid)
+    result = request_turn([
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": request}
+    ], game="ollama_quiz", parse=_parse_quiz, schema=QUIZ_SCHEMA, model=MODEL_NAME, timeout=30)
+    return result.parsed
 
-    qa: Optional[QuizQA] = get_quiz_question()
-    if not qa:
-        print("Konnte keine gültige Frage generieren. Probiere es später erneut.")
-        return
 
+def _ask(qa: Dict[str, str]) -> bool:
     question: str = qa.get("question", "?")
     answer: str = qa.get("answer", "")
 
@@ -100,5 +66,46 @@ def run_ollama_quiz() -> None:
     # Simple check (case-insensitive, trimmed)
     if user.lower() == answer.strip().lower():
         print("Richtig! 🎉")
-    else:
-        print(f"Nicht ganz. Richtige Antwort: {answer}")
+        return True
+    print(f"Nicht ganz. Richtige Antwort: {answer}")
+    return False
+
+
+def run_ollama_quiz(rounds: int = 5) -> None:
+    print("KI-Quiz (gemma3:1b via Ollama)")
+    bank = QuestionBank()
+    # Keeps every category topped up while the player is answering
+    prefetcher = QuizPrefetcher(bank, get_quiz_question).start()
+    checked = False
+    score = 0
+    asked = 0
+    try:
+        for rnd in range(1, rounds + 1):
+            qa = bank.take()
+            if qa is None:
+                # Bank empty: generate live (needs a running model)
+                if not checked:
+                    if not ensure_ollama_up(verbose=True):
+                        print("Hinweis: Installiere und starte Ollama, und lade das Modell 'gemma3:1b'.")
+                        print("Siehe README für Schritte.")
+                        return
+                    checked = True
+                category = random.choice(CATEGORIES)
+                live = get_quiz_question(category)
+                if not live:
+                    print("Konnte keine gültige Frage generieren. Probiere es später erneut.")
+                    return
+                bank.add(category, live["question"], live["answer"], seen=True)
+                qa = {"category": category, "question": live["question"], "answer": live["answer"]}
+            print(f"\nFrage {rnd}/{rounds} [{qa['category']}]")
+            asked += 1
+            if _ask(qa):
+                score += 1
+            if rnd < rounds and input("Weiter mit Enter | q zum Beenden: ").strip().lower() in ("q", "quit", "exit"):
+                break
+    finally:
+        prefetcher.stop()
+        if asked:
+            print(f"\nErgebnis: {score}/{asked} richtig. Vorrat: {sum(bank.unseen_counts().values())} ungesehene Fragen.")
+            print(validity_stats("ollama_quiz").report())
+            print(llm_metrics.summary("ollama_quiz"))
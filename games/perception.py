@@ -0,0 +1,104 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .tilemap import Pos, TileMap, items_in_rect
+
+# Local field of view for the grid games. perceive() looks at the square of
+# `radius` tiles around an agent, using the spatial item index and the tile
+# map, and describe() turns that into one prompt line with a fixed upper
+# bound: the MAX_ITEMS nearest items, the first wall in each direction and
+# where the other agent is. Prompt size no longer grows with the world or
+# with how crowded it is, and a tick costs a few bucket lookups.
+
+RADIUS = 4
+MAX_ITEMS = 4
+MAX_NAME = 16  # item names are clipped so a line stays bounded
+
+# y grows downwards: move_up is north
+_DIRS = (("Nord", 0, -1), ("Ost", 1, 0), ("Süd", 0, 1), ("West", -1, 0))
+
+
+class View(NamedTuple):
+    items: Tuple[Tuple[str, int, int], ...]  # (name, dx, dy), nearest first, at most MAX_ITEMS
+    more: int  # items in range beyond `items`
+    other: Optional[Tuple[str, int, int]]  # (agent, dx, dy) of the partner
+    walls: Tuple[Tuple[str, int], ...]  # (direction, steps to the first blocked tile) within range
+
+
+def _blocked(pos: Pos, grid: Pos, tiles: Optional[TileMap]) -> bool:
+    if tiles is not None:
+        return not tiles.passable(pos)
+    return not (0 <= pos[0] < grid[0] and 0 <= pos[1] < grid[1])
+
+
+def perceive(
+    state: Dict[str, Any],
+    who: str,
+    grid: Pos,
+    tiles: Optional[TileMap] = None,
+    radius: int = RADIUS,
+    max_items: int = MAX_ITEMS,
+) -> View:
+    """What `who` sees within `radius` tiles (Chebyshev distance)."""
+    x, y = state["pos"][who]
+    rect = (x - radius, y - radius, x + radius + 1, y + radius + 1)
+    if tiles is not None:
+        tiles.ensure(rect)
+    seen = sorted(
+        (max(abs(p[0] - x), abs(p[1] - y)), abs(p[0] - x) + abs(p[1] - y), p[0] - x, p[1] - y, name)
+        for p, name in items_in_rect(state["items"], rect)
+    )
+    items = tuple((name[:MAX_NAME], dx, dy) for _, _, dx, dy, name in seen[:max_items])
+    other = next(
+        ((o, p[0] - x, p[1] - y) for o, p in state["pos"].items() if o != who),
+        None,
+    )
+    walls: List[Tuple[str, int]] = []
+    for name, sx, sy in _DIRS:
+        for step in range(1, radius + 1):
+            if _blocked((x + sx * step, y + sy * step), grid, tiles):
+                walls.append((name, step))
+                break
+    return View(items, max(0, len(seen) - max_items), other, tuple(walls))
+
+
+def _offset(dx: int, dy: int) -> str:
+    if not dx and not dy:
+        return "hier"
+    parts = []
+    if dy:
+        parts.append(f"{abs(dy)} {'Nord' if dy < 0 else 'Süd'}")
+    if dx:
+        parts.append(f"{abs(dx)} {'West' if dx < 0 else 'Ost'}")
+    return " ".join(parts)
+
+
+def _heading(dx: int, dy: int) -> str:
+    """Coarse compass direction for something out of sight."""
+    ns = "Nord" if dy < 0 else "Süd" if dy > 0 else ""
+    ew = "west" if dx < 0 else "ost" if dx > 0 else ""
+    if ns and ew and (abs(dx) * 2 < abs(dy) or abs(dy) * 2 < abs(dx)):
+        return ns if abs(dy) > abs(dx) else ew.capitalize()
+    return (ns + ew) or "hier"
+
+
+def describe(view: View, radius: int = RADIUS) -> str:
+    """One bounded line, e.g. "Sicht (4 Felder): Apfel 2 Süd 1 Ost; Ben 3 West; Wand: Nord 1"."""
+    things = "; ".join(f"{name} {_offset(dx, dy)}" for name, dx, dy in view.items) or "nichts"
+    if view.more:
+        things += f" (+{view.more})"
+    parts = [f"Sicht ({radius} Felder): {things}"]
+    if view.other:
+        agent, dx, dy = view.other
+        who = agent.capitalize()
+        if max(abs(dx), abs(dy)) <= radius:
+            parts.append(f"{who} {_offset(dx, dy)}")
+        else:
+            parts.append(f"{who} außer Sicht im {_heading(dx, dy)}en")
+    if view.walls:
+        parts.append("Wand: " + ", ".join(f"{d} {n}" for d, n in view.walls))
+    return "; ".join(parts) + "."
+
+
+def sight(engine: Any, who: str = "ava", radius: int = RADIUS) -> str:
+    """describe(perceive(...)) for a GridEngine."""
+    return describe(perceive(engine.state, who, engine.grid, engine.tilemap, radius), radius)
@@ -0,0 +1,113 @@
+import random
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union, get_args
+
+from .context_window import ContextWindow
+from .engine import Event
+from .llm_client import TurnResult, request_turn
+from .schemas import Action, AvaTurn, WorldPatch
+
+# Agent policies for the engines in games.engine. A policy picks Ava's (or,
+# for bulk runs, Ben's) next turn from the state and sees the resulting
+# events; only LLMPolicy talks to a model.
+
+ACTIONS = get_args(Action)
+
+Describe = Callable[[Dict[str, Any], List[Event]], str]
+
+
+class Policy:
+    def decide(self, state: Dict[str, Any]) -> Optional[AvaTurn]:
+        """Next turn, or None if no valid turn could be produced this round."""
+        raise NotImplementedError
+
+    def observe(self, state: Dict[str, Any], events: List[Event]) -> None:
+        pass
+
+
+class ScriptedPolicy(Policy):
+    """Replays a fixed list of actions or turns (cycling when `loop` is set)."""
+
+    def __init__(self, script: Sequence[Union[str, AvaTurn]], loop: bool = True) -> None:
+        self.script = [t if isinstance(t, AvaTurn) else AvaTurn.model_construct(action=t) for t in script]
+        self.loop = loop
+        self.index = 0
+
+    def decide(self, state: Dict[str, Any]) -> Optional[AvaTurn]:
+        if not self.script or (not self.loop and self.index >= len(self.script)):
+            return None
+        turn = self.script[self.index % len(self.script)]
+        self.index += 1
+        return turn
+
+
+class RandomPolicy(Policy):
+    """Uniform random actions, occasional speech and (LifeSim) world patches."""
+
+    def __init__(self, seed: Optional[int] = None, patch_rate: float = 0.1, speak_rate: float = 0.3) -> None:
+        self.rng = random.Random(seed)
+        self.patch_rate = patch_rate
+        self.speak_rate = speak_rate
+
+    def _patch(self, state: Dict[str, Any]) -> Optional[WorldPatch]:
+        world = state.get("world")
+        if not world or self.rng.random() >= self.patch_rate:
+            return None
+        place = self.rng.choice(world.names())
+        kind = self.rng.choice(("create_place", "create_item", "set_trait", "set_goal"))
+        n = state.get("turn", 0)
+        if kind == "create_place":
+            d = self.rng.choice(("nord", "sued", "ost", "west"))
+            return WorldPatch.model_construct(create_place={"name": f"Ort{n}", "connect_from": place, "dir": d})
+        if kind == "create_item":
+            return WorldPatch.model_construct(create_item={"at": place, "item": f"Ding{n}"})
+        if kind == "set_trait":
+            return WorldPatch.model_construct(set_trait={"target": place, "key": "stimmung", "value": f"s{n}"})
+        return WorldPatch.model_construct(set_goal=f"Ziel {n}")
+
+    def decide(self, state: Dict[str, Any]) -> Optional[AvaTurn]:
+        rng = self.rng
+        speech = f"Runde {state.get('turn', 0)}" if rng.random() < self.speak_rate else ""
+        return AvaTurn.model_construct(
+            action=rng.choice(ACTIONS),
+            speech=speech,
+            world_patch=self._patch(state),
+            experience="Etwas erlebt" if rng.random() < 0.2 else None,
+        )
+
+
+class LLMPolicy(Policy):
+    """Asks the model via request_turn; the conversation lives in a ContextWindow.
+
+    `describe(state, events)` turns the outcome of a round into the next user
+    message. Set `on_event` to receive streamed fields of the current turn.
+    """
+
+    def __init__(
+        self,
+        system: str,
+        game: str,
+        describe: Describe,
+        nudge: str = "Bitte antworte strikt als JSON im vereinbarten Schema.",
+    ) -> None:
+        self.history = ContextWindow(system)
+        self.game = game
+        self.describe = describe
+        self.nudge = nudge
+        self.on_event: Optional[Callable[[str, str, Any], None]] = None
+        self.last: Optional[TurnResult] = None
+        self.last_message: Optional[Dict[str, str]] = None
+
+    def decide(self, state: Dict[str, Any]) -> Optional[AvaTurn]:
+        result = request_turn(
+            self.history.messages(), game=self.game, on_event=self.on_event, turn=state.get("turn", 0) + 1
+        )
+        self.last = result
+        if result.parsed is None:
+            self.history.add_retry(result.content, self.nudge)
+            return None
+        return result.parsed
+
+    def observe(self, state: Dict[str, Any], events: List[Event]) -> None:
+        if self.last is not None:
+            self.history.add("assistant", self.last.content)
+        self.last_message = self.history.add("user", self.describe(state, events))
@@ -0,0 +1,231 @@
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+# `main.py --run <id> --profile [PREFIX]`: runs the game under cProfile and
+# writes
+#   PREFIX.prof        cProfile stats of the main thread (pstats, snakeviz, ...)
+#   PREFIX.collapsed   sampled stacks of all threads, one "a;b;c count" line per
+#                      stack (flamegraph.pl, speedscope, inferno); the GUI's
+#                      model calls run on a worker thread cProfile cannot see
+#   PREFIX.turns.jsonl per turn: wall time, time per section and, with
+#                      --profile-memory, traced memory plus the top allocation
+#                      changes since the previous turn (tracemalloc)
+#
+# Sections are labelled by the code itself: `with section("llm")` or
+# @timed("apply"). Both cost one flag check while no profiler runs. A turn
+# starts with each request_turn() call and lasts until the next one, so it
+# holds one model request plus whatever the game does with the answer.
+# Sections may nest (an early move applied while the answer streams counts
+# as both llm and apply).
+
+SECTIONS = ("llm", "parse", "apply", "render")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_profiler: Optional["Profiler"] = None
+_NULL = contextlib.nullcontext()
+
+
+class _Section:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc: Any) -> None:
+        profiler = _profiler
+        if profiler is not None:
+            profiler.add(self.name, (time.perf_counter() - self.start) * 1000)
+
+
+def section(name: str) -> Any:
+    """Context manager timing `name` into the current turn (no-op unless profiling)."""
+    return _Section(name) if _profiler is not None else _NULL
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorator form of section()."""
+
+    def wrap(fn: F) -> F:
+        @functools.wraps(fn)
+        def inner(*args: Any, **kwargs: Any) -> Any:
+            if _profiler is None:
+                return fn(*args, **kwargs)
+            with _Section(name):
+                return fn(*args, **kwargs)
+
+        return inner  # type: ignore[return-value]
+
+    return wrap
+
+
+def begin_turn(game: Optional[str], turn: Optional[int]) -> None:
+    profiler = _profiler
+    if profiler is not None:
+        profiler.begin_turn(game, turn)
+
+
+def _snapshot() -> Any:
+    """tracemalloc snapshot without the profiler's own bookkeeping."""
+    import tracemalloc
+
+    return tracemalloc.take_snapshot().filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+    )
+
+
+def _frame_label(code: Any) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+class Profiler:
+    """cProfile + stack sampler + per-turn section timers (+ optional tracemalloc)."""
+
+    def __init__(self, prefix: str, memory: bool = False, interval: float = 0.005) -> None:
+        self.prefix = prefix
+        self.memory = memory
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._open: Optional[Dict[str, Any]] = None  # turn being measured
+        self._sections: Dict[str, float] = {}
+        self.turns: List[Dict[str, Any]] = []
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._snapshot: Any = None
+        self._cprofile: Any = None
+        self.started = 0.0
+
+    # -- lifecycle -----------------------------------------------------------------------
+
+    def start(self) -> "Profiler":
+        global _profiler
+        import cProfile
+
+        if self.memory:
+            import tracemalloc
+
+            tracemalloc.start()
+            self._snapshot = _snapshot()
+        self.started = time.perf_counter()
+        self._open = {"turn": 0, "game": None, "start": self.started}
+        self._sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+        self._sampler.start()
+        _profiler = self
+        self._cprofile = cProfile.Profile()
+        self._cprofile.enable()
+        return self
+
+    def stop(self) -> str:
+        """Stop everything, write the files and return a short report."""
+        global _profiler
+        self._cprofile.disable()
+        _profiler = None
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self._close_turn(time.perf_counter())
+        if self.memory:
+            import tracemalloc
+
+            tracemalloc.stop()
+        os.makedirs(os.path.dirname(os.path.abspath(self.prefix)), exist_ok=True)
+        self._cprofile.dump_stats(self.prefix + ".prof")
+        with open(self.prefix + ".collapsed", "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        with open(self.prefix + ".turns.jsonl", "w", encoding="utf-8") as f:
+            for turn in self.turns:
+                f.write(json.dumps(turn, ensure_ascii=False) + "\n")
+        return self.report()
+
+    # -- per-turn sections ---------------------------------------------------------------
+
+    def add(self, name: str, ms: float) -> None:
+        with self._lock:
+            self._sections[name] = self._sections.get(name, 0.0) + ms
+
+    def begin_turn(self, game: Optional[str], turn: Optional[int]) -> None:
+        now = time.perf_counter()
+        self._close_turn(now)
+        with self._lock:
+            self._open = {"turn": turn, "game": game, "start": now}
+
+    def _close_turn(self, now: float) -> None:
+        with self._lock:
+            opened, sections = self._open, self._sections
+            self._open, self._sections = None, {}
+        if opened is None:
+            return
+        record: Dict[str, Any] = {
+            "turn": opened["turn"],
+            "game": opened["game"],
+            "wall_ms": round((now - opened["start"]) * 1000, 3),
+            "sections_ms": {name: round(ms, 3) for name, ms in sorted(sections.items())},
+        }
+        if self.memory:
+            record.update(self._memory())
+        self.turns.append(record)
+
+    def _memory(self) -> Dict[str, Any]:
+        import tracemalloc
+
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        snapshot = _snapshot()
+        top = snapshot.compare_to(self._snapshot, "lineno")[:5] if self._snapshot is not None else []
+        self._snapshot = snapshot
+        return {
+            "mem_kib": current // 1024,
+            "mem_peak_kib": peak // 1024,
+            "alloc_top": [
+                f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} {stat.size_diff / 1024:+.1f} KiB"
+                for stat in top
+            ],
+        }
+
+    # -- stack sampling ------------------------------------------------------------------
+
+    def _sample(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f"thread-{ident}"))
+                labels.reverse()
+                self.stacks[";".join(labels)] += 1
+
+    # -- report --------------------------------------------------------------------------
+
+    def report(self) -> str:
+        total = (time.perf_counter() - self.started) * 1000
+        counted = self.turns[1:] or self.turns  # the first record is start-up until the first request
+        lines = [f"Profil: {len(self.turns) - 1} Züge, {total / 1000:.1f} s gesamt"]
+        if counted:
+            means = []
+            for name in SECTIONS + tuple(sorted({n for t in counted for n in t["sections_ms"]} - set(SECTIONS))):
+                values = [t["sections_ms"].get(name, 0.0) for t in counted]
+                means.append(f"{name} {sum(values) / len(values):.1f} ms")
+            wall = sum(t["wall_ms"] for t in counted) / len(counted)
+            lines.append(f"Ø pro Zug ({wall:.0f} ms): " + ", ".join(means))
+        if self.memory and self.turns:
+            lines.append(f"Speicher: zuletzt {self.turns[-1]['mem_kib']} KiB, Spitze "
+                         f"{max(t['mem_peak_kib'] for t in self.turns)} KiB")
+        lines.append(f"Dateien: {self.prefix}.prof, {self.prefix}.collapsed, {self.prefix}.turns.jsonl")
+        return "\n".join(lines)
@@ -0,0 +1,156 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Local store of generated quiz questions. A background producer keeps a number
+# of unseen questions per category prefetched, so a quiz round can start
+# instantly and only falls back to live generation when the bank runs dry.
+
+ENV_PATH = "NEWTRY3_QUIZ_BANK"
+
+CATEGORIES = ("Allgemeinwissen", "Film", "Tech", "Sport")
+
+
+def default_path() -> str:
+    return os.environ.get(ENV_PATH) or os.path.join(os.path.expanduser("~"), ".newtry3", "quiz_bank.sqlite")
+
+
+def normalize_question(text: str) -> str:
+    """Case/accent/punctuation-insensitive form used for de-duplication."""
+    t = unicodedata.normalize("NFKD", text.casefold())
+    t = "".join(ch for ch in t if not unicodedata.combining(ch))
+    t = re.sub(r"[^\w\s]", " ", t)
+    return " ".join(t.split())
+
+
+class QuestionBank:
+    """SQLite-backed question store, de-duplicated by normalized question text."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or default_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS questions ("
+            "id INTEGER PRIMARY KEY, category TEXT NOT NULL, question TEXT NOT NULL, "
+            "answer TEXT NOT NULL, norm TEXT NOT NULL UNIQUE, seen INTEGER NOT NULL DEFAULT 0, "
+            "created REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS questions_unseen ON questions (category, seen)")
+        self._db.commit()
+        self.duplicates = 0
+
+    def add(self, category: str, question: str, answer: str, seen: bool = False) -> bool:
+        """Store a question; returns False if an equivalent one is already known."""
+        norm = normalize_question(question)
+        if not norm:
+            return False
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT OR IGNORE INTO questions (category, question, answer, norm, seen, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (category, question.strip(), answer.strip(), norm, int(seen), time.time()),
+            )
+            self._db.commit()
+            if cur.rowcount == 0:
+                self.duplicates += 1
+                return False
+            return True
+
+    def take(self, category: Optional[str] = None) -> Optional[Dict[str, str]]:
+        """Pop the oldest unseen question (optionally of one category) and mark it seen."""
+        with self._lock:
+            if category:
+                row = self._db.execute(
+                    "SELECT id, category, question, answer FROM questions WHERE seen = 0 AND category = ? "
+                    "ORDER BY created LIMIT 1", (category,)
+                ).fetchone()
+            else:
+                row = self._db.execute(
+                    "SELECT id, category, question, answer FROM questions WHERE seen = 0 ORDER BY created LIMIT 1"
+                ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE questions SET seen = 1 WHERE id = ?", (row[0],))
+            self._db.commit()
+        return {"category": row[1], "question": row[2], "answer": row[3]}
+
+    def unseen_counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT category, COUNT(*) FROM questions WHERE seen = 0 GROUP BY category"
+            ).fetchall()
+        return {c: n for c, n in rows}
+
+    def recent_questions(self, category: str, limit: int = 5) -> List[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT question FROM questions WHERE category = ? ORDER BY created DESC LIMIT ?", (category, limit)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+# generate(category, avoid) -> {"question": ..., "answer": ...} or None
+Generator = Callable[[str, List[str]], Optional[Dict[str, str]]]
+
+
+class QuizPrefetcher:
+    """Daemon thread that tops up each category to `target` unseen questions."""
+
+    def __init__(
+        self,
+        bank: QuestionBank,
+        generate: Generator,
+        categories: Sequence[str] = CATEGORIES,
+        target: int = 5,
+        idle_sleep: float = 1.0,
+    ) -> None:
+        self.bank = bank
+        self.generate = generate
+        self.categories = tuple(categories)
+        self.target = target
+        self.idle_sleep = idle_sleep
+        self.generated = 0
+        self.failures = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="quiz-prefetch", daemon=True)
+
+    def start(self) -> "QuizPrefetcher":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        backoff = self.idle_sleep
+        while not self._stop.is_set():
+            counts = self.bank.unseen_counts()
+            todo = [c for c in self.categories if counts.get(c, 0) < self.target]
+            if not todo:
+                self._stop.wait(self.idle_sleep)
+                continue
+            # Fill the emptiest category first
+            cat = min(todo, key=lambda c: counts.get(c, 0))
+            try:
+                qa = self.generate(cat, self.bank.recent_questions(cat))
+            except Exception:
+                qa = None
+            if qa and self.bank.add(cat, qa["question"], qa["answer"]):
+                self.generated += 1
+                backoff = self.idle_sleep
+                continue
+            # Model down, invalid JSON or a duplicate: back off before retrying
+            self.failures += 1
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 30.0)
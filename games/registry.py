@@ -0,0 +1,49 @@
+import importlib
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+# The one list of games. main.py --run, the console menu and the GUI launcher
+# all read it; entry points are "module:function" strings that are only
+# imported when a game is started, so `main.py --check` or a console game
+# never pays for pygame or the pydantic models.
+
+
+class GameEntry(NamedTuple):
+    id: str
+    title: str  # launcher button
+    menu: str  # console menu line
+    target: str  # "module:function", imported on first use
+    console: bool  # needs a terminal for input
+
+
+GAMES: Tuple[GameEntry, ...] = (
+    GameEntry("number_guess", "Zahlenraten (Konsole)", "Zahlenraten (Konsole)",
+              "games.number_guess:play_number_guess", True),
+    GameEntry("tic_tac_toe", "Tic-Tac-Toe (Konsole)", "Tic-Tac-Toe (Konsole)",
+              "games.tic_tac_toe:play_tic_tac_toe", True),
+    GameEntry("ollama_quiz", "KI-Quiz (Ollama, Konsole)", "KI-Quiz (Ollama gemma3:1b)",
+              "games.ollama_quiz:run_ollama_quiz", True),
+    GameEntry("lifesim", "LifeSim (Text, KI)", "LifeSim: KI als Spielerin & Designerin",
+              "games.ai_lifesim:run_lifesim", True),
+    GameEntry("lifesim_gui", "LifeSim GUI (pygame, KI)", "LifeSim GUI (pygame)",
+              "games.ai_lifesim_gui:run_lifesim_gui", False),
+    GameEntry("coplay", "Co-Play (Text: Ava+Ben)", "Co-Play: Ava (KI) + Ben (Mensch)",
+              "games.ai_coplay:run_coplay", True),
+    GameEntry("coplay_gui", "Co-Play GUI (pygame: Ava+Ben)", "Co-Play GUI (pygame)",
+              "games.ai_coplay_gui:run_coplay_gui", False),
+)
+
+_BY_ID: Dict[str, GameEntry] = {g.id: g for g in GAMES}
+
+
+def ids() -> Tuple[str, ...]:
+    return tuple(g.id for g in GAMES)
+
+
+def get(run_id: str) -> Optional[GameEntry]:
+    return _BY_ID.get(run_id)
+
+
+def load(run_id: str) -> Callable[[], None]:
+    """Import the game's module and return its entry point; KeyError for unknown ids."""
+    module, _, attr = _BY_ID[run_id].target.partition(":")
+    return getattr(importlib.import_module(module), attr)
@@ -0,0 +1,186 @@
+import json
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .engine import LifeSimEngine
+from .journal import StateTracker, encode, read_header
+from .llm_client import parse_ava_turn
+from .schemas import AvaTurn
+
+# Model-free replay of a session journal (games/journal.py). The recorded raw
+# answers go through parse_ava_turn() and the current rules again, starting
+# from engine.reset(<journaled seed>), and every round's state delta is
+# compared with the journal via the chained digest; snapshots are compared in
+# full. The first difference (parsed turn, state delta or snapshot) is
+# reported with the round it happened in, so a rule change that alters old
+# sessions shows up at once:
+#
+#   python -m games.replay ~/.newtry3/sessions/lifesim-20250101-120000.jsonl
+#   python main.py --replay logs/coplay.jsonl          # exit code 1 on divergence
+#
+# No model, no prompts, no I/O apart from reading the file.
+
+Round = Callable[[Any, Optional[AvaTurn], Dict[str, Any]], None]
+
+MAX_DETAIL = 160
+
+
+def _lifesim_round(engine: LifeSimEngine, turn: Optional[AvaTurn], record: Dict[str, Any]) -> None:
+    # hints only reach the prompt; invalid answers leave the state alone
+    if turn is not None:
+        engine.step(None, turn)
+
+
+def _coplay_round(engine: Any, turn: Optional[AvaTurn], record: Dict[str, Any]) -> None:
+    from .ai_coplay import ava_round
+
+    # Ben moves before Ava answers, so his move stands even when her answer is unusable
+    ben_action = record.get("input") or "wait"
+    engine.act("ben", ben_action)
+    if turn is not None:
+        ava_round(engine, turn, ben_action, record.get("feedback", ""), record["round"])
+
+
+def _coplay_engine() -> Any:
+    from .ai_coplay import make_engine
+
+    return make_engine()
+
+
+# game id -> (engine factory, one round as run_<game> applies it, given the turn record)
+GAMES: Dict[str, Tuple[Callable[[], Any], Round]] = {
+    "lifesim": (LifeSimEngine, _lifesim_round),
+    "coplay": (_coplay_engine, _coplay_round),
+}
+
+
+class Divergence(NamedTuple):
+    round: int
+    turn: int
+    kind: str  # "parse", "state" or "snapshot"
+    detail: str
+
+
+class ReplayResult(NamedTuple):
+    game: str
+    rounds: int
+    seconds: float
+    divergences: List[Divergence]
+
+    @property
+    def ok(self) -> bool:
+        return not self.divergences
+
+    def report(self) -> str:
+        head = f"Replay {self.game}: {self.rounds} Runden in {self.seconds:.3f} s"
+        if self.ok:
+            return head + ", keine Abweichung."
+        lines = [head + f", {len(self.divergences)} Abweichung(en):"]
+        for d in self.divergences:
+            lines.append(f"  Runde {d.round} (Zug {d.turn}), {d.kind}: {d.detail}")
+        return "\n".join(lines)
+
+
+def _clip(value: Any) -> str:
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= MAX_DETAIL else text[: MAX_DETAIL - 1] + "…"
+
+
+def _delta_diff(recorded: List[List[Any]], replayed: List[List[Any]]) -> str:
+    """The changed paths on which journal and replay disagree."""
+    want = {"/".join(path): (op, value) for path, op, value in recorded}
+    got = {"/".join(path): (op, value) for path, op, value in replayed}
+    parts = []
+    for path in sorted(set(want) | set(got)):
+        if want.get(path) != got.get(path):
+            w, g = want.get(path), got.get(path)
+            parts.append(
+                f"{path}: erwartet {_clip(w[1]) if w else '(unverändert)'}, "
+                f"bekommen {_clip(g[1]) if g else '(unverändert)'}"
+            )
+    return "; ".join(parts[:3]) + (f" (+{len(parts) - 3})" if len(parts) > 3 else "") if parts else "Digest"
+
+
+def _state_diff(recorded: Dict[str, Any], replayed: Dict[str, Any]) -> str:
+    keys = [k for k in sorted(set(recorded) | set(replayed)) if recorded.get(k) != replayed.get(k)]
+    return "; ".join(
+        f"{k}: erwartet {_clip(recorded.get(k))}, bekommen {_clip(replayed.get(k))}" for k in keys[:3]
+    ) + (f" (+{len(keys) - 3})" if len(keys) > 3 else "")
+
+
+def _without_none(parsed: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    return {k: v for k, v in parsed.items() if v is not None} if parsed is not None else None
+
+
+def replay(path: str, keep_going: bool = False) -> ReplayResult:
+    """Re-run the journal at `path` without a model; stops at the first divergence unless `keep_going`.
+
+    With `keep_going` the replay continues after a divergence, but the
+    digest chain only matches again at the next snapshot.
+    """
+    header = read_header(path)
+    game = header["game"]
+    if game not in GAMES:
+        raise ValueError(f"{path}: kein Replay für '{game}'")
+    make, play_round = GAMES[game]
+    engine = make()
+    start = time.perf_counter()
+    state = engine.reset(header.get("seed"))
+    tracker = StateTracker()
+    tracker.prime(state)
+    divergences: List[Divergence] = []
+    rounds = 0
+    with open(path, "rb") as f:
+        f.readline()  # header
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn line of a killed session
+            kind = record.get("type")
+            if kind == "snap":
+                # the journal re-primes at every snapshot; do the same so deltas stay comparable
+                if encode(state) != record["state"]:
+                    divergences.append(Divergence(
+                        record.get("round", rounds), state.get("turn", 0), "snapshot",
+                        _state_diff(record["state"], encode(state)),
+                    ))
+                tracker.prime(state)
+                tracker.digest = record.get("digest", tracker.digest)
+            elif kind == "turn":
+                rounds += 1
+                turn = parse_ava_turn(record["raw"]) if record["raw"] else None
+                parsed = turn.model_dump(exclude_none=True) if turn is not None else None
+                if parsed != _without_none(record["parsed"]):
+                    divergences.append(Divergence(
+                        record["round"], record["turn"], "parse",
+                        f"erwartet {_clip(record['parsed'])}, bekommen {_clip(parsed)}",
+                    ))
+                play_round(engine, turn, record)
+                delta = tracker.delta(state)
+                if tracker.digest != record["digest"]:
+                    divergences.append(Divergence(
+                        record["round"], record["turn"], "state", _delta_diff(record["delta"], delta)
+                    ))
+                    tracker.digest = record["digest"]
+            else:
+                continue
+            if divergences and not keep_going:
+                break
+    return ReplayResult(game, rounds, time.perf_counter() - start, divergences)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay a LifeSim/Co-Play session journal without a model")
+    parser.add_argument("journal", help="Journal file (see --journal / ~/.newtry3/sessions)")
+    parser.add_argument("--keep-going", action="store_true", help="Report every divergence, not just the first")
+    args = parser.parse_args(argv)
+    result = replay(args.journal, keep_going=args.keep_going)
+    print(result.report())
+    raise SystemExit(0 if result.ok else 1)
+
+
+if __name__ == "__main__":
+    main()
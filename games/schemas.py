@@ -53,3 +53,9 @@ class AvaTurn(BaseModel):
     # Expressive shaping intents (documented; actual effect via world_patch)
     self_shape: Optional[str] = Field(default=None, description="Wie forme/verändere ich mich?")
     world_shape: Optional[str] = Field(default=None, description="Was möchte ich erschaffen/verändern?")
+
+
+class QuizQuestion(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    question: str = Field(description="Eine einzelne Quizfrage")
+    answer: str = Field(description="Kurze Antwort")
@@ -0,0 +1,143 @@
+import json
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .world import World
+
+# Compact LifeSim state serialisation for prompts. The first turn (and every
+# `resync_every` turns) carries a full snapshot; all other turns only carry
+# what changed: location, rooms whose items/exits/traits differ, inventory
+# additions/removals and newly appended memory entries. Room details are only
+# sent for Ava's location and its neighbours; the rest of the world is known
+# by name, so the snapshot stays small however many places get created.
+
+# Snapshots only carry the most recent entries of each memory list
+MEMORY_TAIL = 3
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+class _Memory(NamedTuple):
+    """A memory list as of one snapshot, without copying it (the lists only grow)."""
+
+    entries: List[str]  # the live list
+    n: int  # its length at snapshot time
+    last: Optional[str]
+
+    def items(self) -> List[str]:
+        return self.entries[: self.n]
+
+    def since(self, old: Optional["_Memory"]) -> List[str]:
+        """Entries added after `old`; everything if the list was replaced or rewritten."""
+        if old is None or old.n > self.n:
+            return self.items()
+        if old.n and self.entries[old.n - 1] != old.last:
+            return self.items()
+        if old.entries is not self.entries and self.entries[: old.n] != old.items():
+            return self.items()
+        return self.entries[old.n: self.n]
+
+
+def _memory(entries: List[str]) -> _Memory:
+    return _Memory(entries, len(entries), entries[-1] if entries else None)
+
+
+def snapshot(state: Dict[str, Any]) -> Dict[str, Any]:
+    """The parts of the state the model needs (memory lists by reference, see _Memory)."""
+    world: World = state.get("world") or World()
+    loc = state.get("location")
+    near = [loc] + world.neighbours(loc)
+    return {
+        "location": state.get("location"),
+        "inventory": list(state.get("inventory", [])),
+        "identity": state.get("ava_identity", ""),
+        "notes": state.get("notes", ""),
+        "places": world.names(),  # cached by the World until a room is added
+        "world": {name: world.rooms[name].to_dict() for name in near if name in world},
+        "memory": {k: _memory(v) for k, v in state.get("memory", {}).items()},
+    }
+
+
+def _trim_memory(snap: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(snap)
+    out["memory"] = {k: v.entries[max(0, v.n - MEMORY_TAIL): v.n] for k, v in snap["memory"].items() if v.n}
+    return out
+
+
+def diff(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for key in ("location", "identity", "notes"):
+        if old.get(key) != new.get(key):
+            out[key] = new.get(key)
+
+    # As multisets: a second "Apfel" is an addition too
+    had, has = Counter(old["inventory"]), Counter(new["inventory"])
+    added = list((has - had).elements())
+    removed = list((had - has).elements())
+    if added or removed:
+        out["inventory"] = {"+": added, "-": removed}
+
+    rooms = {name: room for name, room in new["world"].items() if old["world"].get(name) != room}
+    if rooms:
+        out["rooms"] = rooms
+    if new["places"] is not old["places"]:
+        before, after = set(old["places"]), set(new["places"])
+        new_places = [p for p in new["places"] if p not in before]
+        gone = [p for p in old["places"] if p not in after]
+        if new_places:
+            out["places+"] = new_places
+        if gone:
+            out["places-"] = gone
+
+    mem: Dict[str, List[str]] = {}
+    for key, entries in new["memory"].items():
+        tail = entries.since(old["memory"].get(key))
+        if tail:
+            mem[key] = tail
+    if mem:
+        out["memory+"] = mem
+    return out
+
+
+class StateDeltaEncoder:
+    """Turns a LifeSim state into prompt text: full snapshot first, deltas afterwards."""
+
+    def __init__(self, resync_every: int = 25) -> None:
+        self.resync_every = resync_every
+        self._last: Optional[Dict[str, Any]] = None
+        self._since_full = 0
+        self.chars_sent = 0
+        self.turns = 0
+        self.full = 0
+        self.last_was_full = False
+
+    def force_resync(self) -> None:
+        """Send a full snapshot next time, e.g. after the last one left the context window."""
+        self._last = None
+
+    def encode(self, state: Dict[str, Any]) -> str:
+        snap = snapshot(state)
+        self.last_was_full = self._last is None or self._since_full >= self.resync_every
+        if self.last_was_full:
+            text = f"Zustand (vollständig): {_dumps(_trim_memory(snap))}"
+            self._since_full = 0
+            self.full += 1
+        else:
+            delta = diff(self._last, snap)
+            text = f"Zustandsänderungen: {_dumps(delta)}" if delta else "Zustand unverändert."
+        self._since_full += 1
+        self._last = snap
+        self.turns += 1
+        self.chars_sent += len(text)
+        return text
+
+    def report(self) -> str:
+        # the repr baseline (what f"Zustand: {state}" would have cost) lives in bench.py
+        if not self.turns:
+            return "Zustand: noch nichts gesendet."
+        return (
+            f"Zustand: {self.chars_sent} Zeichen in {self.turns} Zügen gesendet "
+            f"({self.full} vollständig, {self.chars_sent // self.turns} pro Zug)"
+        )
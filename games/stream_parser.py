@@ -0,0 +1,198 @@
+import json
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Incremental parser for streamed Ava turns. The model emits one JSON object
+# token by token; we track only the top level of that object so string fields
+# (speech, thoughts, action, ...) can be surfaced the moment they are complete,
+# long before the trailing memory fields have been generated.
+
+# Fields whose partial text is worth showing while it is still being generated
+PROGRESSIVE_FIELDS = ("speech", "thoughts")
+# Fields that count as "visible output" for time-to-first-output
+VISIBLE_FIELDS = ("speech", "thoughts", "action")
+
+Event = Tuple[str, str, Any]  # (kind, key, value) with kind "partial" | "field"
+
+
+def _decode_partial(raw: str) -> str:
+    """Decode a JSON string body that may end in the middle of an escape sequence."""
+    # Drop a dangling backslash (only an odd trailing run ends in one; a pair is
+    # an escaped backslash) or an unfinished \\uXXXX escape
+    if (len(raw) - len(raw.rstrip("\\"))) % 2:
+        raw = raw[:-1]
+    else:
+        cut = raw.rfind("\\u", max(0, len(raw) - 5))
+        if cut != -1 and (cut - len(raw[:cut].rstrip("\\"))) % 2 == 0:
+            raw = raw[:cut]
+    try:
+        return json.loads('"' + raw + '"')
+    except ValueError:
+        return raw
+
+
+class TurnStreamParser:
+    """Feed streamed text chunks; returns events for top-level fields as they complete."""
+
+    def __init__(self) -> None:
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._depth = 0
+        self._in_str = False
+        self._escape = False
+        self._expect = "key"             # "key" | "colon" | "value" | "comma"
+        self._key: Optional[str] = None  # key whose value is being read
+        self._buf: List[str] = []        # body of the current top-level string
+        self._raw: Optional[List[str]] = None  # text of a nested or bare value
+
+    def feed(self, chunk: str) -> List[Event]:
+        events: List[Event] = []
+        for ch in chunk:
+            if self.done:
+                break
+            self._step(ch, events)
+        if self._in_str and self._raw is None and self._expect == "value" and self._key in PROGRESSIVE_FIELDS:
+            events.append(("partial", self._key, _decode_partial("".join(self._buf))))
+        return events
+
+    def _step(self, ch: str, events: List[Event]) -> None:
+        if self._depth == 0:
+            # Skip anything (code fences, prose) before the object starts
+            if ch == "{":
+                self._depth = 1
+            return
+
+        if self._in_str:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_str = False
+            if self._raw is not None:
+                self._raw.append(ch)
+            elif self._in_str:
+                self._buf.append(ch)
+            else:
+                self._close_string(events)
+            return
+
+        if self._raw is not None:
+            # Inside a nested object/array or a bare literal
+            if self._depth == 1 and ch in ",}":
+                self._close_raw(events)
+            else:
+                self._raw.append(ch)
+                if ch == '"':
+                    self._in_str = True
+                elif ch in "{[":
+                    self._depth += 1
+                elif ch in "}]":
+                    self._depth -= 1
+                    if self._depth == 1:
+                        self._close_raw(events)
+                return
+
+        if ch == '"':
+            self._in_str = True
+            self._buf = []
+        elif ch == "}":
+            self._depth = 0
+            self.done = True
+        elif ch == ":" and self._expect == "colon":
+            self._expect = "value"
+        elif ch == ",":
+            self._expect = "key"
+        elif self._expect == "value" and not ch.isspace():
+            self._raw = [ch]
+            if ch in "{[":
+                self._depth += 1
+
+    def _close_string(self, events: List[Event]) -> None:
+        raw = "".join(self._buf)
+        if self._expect == "key":
+            self._key = _decode_partial(raw)
+            self._expect = "colon"
+        elif self._expect == "value" and self._key is not None:
+            self._emit(self._key, _decode_partial(raw), events)
+
+    def _close_raw(self, events: List[Event]) -> None:
+        text = "".join(self._raw or []).strip()
+        self._raw = None
+        if self._key is None:
+            return
+        try:
+            value: Any = json.loads(text)
+        except ValueError:
+            value = text
+        self._emit(self._key, value, events)
+
+    def _emit(self, key: str, value: Any, events: List[Event]) -> None:
+        self.fields[key] = value
+        events.append(("field", key, value))
+        self._key = None
+        self._expect = "comma"
+
+
+def stream_turn(
+    chunks: Any,
+    on_event: Optional[Callable[[str, str, Any], None]] = None,
+) -> Tuple[str, Dict[str, float]]:
+    """Consume an iterator of text deltas, dispatching parser events.
+
+    Returns the full content and timings in ms: ttft (first token),
+    ttfo (first visible speech/thoughts/action) and total.
+    """
+    t0 = time.perf_counter()
+    parser = TurnStreamParser()
+    parts: List[str] = []
+    timings: Dict[str, float] = {}
+    for delta in chunks:
+        if not delta:
+            continue
+        if "ttft" not in timings:
+            timings["ttft"] = (time.perf_counter() - t0) * 1000
+        parts.append(delta)
+        for kind, key, value in parser.feed(delta):
+            if "ttfo" not in timings and key in VISIBLE_FIELDS and value:
+                timings["ttfo"] = (time.perf_counter() - t0) * 1000
+            if on_event:
+                on_event(kind, key, value)
+    timings["total"] = (time.perf_counter() - t0) * 1000
+    timings.setdefault("ttft", timings["total"])
+    timings.setdefault("ttfo", timings["total"])
+    return "".join(parts), timings
+
+
+class ConsoleSpeechPrinter:
+    """on_event callback that prints Ava's speech to the console while it streams."""
+
+    def __init__(self, label: str = "Ava sagt: ") -> None:
+        self.label = label
+        self.shown = 0
+
+    def __call__(self, kind: str, key: str, value: Any) -> None:
+        if key != "speech" or not isinstance(value, str) or len(value) <= self.shown:
+            return
+        if self.shown == 0:
+            sys.stdout.write(self.label)
+        sys.stdout.write(value[self.shown:])
+        sys.stdout.flush()
+        self.shown = len(value)
+
+    def finish(self) -> bool:
+        """End the line if anything was printed; returns whether speech was shown."""
+        if self.shown:
+            sys.stdout.write("\n")
+            sys.stdout.flush()
+        return self.shown > 0
+
+
+def summarize_timings(samples: List[Dict[str, float]]) -> str:
+    if not samples:
+        return "Keine gestreamten Züge."
+    n = len(samples)
+    ttfo = sum(t["ttfo"] for t in samples) / n
+    total = sum(t["total"] for t in samples) / n
+    return f"{n} Züge: Ø erste Ausgabe nach {ttfo:.0f} ms, Ø komplett nach {total:.0f} ms"
@@ -0,0 +1,185 @@
+import random
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, MutableMapping, Optional, Set, Tuple
+
+# Sparse tile worlds for the grid games. The map is cut into CHUNK×CHUNK
+# chunks that are generated from (seed, chunk coords) the first time they are
+# touched, so a 1000×1000 world costs nothing until someone walks there.
+# Terrain is a pure function of the seed, so chunk tiles live in a bounded
+# LRU and are simply regenerated after eviction; items are spawned once per
+# chunk into a SpatialHash (a dict-like {(x, y): name} bucketed by chunk) and
+# are the only per-chunk state that is kept.
+
+Pos = Tuple[int, int]
+Rect = Tuple[int, int, int, int]  # x0, y0, x1, y1 (exclusive)
+
+CHUNK = 32
+FLOOR, WALL = 0, 1
+ITEM_NAMES = ("Apfel", "Stein", "Pilz", "Feder", "Münze", "Beere", "Ast", "Muschel")
+
+
+class SpatialHash(MutableMapping[Pos, str]):
+    """{(x, y): item} kept in cell×cell buckets; area queries only visit overlapping buckets."""
+
+    def __init__(self, cell: int = CHUNK, items: Optional[Dict[Pos, str]] = None) -> None:
+        self.cell = cell
+        self._buckets: Dict[Pos, Dict[Pos, str]] = {}
+        self._len = 0
+        if items:
+            self.update(items)
+
+    def _key(self, pos: Pos) -> Pos:
+        return pos[0] // self.cell, pos[1] // self.cell
+
+    def __getitem__(self, pos: Pos) -> str:
+        return self._buckets[self._key(pos)][pos]
+
+    def __setitem__(self, pos: Pos, item: str) -> None:
+        bucket = self._buckets.setdefault(self._key(pos), {})
+        if pos not in bucket:
+            self._len += 1
+        bucket[pos] = item
+
+    def __delitem__(self, pos: Pos) -> None:
+        key = self._key(pos)
+        bucket = self._buckets[key]
+        del bucket[pos]
+        self._len -= 1
+        if not bucket:
+            del self._buckets[key]
+
+    def __contains__(self, pos: object) -> bool:
+        if not isinstance(pos, tuple) or len(pos) != 2:
+            return False
+        bucket = self._buckets.get(self._key(pos))  # type: ignore[arg-type]
+        return bucket is not None and pos in bucket
+
+    def __iter__(self) -> Iterator[Pos]:
+        for bucket in list(self._buckets.values()):
+            yield from list(bucket)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def in_rect(self, rect: Rect) -> Iterator[Tuple[Pos, str]]:
+        x0, y0, x1, y1 = rect
+        c = self.cell
+        for cy in range(y0 // c, (y1 - 1) // c + 1):
+            for cx in range(x0 // c, (x1 - 1) // c + 1):
+                bucket = self._buckets.get((cx, cy))
+                if bucket:
+                    for pos, item in bucket.items():
+                        if x0 <= pos[0] < x1 and y0 <= pos[1] < y1:
+                            yield pos, item
+
+
+def items_in_rect(items: MutableMapping[Pos, str], rect: Rect) -> Iterable[Tuple[Pos, str]]:
+    """Area query that works for SpatialHash and plain dicts (small fixed maps)."""
+    if isinstance(items, SpatialHash):
+        return items.in_rect(rect)
+    x0, y0, x1, y1 = rect
+    return [(p, i) for p, i in items.items() if x0 <= p[0] < x1 and y0 <= p[1] < y1]
+
+
+class TileMap:
+    """Chunked, procedurally generated terrain plus a SpatialHash of items."""
+
+    def __init__(
+        self,
+        size: Pos,
+        seed: int = 0,
+        wall_rate: float = 0.0,
+        item_rate: float = 0.0,
+        max_chunks: int = 256,
+    ) -> None:
+        self.size = size
+        self.seed = seed
+        self.wall_rate = wall_rate
+        self.item_rate = item_rate
+        self.max_chunks = max_chunks
+        self.reset()
+
+    def reset(self, seed: Optional[int] = None) -> None:
+        if seed is not None:
+            self.seed = seed
+        self._chunks: "OrderedDict[Pos, bytearray]" = OrderedDict()
+        self._spawned: Set[Pos] = set()
+        self._overrides: Dict[Pos, int] = {}
+        self.items = SpatialHash(CHUNK)
+        self.generated = 0
+
+    def _generate(self, cx: int, cy: int) -> bytearray:
+        rng = random.Random((self.seed * 1_000_003 + cx) * 1_000_003 + cy)
+        tiles = bytearray(CHUNK * CHUNK)
+        if self.wall_rate:
+            for i in range(CHUNK * CHUNK):
+                if rng.random() < self.wall_rate:
+                    tiles[i] = WALL
+        self.generated += 1
+        if (cx, cy) not in self._spawned:
+            # drawn after the terrain, so regenerating a chunk yields the same walls
+            self._spawned.add((cx, cy))
+            if self.item_rate:
+                for i in range(CHUNK * CHUNK):
+                    if rng.random() < self.item_rate and not tiles[i]:
+                        x, y = cx * CHUNK + i % CHUNK, cy * CHUNK + i // CHUNK
+                        if x < self.size[0] and y < self.size[1] and (x, y) not in self.items:
+                            self.items[(x, y)] = rng.choice(ITEM_NAMES)
+        return tiles
+
+    def chunk(self, cx: int, cy: int) -> bytearray:
+        key = (cx, cy)
+        tiles = self._chunks.get(key)
+        if tiles is None:
+            tiles = self._chunks[key] = self._generate(cx, cy)
+            if len(self._chunks) > self.max_chunks:
+                self._chunks.popitem(last=False)
+        else:
+            self._chunks.move_to_end(key)
+        return tiles
+
+    def in_bounds(self, pos: Pos) -> bool:
+        return 0 <= pos[0] < self.size[0] and 0 <= pos[1] < self.size[1]
+
+    def tile(self, pos: Pos) -> int:
+        if not self.in_bounds(pos):
+            return WALL
+        override = self._overrides.get(pos)
+        if override is not None:
+            return override
+        x, y = pos
+        return self.chunk(x // CHUNK, y // CHUNK)[(y % CHUNK) * CHUNK + x % CHUNK]
+
+    def passable(self, pos: Pos) -> bool:
+        return self.tile(pos) == FLOOR
+
+    def carve(self, pos: Pos) -> None:
+        """Force a floor tile (start positions, fixed items)."""
+        self._overrides[pos] = FLOOR
+
+    def ensure(self, rect: Rect) -> None:
+        """Generate every chunk overlapping `rect`, so its items exist before a query."""
+        x0, y0, x1, y1 = rect
+        for cy in range(max(0, y0) // CHUNK, (min(y1, self.size[1]) - 1) // CHUNK + 1):
+            for cx in range(max(0, x0) // CHUNK, (min(x1, self.size[0]) - 1) // CHUNK + 1):
+                self.chunk(cx, cy)
+
+    def walls_in(self, rect: Rect) -> Iterator[Pos]:
+        """Wall tiles inside `rect` (clipped to the map), chunk by chunk."""
+        x0, y0 = max(0, rect[0]), max(0, rect[1])
+        x1, y1 = min(self.size[0], rect[2]), min(self.size[1], rect[3])
+        for cy in range(y0 // CHUNK, (y1 - 1) // CHUNK + 1):
+            for cx in range(x0 // CHUNK, (x1 - 1) // CHUNK + 1):
+                tiles = self.chunk(cx, cy)
+                xs = range(max(x0, cx * CHUNK), min(x1, (cx + 1) * CHUNK))
+                for y in range(max(y0, cy * CHUNK), min(y1, (cy + 1) * CHUNK)):
+                    row = (y % CHUNK) * CHUNK
+                    for x in xs:
+                        if tiles[row + x % CHUNK] and self._overrides.get((x, y), WALL) == WALL:
+                            yield x, y
+
+    def report(self) -> str:
+        return (
+            f"Karte {self.size[0]}×{self.size[1]}: {self.generated} Chunks erzeugt, "
+            f"{len(self._chunks)} im Speicher, {len(self.items)} Gegenstände bekannt"
+        )
@@ -0,0 +1,226 @@
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+from . import registry
+
+# Pre-started game processes for the GUI launcher. A worker imports pygame,
+# pydantic and the GUI games, initialises SDL and opens a keep-alive
+# connection to Ollama, then waits for a game id. A click only pays for the
+# window and the first frame; the launcher starts a replacement right away.
+# Console games keep their own process (they need the terminal's stdin).
+#
+# Workers are plain subprocesses (`python -m games.warm_pool`) in a session
+# of their own, like games started with subprocess.Popen: nothing joins them
+# when the launcher exits, so handed-off games outlive it. The launcher
+# writes the game id (an empty line dismisses the worker) to the worker's
+# stdin; the worker reports "ready" and "frame" lines on its stdout and sends
+# its own output, the game's included, to stderr.
+
+ENV_WORKERS = "NEWTRY3_WARM_WORKERS"
+DEFAULT_WORKERS = 1
+GUI_GAMES = tuple(g.id for g in registry.GAMES if not g.console)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def pool_size() -> int:
+    try:
+        return max(0, int(os.environ.get(ENV_WORKERS, DEFAULT_WORKERS)))
+    except ValueError:
+        return DEFAULT_WORKERS
+
+
+def _warm_up() -> Dict[str, Any]:
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import pygame  # type: ignore
+    from .llm_client import ensure_ollama_up
+
+    games = {run_id: registry.load(run_id) for run_id in GUI_GAMES}
+    pygame.init()
+    pygame.font.SysFont(None, 22)
+    ensure_ollama_up()  # leaves a pooled connection for the game's own check
+    return games
+
+
+def _notify(status: IO[str], kind: str) -> None:
+    try:
+        status.write(kind + "\n")
+        status.flush()
+    except (OSError, ValueError):
+        pass  # the launcher has quit; the game keeps running
+
+
+def _serve() -> None:
+    """Worker process: warm up, report "ready", run the game id read from stdin."""
+    status = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)  # prints must not end up in the status pipe (or break once the launcher is gone)
+    games = _warm_up()
+    _notify(status, "ready")
+    run_id = sys.stdin.readline().strip()
+    if run_id not in games:
+        return  # dismissed, or the launcher quit
+    from .gui_render import on_first_frame
+    from . import llm_metrics
+    from .llm_cache import active_cache
+
+    on_first_frame(lambda: _notify(status, "frame"))
+    try:
+        games[run_id]()
+    finally:
+        try:
+            status.close()
+        except OSError:
+            pass
+    cache = active_cache()
+    if cache is not None:
+        print(cache.report())
+    llm_metrics.export()
+
+
+class _Worker:
+    def __init__(self) -> None:
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "games.warm_pool"],
+            cwd=ROOT,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            start_new_session=True,  # POSIX: Ctrl+C in the launcher's terminal does not reach the games
+        )
+        # Pipes cannot be polled portably; a reader thread queues the status lines (None: pipe closed)
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        threading.Thread(target=self._read, name="warm-game-status", daemon=True).start()
+        self.ready = False
+        self.gone = False  # status pipe closed: the worker or its game exited
+
+    def _read(self) -> None:
+        assert self.process.stdout is not None
+        for line in self.process.stdout:
+            self._lines.put(line.strip())
+        self._lines.put(None)
+
+    def events(self) -> List[str]:
+        """Status lines received since the last call (sets `gone` at the end of the pipe)."""
+        lines: List[str] = []
+        while not self.gone:
+            try:
+                line = self._lines.get_nowait()
+            except queue.Empty:
+                break
+            if line is None:
+                self.gone = True
+            else:
+                lines.append(line)
+        return lines
+
+    def check_ready(self) -> bool:
+        if not self.ready:
+            self.ready = "ready" in self.events()
+        return self.ready
+
+    def send(self, line: str) -> None:
+        assert self.process.stdin is not None
+        self.process.stdin.write(line + "\n")
+        self.process.stdin.flush()
+
+
+class WarmPool:
+    """Keeps `size` warmed-up game processes waiting and measures click-to-first-frame."""
+
+    def __init__(self, size: Optional[int] = None) -> None:
+        self.size = pool_size() if size is None else size
+        self._idle: List[_Worker] = []
+        # running games still waiting for their first frame: (worker, run_id, click time, warm)
+        self._launched: List[Tuple[_Worker, str, float, bool]] = []
+        self._running: List[_Worker] = []  # every handed-off game until it exits
+        self.latencies: List[Tuple[str, float, bool]] = []
+
+    def start(self) -> "WarmPool":
+        while len(self._idle) < self.size:
+            self._idle.append(_Worker())
+        return self
+
+    def wait_ready(self, timeout: float = 30.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if all(w.check_ready() for w in self._idle):
+                return True
+            time.sleep(0.01)
+        return False
+
+    def launch(self, run_id: str) -> bool:
+        """Hand `run_id` to a worker; False if the pool is off or the game is not a GUI game."""
+        if run_id not in GUI_GAMES or self.size <= 0:
+            return False
+        clicked = time.perf_counter()
+        ready = [w for w in self._idle if w.check_ready()]
+        worker = ready[0] if ready else (self._idle[0] if self._idle else _Worker())
+        if worker in self._idle:
+            self._idle.remove(worker)
+        try:
+            worker.send(run_id)
+        except OSError:
+            return False  # the worker died while waiting
+        self._launched.append((worker, run_id, clicked, worker.ready))
+        self._running.append(worker)
+        return True
+
+    def poll(self) -> List[Tuple[str, float, bool]]:
+        """Call once per launcher frame: refills the pool and returns (run_id, ms, warm)
+        for games that just showed their first frame."""
+        self.start()
+        done: List[Tuple[str, float, bool]] = []
+        for entry in list(self._launched):
+            worker, run_id, clicked, warm = entry
+            # a worker that was still warming up says "ready" before "frame"
+            if "frame" in worker.events():
+                done.append((run_id, (time.perf_counter() - clicked) * 1000, warm))
+                self._launched.remove(entry)
+            elif worker.gone:
+                self._launched.remove(entry)  # game exited before drawing
+        for worker in list(self._running):
+            if worker.process.poll() is not None:  # also reaps it
+                self._running.remove(worker)
+        self.latencies.extend(done)
+        return done
+
+    def stop_games(self) -> None:
+        """Kill the handed-off games (benchmarks; the launcher leaves them running)."""
+        for worker in self._running:
+            worker.process.kill()
+            worker.process.wait()
+        self._running.clear()
+        self._launched.clear()
+
+    def close(self) -> None:
+        """Dismiss idle workers; running games keep going."""
+        for worker in self._idle:
+            try:
+                worker.send("")
+            except OSError:
+                pass
+        for worker in self._idle:
+            try:
+                worker.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                worker.process.terminate()
+                worker.process.wait()
+        self._idle.clear()
+        self._launched.clear()
+        self._running.clear()
+
+    def report(self) -> str:
+        if not self.latencies:
+            return "Warm-Pool: keine Spiele gestartet."
+        parts = [f"{run_id} {ms:.0f} ms ({'warm' if warm else 'kalt'})" for run_id, ms, warm in self.latencies]
+        return "Klick bis erstes Bild: " + ", ".join(parts)
+
+
+if __name__ == "__main__":
+    _serve()
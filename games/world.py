@@ -0,0 +1,222 @@
+from collections import deque
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Set, Tuple
+
+# Indexed LifeSim world. Rooms are small __slots__ objects; the World keeps
+# an item -> rooms index (case-insensitive), incoming-exit maps and a cache of
+# BFS trees for shortest paths that is dropped whenever an exit changes.
+# Patches only touch the rooms they name, so worlds with thousands of
+# AI-created places stay cheap to update and to describe.
+#
+# Serialisation: to_dict()/from_dict() use the nested prompt format
+# ({name: {"items": [...], "exits": {...}, "traits": {...}}}); compact()/
+# from_compact() use one row per room, [name, items, exits, traits], with
+# empty trailing fields dropped.
+
+
+class Room:
+    __slots__ = ("name", "items", "exits", "traits")
+
+    def __init__(
+        self,
+        name: str,
+        items: Optional[List[str]] = None,
+        exits: Optional[Dict[str, str]] = None,
+        traits: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.name = name
+        self.items: List[str] = items if items is not None else []
+        self.exits: Dict[str, str] = exits if exits is not None else {}
+        self.traits: Dict[str, str] = traits if traits is not None else {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"items": list(self.items), "exits": dict(self.exits)}
+        if self.traits:
+            out["traits"] = dict(self.traits)
+        return out
+
+    def __repr__(self) -> str:
+        return f"Room({self.name!r}, items={self.items!r}, exits={self.exits!r})"
+
+
+class World:
+    """Rooms by name plus item index, adjacency and cached shortest paths."""
+
+    def __init__(self) -> None:
+        self.rooms: Dict[str, Room] = {}
+        self._where: Dict[str, Dict[str, int]] = {}  # lower-case item -> {room: count}
+        self._incoming: Dict[str, Set[Tuple[str, str]]] = {}  # room -> {(source, direction)}
+        self._trees: Dict[str, Dict[str, Tuple[str, str]]] = {}  # BFS parents per start room
+        self._names: Optional[List[str]] = None
+        self._lower: Dict[str, str] = {}  # lower-case room name -> name
+        self.version = 0  # bumped by every update (lets callers cache derived data)
+
+    # -- construction --------------------------------------------------------------------
+
+    @classmethod
+    def from_dict(cls, rooms: Mapping[str, Mapping[str, Any]]) -> "World":
+        world = cls()
+        for name in rooms:
+            world.add_room(name)
+        for name, data in rooms.items():
+            for item in data.get("items", []):
+                world.add_item(name, item)
+            for direction, target in data.get("exits", {}).items():
+                world.connect(name, direction, target)
+            world.rooms[name].traits.update(data.get("traits", {}))
+        return world
+
+    @classmethod
+    def from_compact(cls, rows: List[List[Any]]) -> "World":
+        return cls.from_dict({
+            row[0]: {
+                "items": row[1] if len(row) > 1 else [],
+                "exits": row[2] if len(row) > 2 else {},
+                "traits": row[3] if len(row) > 3 else {},
+            }
+            for row in rows
+        })
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {name: room.to_dict() for name, room in self.rooms.items()}
+
+    def compact(self) -> List[List[Any]]:
+        rows = []
+        for room in self.rooms.values():
+            row: List[Any] = [room.name, list(room.items), dict(room.exits), dict(room.traits)]
+            while len(row) > 1 and not row[-1]:
+                row.pop()
+            rows.append(row)
+        return rows
+
+    # -- queries -------------------------------------------------------------------------
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.rooms
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.rooms)
+
+    def __len__(self) -> int:
+        return len(self.rooms)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, World) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+    def get(self, name: str) -> Optional[Room]:
+        return self.rooms.get(name)
+
+    def names(self) -> List[str]:
+        """Sorted room names, cached until a room is added."""
+        if self._names is None:
+            self._names = sorted(self.rooms)
+        return self._names
+
+    def find_room(self, name: str) -> Optional[str]:
+        """Room name matched case-insensitively."""
+        return self._lower.get(name.lower())
+
+    def items_at(self, name: str) -> List[str]:
+        room = self.rooms.get(name)
+        return room.items if room else []
+
+    def exits_of(self, name: str) -> Dict[str, str]:
+        room = self.rooms.get(name)
+        return room.exits if room else {}
+
+    def neighbours(self, name: str) -> List[str]:
+        """Existing rooms reachable in one step."""
+        return [t for t in self.exits_of(name).values() if t in self.rooms]
+
+    def entrances(self, name: str) -> List[Tuple[str, str]]:
+        """(source room, direction) for every exit leading into `name`."""
+        return sorted(self._incoming.get(name, ()))
+
+    def where(self, item: str) -> List[str]:
+        """Rooms holding `item` (case-insensitive)."""
+        return list(self._where.get(item.lower(), {}))
+
+    def find_item(self, name: str, item: str) -> Optional[str]:
+        """The item as spelled in room `name`, matched case-insensitively."""
+        if name not in self._where.get(item.lower(), {}):
+            return None
+        key = item.lower()
+        return next((i for i in self.rooms[name].items if i.lower() == key), None)
+
+    def path(self, src: str, dst: str) -> Optional[List[str]]:
+        """Directions of a shortest route from `src` to `dst`; None if unreachable."""
+        if src not in self.rooms or dst not in self.rooms:
+            return None
+        tree = self._trees.get(src)
+        if tree is None:
+            tree = self._trees[src] = self._bfs(src)
+        if dst != src and dst not in tree:
+            return None
+        steps: List[str] = []
+        node = dst
+        while node != src:
+            node, direction = tree[node]
+            steps.append(direction)
+        steps.reverse()
+        return steps
+
+    def _bfs(self, src: str) -> Dict[str, Tuple[str, str]]:
+        parents: Dict[str, Tuple[str, str]] = {}
+        queue = deque([src])
+        while queue:
+            node = queue.popleft()
+            for direction, target in self.rooms[node].exits.items():
+                if target in self.rooms and target != src and target not in parents:
+                    parents[target] = (node, direction)
+                    queue.append(target)
+        return parents
+
+    # -- updates -------------------------------------------------------------------------
+
+    def add_room(self, name: str) -> Room:
+        room = self.rooms.get(name)
+        if room is None:
+            room = self.rooms[name] = Room(name)
+            self.version += 1
+            self._names = None
+            self._lower.setdefault(name.lower(), name)
+            if name in self._incoming:
+                self._trees.clear()  # dangling exits into this name become walkable
+        return room
+
+    def connect(self, src: str, direction: str, dst: str) -> None:
+        room = self.add_room(src)
+        old = room.exits.get(direction)
+        if old is not None:
+            self._incoming[old].discard((src, direction))
+        room.exits[direction] = dst
+        self._incoming.setdefault(dst, set()).add((src, direction))
+        self._trees.clear()
+        self.version += 1
+
+    def add_item(self, name: str, item: str) -> None:
+        self.add_room(name).items.append(item)
+        rooms = self._where.setdefault(item.lower(), {})
+        rooms[name] = rooms.get(name, 0) + 1
+        self.version += 1
+
+    def remove_item(self, name: str, item: str) -> Optional[str]:
+        """Take `item` (case-insensitive) out of room `name`; returns its spelling or None."""
+        found = self.find_item(name, item)
+        if found is None:
+            return None
+        self.rooms[name].items.remove(found)
+        self.version += 1
+        rooms = self._where[found.lower()]
+        rooms[name] -= 1
+        if not rooms[name]:
+            del rooms[name]
+            if not rooms:
+                del self._where[found.lower()]
+        return found
+
+    def set_trait(self, name: str, key: str, value: str) -> None:
+        self.add_room(name).traits[key] = value
+        self.version += 1
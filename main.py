@@ -1,15 +1,15 @@
 import argparse
+import functools
+import os
+from games import registry
 from games.menu import main_menu, health_check
 
-# Optional imports for direct run mapping
-from games.number_guess import play_number_guess
-from games.tic_tac_toe import play_tic_tac_toe
-from games.ollama_quiz import run_ollama_quiz
-from games.ai_lifesim import run_lifesim
-from games.ai_lifesim_gui import run_lifesim_gui
-from games.ai_coplay import run_coplay
-from games.ai_coplay_gui import run_coplay_gui
-from games.launcher_gui import run_launcher
+# Everything else (pygame, pydantic, the games) is imported on demand below
+from games.llm_cache import ENV_GAMES as ENV_CACHE_GAMES, active_cache
+from games import llm_metrics
+
+# Games whose sessions are journaled and can be continued with --resume
+JOURNALED = ("lifesim", "coplay")
 
 
 def parse_args():
@@ -17,36 +17,115 @@ def parse_args():
     parser.add_argument("--check", action="store_true", help="Run environment and Ollama health checks and exit")
     parser.add_argument("--gui", action="store_true", help="Start the graphical launcher (pygame)")
     parser.add_argument("--run", type=str, help="Run a specific game by id (used by GUI launcher)")
+    parser.add_argument("--cache", action="store_true", help="Cache model answers on disk (for the --run game, or all games)")
+    parser.add_argument("--metrics", type=str, metavar="PREFIX",
+                        help="Write per-call LLM metrics to PREFIX.jsonl (live) and PREFIX.prom (at exit)")
+    parser.add_argument("--profile", nargs="?", const="", metavar="PREFIX",
+                        help="Profile the --run game: PREFIX.prof, PREFIX.collapsed, PREFIX.turns.jsonl")
+    parser.add_argument("--profile-memory", action="store_true", help="With --profile: tracemalloc snapshot per turn")
+    parser.add_argument("--journal", type=str, metavar="FILE",
+                        help="Journal the --run session (LifeSim/Co-Play) to FILE (default: ~/.newtry3/sessions/)")
+    parser.add_argument("--resume", type=str, metavar="FILE", help="Continue a journaled LifeSim/Co-Play session")
+    parser.add_argument("--replay", type=str, metavar="FILE",
+                        help="Re-run a journaled session without a model and report divergences (exit 1)")
+    parser.add_argument("--ollama-url", type=str, help="Ollama endpoint, e.g. http://127.0.0.1:11434 (default: $OLLAMA_HOST)")
+    parser.add_argument("--serve", action="store_true", help="Host many LifeSim/Co-Play sessions over a local HTTP API")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --serve (default 8765)")
+    parser.add_argument("--concurrency", type=int, default=2, help="Parallel model requests for --serve (default 2)")
+    parser.add_argument("--max-sessions", type=int, default=32, help="Session limit for --serve (default 32)")
+    parser.add_argument("--mock", nargs="?", const="fast", metavar="PROFILE",
+                        help="Start a local mock Ollama (instant/fast/cpu/flaky) and play against it")
     return parser.parse_args()
 
 
 def main():
     args = parse_args()
+    if (args.profile is not None or args.profile_memory) and not args.run:
+        print("--profile braucht --run <id>.")
+        raise SystemExit(2)
+    if args.replay:
+        from games.replay import replay
+        try:
+            result = replay(args.replay)
+        except (OSError, ValueError) as e:
+            print(f"Replay nicht möglich: {e}")
+            raise SystemExit(2)
+        print(result.report())
+        raise SystemExit(0 if result.ok else 1)
+    if args.resume:
+        from games.journal import read_header
+        try:
+            game_id = read_header(args.resume)["game"]
+        except (OSError, ValueError) as e:
+            print(f"Fortsetzen nicht möglich: {e}")
+            raise SystemExit(2)
+        if args.run and args.run != game_id:
+            print(f"Fortsetzen nicht möglich: {args.resume} ist ein {game_id}-Journal, nicht --run {args.run}.")
+            raise SystemExit(2)
+        args.run = game_id
+    if args.journal and args.run not in JOURNALED:
+        print(f"--journal geht nur mit --run {' oder '.join(JOURNALED)}.")
+        raise SystemExit(2)
+    if args.cache:
+        # Via environment so games spawned by the GUI launcher inherit it
+        os.environ[ENV_CACHE_GAMES] = args.run or "*"
+    if args.metrics:
+        os.environ[llm_metrics.ENV_PREFIX] = os.path.abspath(args.metrics)
+    if args.ollama_url:
+        from games.backend import set_base_url
+        set_base_url(args.ollama_url)
+    if args.mock:
+        from games.backend import set_base_url
+        from games.mock_ollama import PROFILES, MockOllama
+        if args.mock not in PROFILES:
+            print(f"Unbekanntes Mock-Profil: {args.mock} ({', '.join(sorted(PROFILES))})")
+            raise SystemExit(2)
+        # Lives as long as this process; launcher children reach it via OLLAMA_HOST
+        mock = MockOllama(PROFILES[args.mock]).start()
+        set_base_url(mock.url)
+        print(f"Mock-Ollama ({args.mock}) auf {mock.url}")
+    if args.serve:
+        from games.game_server import run_server
+        run_server(port=args.port, concurrency=args.concurrency, max_sessions=args.max_sessions)
+        llm_metrics.export()
+        return
     if args.check:
         ok = health_check(verbose=True)
         raise SystemExit(0 if ok else 2)
     if getattr(args, "gui", False):
+        from games.launcher_gui import run_launcher
         run_launcher()
         return
     run_id = getattr(args, "run", None)
     if run_id:
-        # Map run_id to concrete game function
-        mapping = {
-            "number_guess": play_number_guess,
-            "tic_tac_toe": play_tic_tac_toe,
-            "ollama_quiz": run_ollama_quiz,
-            "lifesim": run_lifesim,
-            "lifesim_gui": run_lifesim_gui,
-            "coplay": run_coplay,
-            "coplay_gui": run_coplay_gui,
-        }
-        fn = mapping.get(run_id)
-        if not fn:
-            print(f"Unbekannte Run-ID: {run_id}")
+        if registry.get(run_id) is None:
+            print(f"Unbekannte Run-ID: {run_id} ({', '.join(registry.ids())})")
+            raise SystemExit(2)
+        game = registry.load(run_id)
+        if run_id in JOURNALED:
+            game = functools.partial(game, journal_path=args.journal, resume=args.resume)
+        from games.journal import JournalError
+        try:
+            if args.profile is not None:
+                from games.profiling import Profiler
+                profiler = Profiler(args.profile or f"profile_{run_id}", memory=args.profile_memory).start()
+                try:
+                    game()
+                finally:
+                    print(profiler.stop())
+            else:
+                game()
+        except JournalError as e:
+            # raised by resume_into() before the first turn
+            print(f"Fortsetzen nicht möglich: {e}")
             raise SystemExit(2)
-        fn()
+        cache = active_cache()
+        if cache is not None:
+            print(cache.report())
+        llm_metrics.export()
         return
     main_menu()
+    llm_metrics.export()
 
 
 if __name__ == "__main__":
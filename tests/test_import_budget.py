@@ -0,0 +1,20 @@
+import pytest
+
+from games.bench import IMPORT_BUDGET_MS, IMPORT_CASES, heavy_imports, import_profile, import_problems
+
+# Console entry points must start without pygame/pydantic and within the
+# import-time budget (python -X importtime in a fresh interpreter). The
+# fastest of a few runs is compared, so a busy machine does not fail the test.
+
+RUNS = 3
+
+
+@pytest.mark.parametrize("case", sorted(IMPORT_CASES))
+def test_import_budget(case: str) -> None:
+    totals = []
+    for _ in range(RUNS):
+        top, modules = import_profile(IMPORT_CASES[case])
+        assert top, f"{case}: keine -X importtime-Ausgabe"
+        assert heavy_imports(modules) == [], import_problems(case, 0.0, heavy_imports(modules))
+        totals.append(sum(top.values()))
+    assert min(totals) <= IMPORT_BUDGET_MS[case], import_problems(case, min(totals), [])